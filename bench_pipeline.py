@@ -0,0 +1,357 @@
+"""
+전체 파이프라인(main.py run) 성능 회귀 검사
+
+로컬 가짜 커머스 API + 가짜 Sheets 서버 + SQLite 로 main.py 를 그대로 실행해서
+데이터 크기별로 처리량, 단계별 지연 p50/p99, 최대 메모리를 결과 파일에 기록하고
+baseline 보다 threshold 이상 나빠진 항목이 있으면 종료 코드 1 로 끝난다.
+
+사용법:
+    python bench_pipeline.py                          # 결과만 기록 (bench_results.json)
+    python bench_pipeline.py --update-baseline        # 현재 결과를 baseline 으로 저장
+    python bench_pipeline.py --sizes 1000 5000 --runs 10 --threshold 0.25
+    python bench_pipeline.py --stream                 # stream_details 모드로 측정
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STAGES = ("fetch", "parse", "enqueue", "flush_mysql", "flush_sheet")
+
+# 이보다 작은 차이(초)는 측정 잡음으로 보고 회귀로 치지 않음
+MIN_LATENCY_DELTA = 0.005
+
+
+def make_elements(n: int) -> list[dict]:
+    """
+    상품 주문 상세 응답의 data[] 원소 n개 (3건 중 1건은 같은 주문의 추가옵션)
+    """
+    elements = []
+    for i in range(n):
+        order_id = f"2025{i // 3:012d}"
+        side = i % 3 == 2
+        option = (
+            f"이용날짜(예시 : 2024-xx-xx ): 2025-02-{1 + i % 28:02d} / "
+            "숙소 이름(예시: 베스트 웨스턴 푸꾸옥): 코랄베이 리조트 / "
+            "예약자 영문명(예시: Kim Min Soo): HONG GILDONG / "
+            "결제방식 (잔금/완납): 완납 / "
+            "구분 (성인/소아): 성인 (키 140cm 이상) / "
+            "코스 옵션 (기본/빈원더스 추가): B코스 (사파리+빈원더스+그랜드월드) / "
+            "비행기 편명(예시: VJ979): VJ0975"
+        )
+        elements.append({
+            "order": {
+                "orderId": order_id,
+                "orderDate": "2025-01-07T20:49:12.0+09:00",
+                "ordererId": f"user{i // 3}",
+                "ordererName": "홍길동",
+                "ordererTel": "010-0000-0000",
+                "payLocationType": "MOBILE",
+            },
+            "productOrder": {
+                "productOrderId": f"2025{i:012d}",
+                "productId": str(1000 + (i // 3) % 50),
+                "productName": "스피드보트 업그레이드(잔금 30USD)" if side else f"테스트 상품 {(i // 3) % 50}",
+                "productOption": "" if side else option,
+                "quantity": 1 if side else 2,
+                "shippingAddress": {"name": "홍길동", "tel1": "010-0000-0000"},
+                "shippingMemo": "",
+                "initialProductAmount": 100000,
+                "initialPaymentAmount": 90000,
+            },
+        })
+    return elements
+
+
+class FakeCommerceAPI:
+    """
+    토큰 발급 / last-changed-statuses / product-orders/query 만 흉내내는 로컬 서버
+    - 상세조회 응답은 원소별로 미리 직렬화해 두고 이어붙임 (서버 쪽 비용이 측정값을 흔들지 않게)
+    - naver_api 의 URL 은 import 시점에 정해지므로 서버는 하나만 띄우고 load() 로 데이터만 바꿈
+    """
+
+    def __init__(self):
+        self.payed, self.claims, self.encoded = [], [], {}
+
+    def load(self, elements: list[dict], cancel_ratio: int = 100):
+        self.payed = [
+            {"productOrderId": e["productOrder"]["productOrderId"], "orderId": e["order"]["orderId"],
+             "lastChangedType": "PAYED"}
+            for e in elements
+        ]
+        self.claims = [dict(item, lastChangedType="CLAIM_COMPLETED") for item in self.payed[::cancel_ratio]]
+        self.encoded = {
+            e["productOrder"]["productOrderId"]: json.dumps(e, ensure_ascii=False).encode("utf-8")
+            for e in elements
+        }
+
+    def handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: bytes):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                changed_type = urllib.parse.parse_qs(url.query).get("lastChangedType", ["PAYED"])[0]
+                items = api.claims if changed_type == "CLAIM_COMPLETED" else api.payed
+                self._send(json.dumps({"data": {"lastChangeStatuses": items}}).encode("utf-8"))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if "/oauth2/token" in self.path:
+                    self._send(b'{"access_token": "bench-token", "expires_in": 10800, "token_type": "Bearer"}')
+                    return
+                ids = json.loads(body)["productOrderIds"]
+                self._send(b'{"data":[' + b",".join(api.encoded[i] for i in ids if i in api.encoded) + b"]}")
+
+        return Handler
+
+
+class FakeSheets:
+    """
+    values.append / update / get / batchGet 만 흉내내는 로컬 Sheets 서버 (받은 행 수만 셈)
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.lock = threading.Lock()
+
+    def handler(self):
+        sheets = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, obj):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+                values = body.get("values", [])
+                with sheets.lock:
+                    start = sheets.rows
+                    sheets.rows += len(values)
+                cells = sum(len(row) for row in values)
+                updated_range = f"input!A{start + 1}:Y{start + len(values)}"
+                self._send({"updatedCells": cells, "updatedRange": updated_range,
+                            "updates": {"updatedCells": cells, "updatedRange": updated_range}})
+
+            do_POST = _write
+            do_PUT = _write
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                if url.path.endswith(":batchGet"):
+                    ranges = urllib.parse.parse_qs(url.query).get("ranges", [])
+                    self._send({"valueRanges": [{"range": r, "values": []} for r in ranges]})
+                    return
+                self._send({"values": [["bench"]]})
+
+        return Handler
+
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _instrument(timings: dict):
+    """
+    pipeline 의 단계 함수들을 감싸서 호출마다 걸린 시간을 timings[단계] 에 기록
+    (stage_run 은 모듈 전역 이름으로 호출하므로 모듈 속성을 바꾸면 그대로 잡힘)
+    """
+    import pipeline
+
+    names = {"fetch": "stage_fetch", "parse": "stage_parse", "enqueue": "enqueue",
+             "flush_mysql": "flush_mysql", "flush_sheet": "flush_sheet"}
+    for stage, attr in names.items():
+        original = getattr(pipeline, attr)
+
+        def timed(*args, _original=original, _stage=stage, **kwargs):
+            start = time.perf_counter()
+            try:
+                return _original(*args, **kwargs)
+            finally:
+                timings[_stage].append(time.perf_counter() - start)
+
+        setattr(pipeline, attr, timed)
+
+
+def _write_config(tmp: str, client_secret: str, stream: bool) -> str:
+    path = os.path.join(tmp, "config.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "client_id": "bench",
+            "client_secret": client_secret,
+            "stream_details": stream,
+            "sheet_id": "bench",
+            "service_account_file": "",
+            "db": {"backend": "sqlite", "path": os.path.join(tmp, "bench.db")},
+            "spool_path": os.path.join(tmp, "spool.db"),
+            "cache_dir": os.path.join(tmp, "cache"),
+            "export_dir": os.path.join(tmp, "export"),
+            "hotel_dictionary_path": os.path.join(tmp, "hotels.json"),
+            "catalog_path": os.path.join(tmp, "product_catalog.json"),
+            "archive_dir": os.path.join(tmp, "archive"),
+            "dead_letter_path": os.path.join(tmp, "dead_letter.jsonl"),
+            "claims_checkpoint_path": os.path.join(tmp, "claims_checkpoint.json"),
+        }, f)
+    return path
+
+
+def _run_once(client_secret: str, stream: bool) -> float:
+    import main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = _write_config(tmp, client_secret, stream)
+        start = time.perf_counter()
+        code = main.main(["--config", config_path, "run"])
+        elapsed = time.perf_counter() - start
+    if code != 0:
+        raise RuntimeError(f"main.py run 종료 코드 {code}")
+    return elapsed
+
+
+def _percentile(values: list[float], q: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def bench_size(commerce: FakeCommerceAPI, size: int, runs: int, client_secret: str, stream: bool,
+               timings: dict) -> dict:
+    commerce.load(make_elements(size))
+    for values in timings.values():
+        values.clear()
+    totals = [_run_once(client_secret, stream) for _ in range(runs)]
+    stages = {
+        stage: {"p50": _percentile(timings[stage], 50), "p99": _percentile(timings[stage], 99)}
+        for stage in STAGES if timings[stage]
+    }
+
+    # 메모리는 tracemalloc 이 느리게 만들므로 따로 1회 측정
+    tracemalloc.start()
+    _run_once(client_secret, stream)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "throughput": size / statistics.median(totals),
+        "total": {"p50": _percentile(totals, 50), "p99": _percentile(totals, 99)},
+        "stages": stages,
+        "peak_mem_mb": peak / (1024 * 1024),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    baseline 대비 threshold(비율) 이상 나빠진 항목 목록
+    - 처리량: 낮아지면 회귀 / 지연, 메모리: 높아지면 회귀
+    """
+    regressions = []
+    for size, cur in results["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            continue
+        if cur["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"[{size}] throughput {base['throughput']:.0f} -> {cur['throughput']:.0f} rows/sec")
+
+        latencies = dict(cur["stages"], total=cur["total"])
+        base_latencies = dict(base["stages"], total=base["total"])
+        for stage, lat in latencies.items():
+            base_lat = base_latencies.get(stage)
+            if base_lat is None:
+                continue
+            for q in ("p50", "p99"):
+                if lat[q] > base_lat[q] * (1 + threshold) and lat[q] - base_lat[q] > MIN_LATENCY_DELTA:
+                    regressions.append(f"[{size}] {stage} {q} {base_lat[q] * 1000:.1f} -> {lat[q] * 1000:.1f} ms")
+
+        if cur["peak_mem_mb"] > base["peak_mem_mb"] * (1 + threshold):
+            regressions.append(f"[{size}] peak memory {base['peak_mem_mb']:.1f} -> {cur['peak_mem_mb']:.1f} MB")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.25, help="허용하는 악화 비율 (0.25 = 25%%)")
+    parser.add_argument("--results", default="bench_results.json")
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--stream", action="store_true", help="stream_details 모드로 측정")
+    args = parser.parse_args()
+
+    # 가짜 서버 주소는 naver_api / sheets_api 를 import 하기 전에 정해야 함
+    commerce = FakeCommerceAPI()
+    commerce_server = _serve(commerce.handler())
+    sheets = FakeSheets()
+    sheets_server = _serve(sheets.handler())
+    os.environ["TRIPNOVA_NAVER_API_BASE"] = f"http://127.0.0.1:{commerce_server.server_address[1]}"
+    os.environ["TRIPNOVA_SHEETS_ENDPOINT"] = f"http://127.0.0.1:{sheets_server.server_address[1]}"
+
+    import bcrypt
+
+    # get_token 은 client_secret 을 bcrypt salt 로 씀
+    client_secret = bcrypt.gensalt(rounds=4).decode("utf-8")
+
+    timings = {stage: [] for stage in STAGES}
+    _instrument(timings)
+
+    results = {"runs": args.runs, "stream": args.stream, "python": sys.version.split()[0], "sizes": {}}
+    for size in args.sizes:
+        result = bench_size(commerce, size, args.runs, client_secret, args.stream, timings)
+        results["sizes"][str(size)] = result
+        print(f"[{size}] {result['throughput']:10.0f} rows/sec, "
+              f"total p50 {result['total']['p50'] * 1000:.1f} ms / p99 {result['total']['p99'] * 1000:.1f} ms, "
+              f"peak {result['peak_mem_mb']:.1f} MB")
+        for stage, lat in result["stages"].items():
+            print(f"    {stage:12s} p50 {lat['p50'] * 1000:8.1f} ms   p99 {lat['p99'] * 1000:8.1f} ms")
+    commerce_server.shutdown()
+    sheets_server.shutdown()
+
+    with open(args.results, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline 저장: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"baseline 없음: {args.baseline} (--update-baseline 으로 먼저 저장)")
+        sys.exit(0)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n성능 회귀 (threshold {args.threshold:.0%}):")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print(f"\nbaseline 대비 회귀 없음 (threshold {args.threshold:.0%})")
@@ -0,0 +1,73 @@
+"""
+main.py 시작(import) 비용 측정
+
+python -X importtime 출력에서 모듈별 누적 import 시간을 모아 상위 N개를 보여주고,
+`import main` 전체 wall time 을 여러 번 재서 중앙값을 출력한다.
+
+사용법:
+    python bench_startup.py
+    python bench_startup.py --module main --runs 10 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("googleapiclient", "google.oauth2", "pymysql", "bcrypt", "requests")
+
+
+def importtime_report(module: str) -> list[tuple[str, int, int]]:
+    """
+    python -X importtime -c "import <module>" 결과 파싱
+    - 반환: [(모듈명, self_us, cumulative_us), ...] (cumulative 내림차순)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:       self [us] |    cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    rows.sort(key=lambda r: r[2], reverse=True)
+    return rows
+
+
+def wall_time(module: str, runs: int) -> list[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(time.perf_counter() - start)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = importtime_report(args.module)
+    print(f"{'cumulative(ms)':>15} {'self(ms)':>10}  module")
+    for name, self_us, cumulative_us in rows[:args.top]:
+        print(f"{cumulative_us / 1000:15.1f} {self_us / 1000:10.1f}  {name}")
+
+    loaded = {name for name, _, _ in rows}
+    heavy = [m for m in HEAVY_MODULES if m in loaded]
+    print("\nimport 시점에 로드된 무거운 모듈:", ", ".join(heavy) if heavy else "없음")
+
+    times = wall_time(args.module, args.runs)
+    baseline = wall_time("sys", args.runs)
+    print(f"import {args.module}: 중앙값 {statistics.median(times) * 1000:.1f} ms "
+          f"(인터프리터 기동만: {statistics.median(baseline) * 1000:.1f} ms, {args.runs}회)")
@@ -0,0 +1,92 @@
+"""
+저장소 backend 별 bulk 쓰기 처리량 비교
+
+사용법:
+    python bench_storage.py                 # SQLite (임시 파일)
+    python bench_storage.py --rows 50000
+    TRIPNOVA_MYSQL="host,user,password,database" python bench_storage.py   # MySQL 도 함께 측정
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from storage import migrate_storage, open_storage
+
+
+def make_rows(n: int) -> list[dict]:
+    """
+    parse_orders() 결과와 같은 모양의 가짜 예약 n건
+    """
+    rows = []
+    for i in range(n):
+        rows.append({
+            "orderId": f"2025{i // 3:012d}",
+            "productOrderId": f"2025{i:012d}",
+            "productId": str(1000 + i % 50),
+            "korName": "홍길동",
+            "engName": "HONG GILDONG",
+            "tel": "010-0000-0000",
+            "useDate": f"2025-02-{1 + i % 28:02d}",
+            "hotelName": "코랄베이 리조트",
+            "productName": f"테스트 상품 {i % 50}",
+            "courseOption": "B코스",
+            "payMethod": "완납",
+            "adult": 2,
+            "child": 1,
+            "old": 0,
+            "tower": 0,
+            "airplane": "VJ0975",
+            "shippingMemo": "",
+            "initialProductAmount": 100000,
+            "finalProductAmount": 90000,
+            "sideOption1": "",
+            "sideOption2": "",
+            "sideOption3": "",
+            "sideOption4": "",
+        })
+    return rows
+
+
+def bench(name: str, storage, rows: list[dict]):
+    # 1) 한 건씩 (건마다 commit)
+    single = rows[:min(len(rows), 2000)]
+    start = time.perf_counter()
+    for row in single:
+        storage.save_product_option_details(row)
+    elapsed = time.perf_counter() - start
+    print(f"[{name}] row-by-row : {len(single) / elapsed:10.0f} rows/sec ({len(single)} rows)")
+
+    # 2) 일괄 (executemany + 1회 commit)
+    start = time.perf_counter()
+    storage.save_product_option_details_many(rows)
+    elapsed = time.perf_counter() - start
+    print(f"[{name}] bulk       : {len(rows) / elapsed:10.0f} rows/sec ({len(rows)} rows)")
+
+    # 3) 취소 처리
+    start = time.perf_counter()
+    count = storage.mark_canceled(row["productOrderId"] for row in rows[::10])
+    elapsed = time.perf_counter() - start
+    print(f"[{name}] cancel     : {count / elapsed:10.0f} rows/sec ({count} rows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = open_storage({"backend": "sqlite", "path": os.path.join(tmp, "bench.db")})
+        bench("sqlite", storage, rows)
+        storage.close()
+
+    mysql_dsn = os.environ.get("TRIPNOVA_MYSQL")
+    if mysql_dsn:
+        host, user, password, database = mysql_dsn.split(",")
+        db_config = {"backend": "mysql", "host": host, "user": user, "password": password, "database": database}
+        migrate_storage(db_config)
+        storage = open_storage(db_config)
+        bench("mysql", storage, rows)
+        storage.close()
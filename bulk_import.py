@@ -0,0 +1,240 @@
+"""
+대량 과거 데이터 적재용 LOAD DATA 경로
+
+평소 실행(main.py)은 그대로 INSERT ... ON DUPLICATE KEY UPDATE 를 쓰고,
+수십만 건을 한 번에 넣을 때만 이 모듈을 사용한다.
+  1) 파싱 결과를 임시 TSV 파일로 스트리밍
+  2) LOAD DATA LOCAL INFILE 로 임시(staging) 테이블에 적재
+  3) INSERT ... SELECT ... ON DUPLICATE KEY UPDATE 한 문장으로 대상 테이블에 병합
+
+사용법:
+    python bulk_import.py --host ... --user ... --password ... --database ... detail1.json detail2.json
+    python bulk_import.py ... --mode both --compare-database tripnova_cmp detail1.json
+        # 기존 경로와 rows/sec 비교 (기존 경로는 --compare-database 에 적재, 두 DB 모두 빈 상태에서 시작)
+
+주의: MySQL 서버의 local_infile=ON 필요 (클라이언트는 connect_local_infile 로 연결)
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import db_mysql
+from manifest import invalidate_manifest_cache
+
+# 대상 테이블 -> (컬럼, 파라미터 튜플 생성 함수)
+BULK_TABLES = {
+    "product_orders": (db_mysql.PRODUCT_ORDER_COLUMNS, db_mysql.product_order_params),
+    "product_option_details": (db_mysql.PRODUCT_OPTION_DETAILS_COLUMNS, db_mysql.product_option_details_params),
+}
+
+_TSV_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\0": "\\0",
+})
+
+
+def connect_local_infile(host, user, password, database, charset="utf8"):
+    """
+    LOAD DATA LOCAL INFILE 을 허용한 pymysql 연결
+    """
+    import pymysql
+
+    return pymysql.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database,
+        charset=charset,
+        local_infile=True
+    )
+
+
+def _tsv_field(value) -> str:
+    # MySQL LOAD DATA 기본 이스케이프 규칙 (NULL 은 \N)
+    if value is None:
+        return "\\N"
+    return str(value).translate(_TSV_ESCAPES)
+
+
+def _tsv_line(params) -> str:
+    return "\t".join(_tsv_field(v) for v in params) + "\n"
+
+
+def write_tsv(path: str, params_iter) -> int:
+    """
+    파라미터 튜플을 TSV 파일로 스트리밍 기록 (메모리에 모으지 않음)
+    - 반환: 기록한 행 수
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for params in params_iter:
+            f.write(_tsv_line(params))
+            count += 1
+    return count
+
+
+def _temp_tsv(table: str) -> str:
+    fd, path = tempfile.mkstemp(prefix=f"{table}_", suffix=".tsv")
+    os.close(fd)
+    return path
+
+
+def bulk_upsert(connection, table: str, params_iter) -> int:
+    """
+    params_iter 를 TSV -> staging 테이블 -> 대상 테이블 병합
+    - 한 트랜잭션, 1회 commit
+    - 반환: 적재한 행 수
+    """
+    path = _temp_tsv(table)
+    try:
+        return load_tsv(connection, table, path, write_tsv(path, params_iter))
+    finally:
+        os.remove(path)
+
+
+def load_tsv(connection, table: str, path: str, count: int) -> int:
+    """
+    이미 써 둔 TSV 파일(count 행) -> staging 테이블 -> 대상 테이블 병합 (bulk_upsert 참고)
+    """
+    if not count:
+        return 0
+
+    columns, _ = BULK_TABLES[table]
+    stage = f"{table}_stage"
+    column_list = ", ".join(columns)
+    keep = db_mysql.PRODUCT_OPTION_DETAILS_KEEP_ON_UPDATE if table == "product_option_details" else ()
+    updates = ",\n  ".join(f"{c}=VALUES({c})" for c in columns[1:] if c not in keep)
+
+    with connection.cursor() as cursor:
+        # 1) 세션 전용 staging 테이블 (대상 테이블과 같은 PK -> 파일 안 중복은 마지막 값 유지)
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {stage}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {stage} LIKE {table}")
+
+        # 2) LOAD DATA
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {stage} "
+            f"CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            f"LINES TERMINATED BY '\\n' ({column_list})",
+            (path,)
+        )
+
+        # 3) set 기반 upsert 한 문장으로 병합
+        cursor.execute(f"""
+        INSERT INTO {table} ({column_list})
+        SELECT {column_list} FROM {stage}
+        ON DUPLICATE KEY UPDATE
+          {updates}
+        """)
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {stage}")
+    connection.commit()
+
+    if table == "product_option_details":
+        invalidate_manifest_cache()
+    return count
+
+
+def load_detail_files(paths):
+    """
+    저장해 둔 상품 주문 상세 응답(JSON) 파일들을 하나씩 읽어 data[] 원소를 yield
+    """
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            detail_res = json.load(f)
+        yield from detail_res.get("data", [])
+
+
+def import_bulk(connection, elems) -> dict:
+    """
+    LOAD DATA 경로로 product_orders / product_option_details 적재
+    - elems: data[] 원소 iterable (load_detail_files 그대로), 원소는 한 번만 훑고 모아 두지 않음
+      (product_orders 는 TSV 로 바로 쓰고 파서에는 원소를 하나씩 넘김)
+    - 반환: {"rows": 적재 행 수, "seconds": 소요 시간, "rows_per_sec": ...}
+    """
+    from parsing import parse_order_elements
+
+    start = time.perf_counter()
+    path = _temp_tsv("product_orders")
+    try:
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            counter = [0]
+
+            def _tap(elements):
+                for elem in elements:
+                    f.write(_tsv_line(db_mysql.product_order_params(db_mysql.product_order_data_from_detail(elem))))
+                    counter[0] += 1
+                    yield elem
+
+            parsed_list = parse_order_elements(_tap(elems))
+        rows = load_tsv(connection, "product_orders", path, counter[0])
+    finally:
+        os.remove(path)
+    rows += bulk_upsert(connection, "product_option_details",
+                        (db_mysql.product_option_details_params(p) for p in parsed_list))
+    return _stats(rows, time.perf_counter() - start)
+
+
+def import_normal(connection, elems) -> dict:
+    """
+    평소 실행과 같은 경로 (행 단위 INSERT ... ON DUPLICATE KEY UPDATE) - 비교용
+    - elems: import_bulk 와 같음
+    """
+    from parsing import parse_order_elements
+
+    start = time.perf_counter()
+    counter = [0]
+
+    def _tap(elements):
+        for elem in elements:
+            db_mysql.save_product_order_to_db(connection, db_mysql.product_order_data_from_detail(elem))
+            counter[0] += 1
+            yield elem
+
+    parsed_list = parse_order_elements(_tap(elems))
+    for parsed in parsed_list:
+        db_mysql.save_product_option_details(connection, parsed)
+    return _stats(counter[0] + len(parsed_list), time.perf_counter() - start)
+
+
+def _stats(rows: int, seconds: float) -> dict:
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_sec": round(rows / seconds) if seconds else 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="상품 주문 상세 JSON 대량 적재")
+    parser.add_argument("files", nargs="+", help="상품 주문 상세 응답 JSON 파일")
+    parser.add_argument("--host", required=True)
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--mode", choices=["bulk", "normal", "both"], default="bulk")
+    parser.add_argument("--compare-database",
+                        help="--mode both 에서 normal 경로를 적재할 별도 DB (같은 DB 에 두 번 넣으면 "
+                             "두 번째 경로는 갱신만 하게 되어 비교가 안 됨)")
+    args = parser.parse_args()
+    if args.mode == "both" and not args.compare_database:
+        parser.error("--mode both 에는 --compare-database 가 필요함")
+    if args.mode == "both" and args.compare_database == args.database:
+        parser.error("--compare-database 는 --database 와 달라야 함")
+
+    # 파일은 경로마다 다시 읽음 (원소 전체를 메모리에 올리지 않음)
+    if args.mode in ("normal", "both"):
+        database = args.compare_database if args.mode == "both" else args.database
+        connection = connect_local_infile(args.host, args.user, args.password, database)
+        try:
+            print(f"normal (INSERT ... ON DUPLICATE KEY UPDATE) [{database}]:",
+                  import_normal(connection, load_detail_files(args.files)))
+        finally:
+            connection.close()
+    if args.mode in ("bulk", "both"):
+        connection = connect_local_infile(args.host, args.user, args.password, args.database)
+        try:
+            print(f"bulk   (LOAD DATA + set-based upsert)      [{args.database}]:",
+                  import_bulk(connection, load_detail_files(args.files)))
+        finally:
+            connection.close()
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+# 상품 역할
+ROLE_MAIN = "main"          # 투어 / 코스 본상품 (성인/아동/노인 인원 계산)
+ROLE_SIDE = "side"          # 추가옵션 (sideOption 으로 병합, 인원 0)
+ROLE_TOWEL = "towel"        # 타월 (tower = 수량, 인원 0)
+ROLE_RENT_CAR = "rent_car"  # 렌트카 (완납, 인원 = 사용인원 옵션)
+ROLES = (ROLE_MAIN, ROLE_SIDE, ROLE_TOWEL, ROLE_RENT_CAR)
+
+# 상품명 규칙 (catalog 에 없는 상품, 그리고 refresh 때 새 상품의 역할을 처음 정할 때만 사용)
+SIDE_NAME_MARKERS = ("스피드보트 업그레이드", "북부지역", "잔금 30USD", "잔금 20USD",
+                     "북부(완납)", "남부(완납)", "중부(완납)", "소나시(무료)", "북부(잔금)", "남부(잔금)", "중부(잔금)",
+                     "선예약 후 개별결제", "1인 추가")
+TOWEL_NAME_MARKER = "원하시는 개수 만큼 선택해주세요"
+RENT_CAR_NAMES = ("푸꾸옥 프라이빗 렌트카 기사포함 km무제한 SUV 미니벤",)
+
+# 이 시간이 지난 상품은 refresh 때 다시 조회
+REFRESH_SECONDS = 24 * 3600
+
+
+@lru_cache(maxsize=4096)
+def classify_name(product_name: str) -> str:
+    """
+    상품명 -> 역할 (예전 parse_orders 의 문자열 판별 그대로, 같은 이름은 한 번만 검사)
+    """
+    if any(marker in product_name for marker in SIDE_NAME_MARKERS):
+        return ROLE_SIDE
+    if TOWEL_NAME_MARKER in product_name:
+        return ROLE_TOWEL
+    if product_name in RENT_CAR_NAMES:
+        return ROLE_RENT_CAR
+    return ROLE_MAIN
+
+
+class ProductCatalog:
+    """
+    productId(채널 상품번호) / optionCode -> {"role", "name"} 캐시
+    - 파일 형식 (catalog_path):
+      {"products": {"<productId>": {"role": "main", "name": "...", "fetched_at": ...}},
+       "options":  {"<optionCode>": {"role": "side", "name": "...", "productId": "..."}}}
+    - 조회: optionCode(추가상품 / 옵션 조합 id) 가 있으면 optionCode 로만, 없으면 productId 로 dict 조회
+      못 찾으면 classify_name(productName) 로 판별 (예전 동작)
+      (모르는 optionCode 를 본상품 항목으로 대신하면 새 추가상품이 본상품으로 분류되므로)
+    - 역할은 처음 정해진 뒤에는 refresh 해도 바뀌지 않음 -> 스토어에서 상품명을 바꿔도 분류가 유지됨
+      (이름만 최신 값으로 갱신, 역할을 바꾸려면 product_catalog_overrides 사용)
+    - overrides: 설정의 product_catalog_overrides (같은 형식, 파일보다 우선)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products = {}
+        self._options = {}
+        self._overrides = {"products": {}, "options": {}}
+        self._path = None
+        self._mtime = None
+        self._unknown = set()
+
+    def load(self, path: str, overrides: dict = None):
+        """
+        캐시 파일을 읽어 둠 (파일이 바뀌지 않았으면 다시 읽지 않음)
+        """
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        with self._lock:
+            self._overrides = {"products": dict((overrides or {}).get("products", {})),
+                               "options": dict((overrides or {}).get("options", {}))}
+            if path == self._path and mtime == self._mtime:
+                return
+            data = {}
+            if mtime is not None:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            self._products = data.get("products", {})
+            self._options = data.get("options", {})
+            self._path, self._mtime = path, mtime
+
+    def lookup(self, product_id, option_code=None):
+        """
+        -> {"role", "name"} / 없으면 None
+        """
+        if option_code:
+            option_code = str(option_code)
+            return self._overrides["options"].get(option_code) or self._options.get(option_code)
+        if product_id:
+            product_id = str(product_id)
+            return self._overrides["products"].get(product_id) or self._products.get(product_id)
+        return None
+
+    def classify(self, product_order: dict) -> tuple[str, str]:
+        """
+        productOrder -> (역할, 표시할 상품명)
+        """
+        product_name = product_order.get("productName", "")
+        entry = self.lookup(product_order.get("productId"), product_order.get("optionCode"))
+        if entry is None:
+            if product_order.get("productId"):
+                # 다음 refresh 때 조회할 상품 (refresh 스레드가 같은 set 을 고치므로 lock)
+                with self._lock:
+                    self._unknown.add(str(product_order["productId"]))
+            return classify_name(product_name), product_name
+        return entry.get("role") or classify_name(product_name), entry.get("name") or product_name
+
+    def snapshot(self) -> dict:
+        # parse_orders_parallel 의 worker 프로세스로 넘길 상태
+        with self._lock:
+            return {"products": self._products, "options": self._options, "overrides": self._overrides}
+
+    def restore(self, state: dict):
+        with self._lock:
+            self._products, self._options = state["products"], state["options"]
+            self._overrides = state["overrides"]
+            self._path = self._mtime = None
+
+    def unknown_products(self) -> set:
+        with self._lock:
+            return set(self._unknown)
+
+    def refresh(self, token: str, path: str, product_ids=None, max_age: float = REFRESH_SECONDS) -> int:
+        """
+        커머스 상품 API 로 캐시 갱신 후 path 에 저장
+        - product_ids: 조회할 상품 (기본: 캐시에 있는 상품 중 max_age 가 지난 것 + 주문에서 처음 본 상품)
+        - 반환: 조회한 상품 수
+        """
+        from naver_api import get_channel_product
+
+        now = time.time()
+        with self._lock:
+            products = dict(self._products)
+            options = dict(self._options)
+            unknown = set(self._unknown)
+        if product_ids is None:
+            product_ids = {pid for pid, entry in products.items() if now - entry.get("fetched_at", 0) > max_age}
+            product_ids |= unknown - set(products)
+
+        fetched = 0
+        for product_id in sorted(str(pid) for pid in product_ids):
+            try:
+                data = get_channel_product(token, product_id)
+            except Exception as e:
+                print(f"[catalog] 상품 {product_id} 조회 실패 (다음 refresh 때 재시도): {e!r}")
+                continue
+            origin = data.get("originProduct", {})
+            name = data.get("smartstoreChannelProduct", {}).get("channelProductName") or origin.get("name", "")
+            previous = products.get(product_id, {})
+            role = previous.get("role") or classify_name(name)
+            products[product_id] = {"role": role, "name": name, "fetched_at": now}
+
+            attribute = origin.get("detailAttribute", {})
+            # 옵션 조합 = 본상품의 변형 -> 상품 역할을 따름
+            for combination in attribute.get("optionInfo", {}).get("optionCombinations", []):
+                key = str(combination.get("id", ""))
+                if key:
+                    options[key] = {"role": options.get(key, {}).get("role") or role, "name": name,
+                                    "productId": product_id}
+            # 추가상품 = 추가옵션 (타월 등은 이름 규칙으로)
+            for supplement in attribute.get("supplementProductInfo", {}).get("supplementProducts", []):
+                key = str(supplement.get("id", ""))
+                if not key:
+                    continue
+                supplement_name = supplement.get("name", "")
+                supplement_role = classify_name(supplement_name)
+                if supplement_role == ROLE_MAIN:
+                    supplement_role = ROLE_SIDE
+                options[key] = {"role": options.get(key, {}).get("role") or supplement_role,
+                                "name": supplement_name, "productId": product_id}
+            with self._lock:
+                self._unknown.discard(product_id)
+            fetched += 1
+
+        if fetched:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"products": products, "options": options, "updatedAt": now}, f,
+                          ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+            with self._lock:
+                self._products, self._options = products, options
+                self._path, self._mtime = path, os.path.getmtime(path)
+        return fetched
+
+    def start_refresh(self, get_token, path: str, interval: float = 3600):
+        """
+        interval 초마다 refresh 하는 백그라운드 스레드 (daemon)
+        - get_token: 토큰을 돌려주는 함수 (토큰 만료 대비 매번 호출)
+        """
+        def _loop():
+            while True:
+                try:
+                    count = self.refresh(get_token(), path)
+                    if count:
+                        print(f"[catalog] 상품 {count}건 갱신")
+                except Exception as e:
+                    print(f"[catalog] refresh 실패: {e!r}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=_loop, name="catalog-refresh", daemon=True)
+        thread.start()
+        return thread
+
+
+# 프로세스 전체가 함께 쓰는 상품 카탈로그 (parse_orders 가 참조)
+catalog = ProductCatalog()
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# 클레임(취소/반품/교환) 관련 lastChangedType
+CLAIM_CHANGED_TYPES = ("CLAIM_REQUESTED", "COLLECT_DONE", "CLAIM_REJECTED", "CLAIM_COMPLETED")
+
+# claimStatus -> product_option_details.statement
+# - 완료/철회 상태는 claimStatus 만으로 정해짐
+CLAIM_STATUS_STATEMENTS = {
+    "CANCEL_DONE": "CANCELED",
+    "ADMIN_CANCEL_DONE": "CANCELED",
+    "RETURN_DONE": "RETURNED",
+    "EXCHANGE_DONE": "EXCHANGED",
+    # 클레임 거부/철회 -> 원래 결제완료 상태로
+    "CANCEL_REJECT": "PAYED",
+    "RETURN_REJECT": "PAYED",
+    "EXCHANGE_REJECT": "PAYED",
+}
+# - 진행 중(요청/수거중/수거완료/재배송 등)은 claimType 으로 정함
+CLAIM_TYPE_STATEMENTS = {
+    "CANCEL": "CANCEL_REQUESTED",
+    "ADMIN_CANCEL": "CANCEL_REQUESTED",
+    "RETURN": "RETURN_REQUESTED",
+    "EXCHANGE": "EXCHANGE_REQUESTED",
+}
+
+# 체크포인트가 없을 때 처음 조회할 기간
+INITIAL_LOOKBACK = timedelta(days=1)
+# 조회 시작 시각에서 이만큼 뺀 시점까지는 다 받은 것으로 보고 체크포인트를 당김 (서버와의 시계 차이 대비)
+CHECKPOINT_MARGIN = timedelta(minutes=1)
+
+
+def to_datetime(value: str) -> datetime:
+    """
+    "2025-01-07T20:49:12.0+09:00" 처럼 소수점 자리수가 제각각인 ISO8601 도 파싱
+    """
+    match = re.match(r"(.*T\d\d:\d\d:\d\d)(?:\.(\d+))?(.*)$", value)
+    if not match:
+        return datetime.fromisoformat(value)
+    fraction = (match.group(2) or "0").ljust(6, "0")[:6]
+    return datetime.fromisoformat(f"{match.group(1)}.{fraction}{match.group(3)}")
+
+
+def claim_statement(item: dict):
+    """
+    상태변경 항목 1개 -> statement (클레임이 아니거나 모르는 상태면 None)
+    """
+    status = item.get("claimStatus")
+    if status in CLAIM_STATUS_STATEMENTS:
+        return CLAIM_STATUS_STATEMENTS[status]
+    return CLAIM_TYPE_STATEMENTS.get(item.get("claimType"))
+
+
+def load_checkpoint(path: str) -> dict:
+    """
+    {lastChangedType: 마지막으로 처리한 lastChangedDate(ISO8601)}
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # 임시 파일에 쓴 뒤 교체 (중간에 죽어도 이전 체크포인트가 남음)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _fetch_type(token: str, changed_type: str, since: str):
+    from naver_api import iter_last_changed_pages
+
+    from rate_limit import PRIORITY_BACKFILL, PRIORITY_REALTIME, scheduler
+
+    started = datetime.now().astimezone()
+    if since:
+        last_changed_from = to_datetime(since)
+    else:
+        last_changed_from = started - INITIAL_LOOKBACK
+
+    # 하루 넘게 밀린 체크포인트를 따라잡는 중이면 새 주문 요청보다 뒤로
+    priority = PRIORITY_BACKFILL if started - last_changed_from > INITIAL_LOOKBACK else PRIORITY_REALTIME
+    items = []
+    latest = since
+    with scheduler.priority(priority):
+        for page in iter_last_changed_pages(token, changed_type, last_changed_from):
+            items.extend(page)
+            for item in page:
+                changed = item.get("lastChangedDate")
+                if changed and (latest is None or to_datetime(changed) > to_datetime(latest)):
+                    latest = changed
+
+    # 변경이 없던 타입도 체크포인트를 앞으로 당겨서 다음 조회 기간이 계속 늘어나지 않게 함
+    floor = started - CHECKPOINT_MARGIN
+    if latest is None or to_datetime(latest) < floor:
+        latest = floor.isoformat()
+    return items, latest
+
+
+def fetch_claim_changes(token: str, checkpoint: dict, changed_types=CLAIM_CHANGED_TYPES) -> tuple[list[dict], dict]:
+    """
+    체크포인트 이후의 클레임 상태변경을 타입별로 동시에 끝까지(페이지네이션 포함) 조회
+    - 반환: (클레임 레코드 목록 (lastChangedDate 순), 새 체크포인트)
+      레코드: {"productOrderId", "claimType", "claimStatus", "statement", "lastChangedDate"}
+    - 체크포인트 시각 자체도 다시 조회되지만 같은 레코드는 spool 에서 걸러짐
+    """
+    with ThreadPoolExecutor(max_workers=len(changed_types)) as executor:
+        futures = {
+            changed_type: executor.submit(_fetch_type, token, changed_type, checkpoint.get(changed_type))
+            for changed_type in changed_types
+        }
+        results = {changed_type: f.result() for changed_type, f in futures.items()}
+
+    records = []
+    new_checkpoint = dict(checkpoint)
+    for changed_type, (items, latest) in results.items():
+        if latest:
+            new_checkpoint[changed_type] = latest
+        for item in items:
+            statement = claim_statement(item)
+            if statement is None or not item.get("productOrderId"):
+                continue
+            records.append({
+                "productOrderId": item["productOrderId"],
+                "claimType": item.get("claimType", ""),
+                "claimStatus": item.get("claimStatus", ""),
+                "statement": statement,
+                "lastChangedDate": item.get("lastChangedDate", ""),
+            })
+
+    # 같은 주문의 상태 전이가 순서대로 적용되도록 시간순 정렬
+    records.sort(key=lambda r: to_datetime(r["lastChangedDate"]).timestamp() if r["lastChangedDate"] else 0.0)
+    return records, new_checkpoint
+
+
+def to_claim_log_rows(records: list[dict]) -> list[list]:
+    """
+    클레임 레코드 -> 시트 클레임 로그 행
+    """
+    return [
+        [r["lastChangedDate"], r["productOrderId"], r["claimType"], r["claimStatus"], r["statement"]]
+        for r in records
+    ]
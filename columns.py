@@ -0,0 +1,89 @@
+from collections import namedtuple
+
+# parse_orders() 결과 1건을 시트 행 / product_option_details 파라미터로 옮기는 컬럼 정의
+# - key: parse_orders() 결과 키 (None 이면 default 고정값)
+# - db: product_option_details 컬럼 (None 이면 DB 에 안 씀), 리스트 순서 = DB 파라미터 순서
+# - sheet: 시트 열 (None 이면 시트에 안 씀)
+# - sheet_str: 시트에는 str() 로 씀 (숫자 칸)
+# - null_if_empty: DB 에 빈 값 대신 NULL
+#   (그 외 컬럼은 None / 빈 값이면 default 로 바꿔 씀 -> NOT NULL 컬럼에 None 이 들어가 배치가 실패하지 않게)
+Column = namedtuple("Column", "key default db sheet sheet_str null_if_empty")
+
+
+def _col(key, default="", db=None, sheet=None, sheet_str=False, null_if_empty=False) -> Column:
+    return Column(key, default, db, sheet, sheet_str, null_if_empty)
+
+
+OPTION_DETAIL_SCHEMA = (
+    _col("productOrderId", db="product_order_id"),
+    _col("korName", db="kor_name", sheet="A"),                          # 한글성명
+    _col("useDate", db="use_date", sheet="B", null_if_empty=True),      # 이용날짜
+    _col("engName", db="eng_name", sheet="C"),                          # 영문성명
+    _col("adult", 0, db="adult", sheet="D", sheet_str=True),            # 성인 수
+    _col("child", 0, db="child", sheet="E", sheet_str=True),            # 아동 수
+    _col("old", 0, db="elder", sheet="F", sheet_str=True),              # 노인 수
+    _col("hotelName", db="hotel_name", sheet="G"),                      # 숙소(픽업 장소)
+    _col("sending", db="sending", sheet="H"),                           # drop 장소 (아직 파싱 안 함)
+    _col("productName", db="product_name", sheet="I"),                  # 상품명
+    _col("courseOption", db="course_option", sheet="J"),                # 코스 메인 옵션
+    _col("sideOption1", db="side_option1", sheet="K"),                  # 코스 사이드 옵션 1
+    _col("sideOption2", db="side_option2", sheet="L"),                  # 코스 사이드 옵션 2
+    _col("pickUpTime", db="pick_up_time", sheet="M"),                   # 픽업 시간 (아직 파싱 안 함)
+    _col("payMethod", db="pay_method", sheet="N"),                      # 결제방식
+    _col("airplane", db="airplane", sheet="O"),                         # 비행기
+    _col("tel", db="tel", sheet="P"),                                   # 전화번호
+    _col("tower", 0, db="tower", sheet="Q", sheet_str=True),            # 타월 갯수
+    _col("sideOption3", db="side_option3", sheet="X"),                  # 코스 사이드 옵션 3
+    _col("sideOption4", db="side_option4", sheet="Y"),                  # 코스 사이드 옵션 4
+    _col("productId", db="product_id"),
+    _col("shippingMemo", db="message", sheet="U"),                      # 배송 메모
+    _col("initialProductAmount", 0, db="initial_product_amount", sheet="V", sheet_str=True),  # 초기 상품금액
+    _col("finalProductAmount", 0, db="final_product_amount", sheet="W", sheet_str=True),      # 최종 상품금액
+    _col(None, "PAYED", db="statement"),
+    _col("hotelId", db="hotel_id"),                                     # 표준 숙소 ID (hotels.py)
+    # 시트에만 있는 빈 칸
+    _col(None, "", sheet="R"),
+    _col(None, "", sheet="S"),
+    _col(None, "", sheet="T"),
+)
+
+# product_option_details 컬럼 순서 (option_detail_params 튜플 순서와 동일)
+OPTION_DETAIL_DB_COLUMNS = tuple(c.db for c in OPTION_DETAIL_SCHEMA if c.db)
+
+# 시트 열 순서 (A, B, ..., Y)
+OPTION_DETAIL_SHEET_COLUMNS = tuple(sorted((c for c in OPTION_DETAIL_SCHEMA if c.sheet), key=lambda c: c.sheet))
+
+
+def _value_expr(column: Column, as_str: bool) -> str:
+    if column.key is None:
+        return repr(column.default)
+    if column.null_if_empty:
+        expr = f"(get({column.key!r}) or None)"
+    else:
+        expr = f"(get({column.key!r}) or {column.default!r})"
+    return f"str({expr})" if as_str else expr
+
+
+def _compile(name: str, exprs: list[str], open_: str, close: str):
+    """
+    컬럼 정의 -> dict.get 한 번씩만 부르는 행 변환 함수 (중간 변수 / 반복문 없음)
+    """
+    source = f"def {name}(row):\n    get = row.get\n    return {open_}{', '.join(exprs)}{close}\n"
+    namespace = {}
+    exec(compile(source, f"<columns.{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+# parse_orders() 결과 1건 -> product_option_details INSERT 파라미터 튜플
+option_detail_params = _compile(
+    "option_detail_params",
+    [_value_expr(c, False) for c in OPTION_DETAIL_SCHEMA if c.db],
+    "(", ",)",
+)
+
+# parse_orders() 결과 1건 -> 시트 25열 행
+option_detail_sheet_row = _compile(
+    "option_detail_sheet_row",
+    [_value_expr(c, c.sheet_str) for c in OPTION_DETAIL_SHEET_COLUMNS],
+    "[", "]",
+)
@@ -0,0 +1,141 @@
+import json
+
+# 기본 설정 (--config 로 JSON 파일을 주면 해당 키만 덮어씀)
+DEFAULT_CONFIG = {
+    "name": "default",
+    "client_id": "######################",
+    "client_secret": "###############################",
+
+    # 네이버 커머스 API 요청 한도 (초당 요청 수, None 이면 제한 없음)
+    "naver_rate_per_sec": None,
+    # 상세조회를 나눠 보낼 상품주문번호 수 (None 이면 한 번에)
+    "detail_chunk_size": None,
+    # True 면 상세조회 응답을 원소 단위로 디코딩해서 바로 파싱 (ijson 설치 시 incremental)
+    "stream_details": False,
+    # 파싱 프로세스 수 (None 이면 직렬), 상세조회 원소가 parse_parallel_min 건 이상일 때만 병렬
+    "parse_workers": None,
+    "parse_parallel_min": 5000,
+
+    # Google Sheets API 분당 요청 한도 (서비스 계정 기준, 모든 스토어가 나눠 씀)
+    "sheets_write_per_min": 60,
+    "sheets_read_per_min": 60,
+
+    # 스프레드시트 ID & JSON 키 파일 설정
+    "sheet_id": "####################################",
+    "service_account_file": "######################################",
+    "sheet_range": "input!A40",
+    # push-sheet --direct: 청크당 행 수 / 동시에 보내는 청크 수
+    "sheet_chunk_rows": 1000,
+    "sheet_write_workers": 4,
+    # 시트 행 번호(이미 쓴 주문 -> 행) 기록 위치: "spool" (노드 로컬) / "mysql" (sheet_rows, 노드 간 공유)
+    # - run-sharded 는 항상 "mysql" (같은 주문이 다른 노드로 가도 행을 다시 append 하지 않게)
+    "sheet_rows": "spool",
+
+    # DB 설정 (backend: "mysql" / "sqlite")
+    "db": {
+        "backend": "mysql",
+        "host": "###############",
+        "user": "#############",
+        "password": "##########",
+        "database": "###################",
+        # "backend": "sqlite", "path": "tripnova.db",  # 로컬 테스트용
+    },
+
+    # 클레임(취소/반품/교환) 추적기 (claims.py)
+    # - 켜면 CLAIM_COMPLETED 1일치 재조회 대신 체크포인트 이후 변경만 반영
+    "track_claims": True,
+    "claims_checkpoint_path": "claims_checkpoint.json",
+    # 클레임 상태 변경 로그를 쌓을 시트 범위 (None 이면 시트에는 쓰지 않음)
+    "sheet_claim_range": "claims!A1",
+
+    "spool_path": "spool.db",
+    # 모든 sink 가 반영한 spool 레코드를 지우기까지 보관 기간(초), None 이면 지우지 않음
+    # (지운 레코드는 같은 내용이 다시 들어와도 중복으로 걸러지지 않으므로 조회 기간보다 길게)
+    "spool_keep_seconds": 7 * 24 * 3600,
+    # sink(MySQL / 시트) 별 flush 재시도 횟수, 재시도 간격 = backoff * 시도 횟수(초)
+    "sink_retries": 2,
+    "sink_retry_backoff": 2.0,
+    "cache_dir": ".cache",
+    # 파싱에 실패한 주문을 격리하는 파일 (None 이면 실패 시 전체 중단)
+    "dead_letter_path": "dead_letter.jsonl",
+    # 상주 실행 (main.py daemon): 실행 주기(초), 상태 HTTP 엔드포인트 (status_port 가 None 이면 끔)
+    "daemon_interval": 300,
+    "status_host": "127.0.0.1",
+    "status_port": 8787,
+    # 상품 카탈로그 캐시 (catalog.py): productId / optionCode -> 역할(main/side/towel/rent_car), 상품명
+    # - product_catalog_overrides: 같은 형식으로 직접 지정 (캐시보다 우선), 예: {"options": {"123": {"role": "side"}}}
+    # - 프로세스 전역: run-stores 스토어 설정에서는 "common" 에만 (GLOBAL_STORE_KEYS)
+    # - 여러 스토어가 파일 하나를 같이 씀 (productId 는 스토어끼리 겹치지 않음)
+    "catalog_path": "product_catalog.json",
+    "product_catalog_overrides": {},
+    "catalog_refresh_seconds": 3600,
+    # 표준 숙소 사전 (hotels.py): [{"id", "name", "aliases": [...]}], hotelName -> hotel_id
+    # - hotel_match_threshold: 별칭과 완전히 같지 않을 때 trigram 유사도 기준 (0~1)
+    # - 프로세스 전역: run-stores 스토어 설정에서는 "common" 에만 (GLOBAL_STORE_KEYS)
+    "hotel_dictionary_path": "hotels.json",
+    "hotel_match_threshold": 0.6,
+    # 분석용 스냅샷 (export.py): 실행마다 spool 의 새 예약 / 상태 변경을 월별 파티션 파일로 추가
+    # - export_format: "parquet" (pyarrow 필요, 없으면 csv) 또는 "csv", export_dir 가 None 이면 끔
+    "export_dir": "export",
+    "export_format": "parquet",
+    # 상세조회 원본 보관 디렉터리 (order_archive.py, None 이면 보관 안 함)
+    "archive_dir": "archive",
+}
+
+
+def load_config(path: str = None) -> dict:
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config.update(json.load(f))
+    return config
+
+
+# 프로세스 전역 설정 (run-stores 는 시작 전에 1번만 읽으므로 스토어마다 다르게 줄 수 없음)
+GLOBAL_STORE_KEYS = ("catalog_path", "product_catalog_overrides", "hotel_dictionary_path", "hotel_match_threshold")
+
+
+def load_store_configs(path: str) -> list[dict]:
+    """
+    여러 스마트스토어 설정 파일 로드
+    파일 형식:
+    {
+      "common": {"db": {...}, "service_account_file": "..."},   # 모든 스토어 공통 (선택)
+      "stores": [
+        {"name": "store_a", "client_id": "...", "client_secret": "...", "sheet_id": "..."},
+        ...
+      ]
+    }
+    - 스토어마다 spool / 캐시 경로를 따로 잡아 서로 섞이지 않게 함
+    - GLOBAL_STORE_KEYS 는 "common" 에만 지정 (스토어에 있으면 ValueError)
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    configs = []
+    for store in data["stores"]:
+        global_keys = [key for key in GLOBAL_STORE_KEYS if key in store]
+        if global_keys:
+            raise ValueError(f"스토어별로 지정할 수 없는 설정 (common 에 지정): {store.get('name')} {global_keys}")
+        config = dict(DEFAULT_CONFIG)
+        config.update(data.get("common", {}))
+        config.update(store)
+        name = config["name"]
+        if "spool_path" not in store:
+            config["spool_path"] = f"spool-{name}.db"
+        if "cache_dir" not in store:
+            config["cache_dir"] = f".cache/{name}"
+        if "dead_letter_path" not in store:
+            config["dead_letter_path"] = f"dead_letter-{name}.jsonl"
+        if "export_dir" not in store:
+            config["export_dir"] = f"export/{name}"
+        if "archive_dir" not in store:
+            config["archive_dir"] = f"archive/{name}"
+        if "claims_checkpoint_path" not in store:
+            config["claims_checkpoint_path"] = f"claims_checkpoint-{name}.json"
+        configs.append(config)
+
+    names = [c["name"] for c in configs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"스토어 name 이 중복됨: {names}")
+    return configs
@@ -1,4 +1,172 @@
-import pymysql
+import time
+
+from columns import OPTION_DETAIL_DB_COLUMNS, option_detail_params
+from manifest import invalidate_manifest_cache
+
+# 각 테이블 컬럼 순서 (아래 *_params 함수가 만드는 튜플 순서와 동일)
+ORDER_COLUMNS = ("order_id", "order_date", "orderer_id", "orderer_name", "orderer_tel", "pay_location_type")
+
+PRODUCT_ORDER_COLUMNS = (
+    "product_order_id", "order_id", "product_name",
+    "quantity", "free_gift", "product_class", "option_code", "option_price",
+    "unit_price", "initial_payment_amount", "remain_payment_amount",
+    "initial_product_amount", "remain_product_amount", "merchant_channel_id",
+    "seller_product_code",
+)
+
+# 시트 행과 같은 컬럼 정의에서 만듦 (columns.py)
+PRODUCT_OPTION_DETAILS_COLUMNS = OPTION_DETAIL_DB_COLUMNS
+
+PENDING_CLAIMS_COLUMNS = ("product_order_id", "statement", "updated_at")
+
+ORDER_UPSERT_SQL = """
+INSERT INTO orders (order_id, order_date, orderer_id, orderer_name, orderer_tel, pay_location_type)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+  order_date=VALUES(order_date),
+  orderer_id=VALUES(orderer_id),
+  orderer_name=VALUES(orderer_name),
+  orderer_tel=VALUES(orderer_tel),
+  pay_location_type=VALUES(pay_location_type)
+"""
+
+PRODUCT_ORDER_UPSERT_SQL = """
+INSERT INTO product_orders (
+  product_order_id, order_id, product_name,
+  quantity, free_gift, product_class, option_code, option_price,
+  unit_price, initial_payment_amount, remain_payment_amount,
+  initial_product_amount, remain_product_amount, merchant_channel_id,
+  seller_product_code
+)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+  order_id=VALUES(order_id),
+  product_name=VALUES(product_name),
+  quantity=VALUES(quantity),
+  free_gift=VALUES(free_gift),
+  product_class=VALUES(product_class),
+  option_code=VALUES(option_code),
+  option_price=VALUES(option_price),
+  unit_price=VALUES(unit_price),
+  initial_payment_amount=VALUES(initial_payment_amount),
+  remain_payment_amount=VALUES(remain_payment_amount),
+  initial_product_amount=VALUES(initial_product_amount),
+  remain_product_amount=VALUES(remain_product_amount),
+  merchant_channel_id=VALUES(merchant_channel_id),
+  seller_product_code=VALUES(seller_product_code)
+"""
+
+# 이미 있는 행을 다시 upsert 할 때 덮어쓰지 않는 컬럼
+# (statement 는 처음 INSERT 때만 쓰고 이후에는 CANCEL_SQL / STATEMENT_SQL 만 바꿈
+#  -> 취소된 주문을 예전 상세조회 결과로 다시 저장해도 취소가 풀리지 않음)
+PRODUCT_OPTION_DETAILS_KEEP_ON_UPDATE = ("statement",)
+
+
+def _upsert_sql(table: str, columns, keys, keep=()) -> str:
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE col=VALUES(col) (keys / keep 컬럼은 갱신하지 않음)
+    - 컬럼 목록과 자리표시자를 같은 columns 에서 만들어 파라미터 튜플과 어긋나지 않음
+    """
+    updates = ",\n".join(f"  {c}=VALUES({c})" for c in columns if c not in keys and c not in keep)
+    return (
+        f"\nINSERT INTO {table} (\n" + ",\n".join(f"  {c}" for c in columns) + "\n)\n"
+        f"VALUES ({', '.join('%s' for _ in columns)})\n"
+        f"ON DUPLICATE KEY UPDATE\n{updates}\n"
+    )
+
+
+# 컬럼 목록은 columns.OPTION_DETAIL_SCHEMA 에서 만듦 (컬럼을 추가할 때 SQL 을 따로 고치지 않음)
+PRODUCT_OPTION_DETAILS_UPSERT_SQL = _upsert_sql(
+    "product_option_details", PRODUCT_OPTION_DETAILS_COLUMNS, ("product_order_id",),
+    keep=PRODUCT_OPTION_DETAILS_KEEP_ON_UPDATE,
+)
+
+CANCEL_SQL = "UPDATE product_option_details SET statement='CANCELED' WHERE product_order_id=%s"
+
+# 클레임 추적기(claims.py)가 넘기는 상태 변경 (statement, product_order_id)
+STATEMENT_SQL = "UPDATE product_option_details SET statement=%s WHERE product_order_id=%s"
+
+# 예약 행보다 클레임이 먼저 올 수 있으므로 상태 변경은 pending_claims 에도 남겨 두고
+# 배치 끝에 예약 행이 있는 것만 본 테이블에 반영한 뒤 지움 (RECONCILE_CLAIMS_SQL)
+PENDING_CLAIM_UPSERT_SQL = _upsert_sql("pending_claims", PENDING_CLAIMS_COLUMNS, ("product_order_id",))
+
+# 끝까지 예약 행이 안 생기는 클레임 (수집 대상이 아닌 상품 등) 보관 기간
+PENDING_CLAIM_KEEP_DAYS = 30
+
+RECONCILE_CLAIMS_SQL = [
+    """
+    UPDATE product_option_details pod
+    JOIN pending_claims pc ON pc.product_order_id = pod.product_order_id
+    SET pod.statement = pc.statement
+    """,
+    """
+    DELETE pc FROM pending_claims pc
+    JOIN product_option_details pod ON pod.product_order_id = pc.product_order_id
+    """,
+]
+
+PURGE_PENDING_CLAIMS_SQL = "DELETE FROM pending_claims WHERE updated_at < %s"
+
+
+def pending_claim_params(statements) -> list[tuple]:
+    """
+    [(productOrderId, statement), ...] -> pending_claims 파라미터 (같은 주문은 마지막 상태만)
+    """
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    latest = {i: statement for i, statement in statements if i}
+    return [(i, statement, now) for i, statement in latest.items()]
+
+
+def pending_claim_cutoff() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - PENDING_CLAIM_KEEP_DAYS * 86400))
+
+
+def order_params(order_data) -> tuple:
+    """
+    order_data(dict) -> orders INSERT 파라미터 튜플
+    """
+    order_date_str = order_data["orderDate"]
+
+    # 1) 만약 값이 빈 문자열이면 None 으로 교체
+    if not order_date_str:
+        order_date_str = None
+
+    return (
+        order_data["orderId"],
+        order_date_str,    # None -> INSERT NULL   # 파싱해서 DATETIME 형식 (e.g. 2025-01-07T20:49:12+09:00 -> 2025-01-07 20:49:12)
+        order_data["ordererId"],
+        order_data["ordererName"],
+        order_data["ordererTel"],
+        order_data["payLocationType"]
+    )
+
+
+def product_order_params(product_order_data) -> tuple:
+    """
+    product_order_data(dict) -> product_orders INSERT 파라미터 튜플
+    """
+    return (
+        product_order_data["productOrderId"],
+        product_order_data["orderId"],
+        product_order_data["productName"],
+        product_order_data["quantity"],
+        product_order_data["freeGift"],
+        product_order_data["productClass"],
+        product_order_data["optionCode"],
+        product_order_data["optionPrice"],
+        product_order_data["unitPrice"],
+        product_order_data["initialPaymentAmount"],
+        product_order_data["remainPaymentAmount"],
+        product_order_data["initialProductAmount"],
+        product_order_data["remainProductAmount"],
+        product_order_data["merchantChannelId"],
+        product_order_data["sellerProductCode"]
+    )
+
+
+# parse_orders() 결과 dict -> product_option_details INSERT 파라미터 튜플 (columns.OPTION_DETAIL_SCHEMA 로 생성)
+product_option_details_params = option_detail_params
+
 
 def save_order_to_db(connection, order_data):
     """
@@ -12,32 +180,8 @@ def save_order_to_db(connection, order_data):
         "payLocationType": str
       }
     """
-
-    order_date_str = order_data["orderDate"]
-
-    # 1) 만약 값이 빈 문자열이면 None 으로 교체
-    if not order_date_str:
-        order_date_str = None
-
     with connection.cursor() as cursor:
-        sql = """
-        INSERT INTO orders (order_id, order_date, orderer_id, orderer_name, orderer_tel, pay_location_type)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE 
-          order_date=VALUES(order_date),
-          orderer_id=VALUES(orderer_id),
-          orderer_name=VALUES(orderer_name),
-          orderer_tel=VALUES(orderer_tel),
-          pay_location_type=VALUES(pay_location_type)
-        """
-        cursor.execute(sql, (
-            order_data["orderId"],
-            order_date_str,    # None -> INSERT NULL   # 파싱해서 DATETIME 형식 (e.g. 2025-01-07T20:49:12+09:00 -> 2025-01-07 20:49:12)
-            order_data["ordererId"],
-            order_data["ordererName"],
-            order_data["ordererTel"],
-            order_data["payLocationType"]
-        ))
+        cursor.execute(ORDER_UPSERT_SQL, order_params(order_data))
     connection.commit()
 
 
@@ -54,48 +198,7 @@ def save_product_order_to_db(connection, product_order_data):
       }
     """
     with connection.cursor() as cursor:
-        sql = """
-        INSERT INTO product_orders (
-          product_order_id, order_id, product_name,
-          quantity, free_gift, product_class, option_code, option_price,
-          unit_price, initial_payment_amount, remain_payment_amount,
-          initial_product_amount, remain_product_amount, merchant_channel_id,
-          seller_product_code
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-          order_id=VALUES(order_id),
-          product_name=VALUES(product_name),
-          quantity=VALUES(quantity),
-          free_gift=VALUES(free_gift), 
-          product_class=VALUES(product_class),
-          option_code=VALUES(option_code),
-          option_price=VALUES(option_price),
-          unit_price=VALUES(unit_price),
-          initial_payment_amount=VALUES(initial_payment_amount),
-          remain_payment_amount=VALUES(remain_payment_amount),
-          initial_product_amount=VALUES(initial_product_amount),
-          remain_product_amount=VALUES(remain_product_amount),
-          merchant_channel_id=VALUES(merchant_channel_id),
-          seller_product_code=VALUES(seller_product_code)
-        """
-        cursor.execute(sql, (
-            product_order_data["productOrderId"],
-            product_order_data["orderId"],
-            product_order_data["productName"],
-            product_order_data["quantity"],
-            product_order_data["freeGift"],
-            product_order_data["productClass"],
-            product_order_data["optionCode"],
-            product_order_data["optionPrice"],
-            product_order_data["unitPrice"],
-            product_order_data["initialPaymentAmount"],
-            product_order_data["remainPaymentAmount"],
-            product_order_data["initialProductAmount"],
-            product_order_data["remainProductAmount"],
-            product_order_data["merchantChannelId"],
-            product_order_data["sellerProductCode"]
-        ))
+        cursor.execute(PRODUCT_ORDER_UPSERT_SQL, product_order_params(product_order_data))
     connection.commit()
 
 
@@ -126,101 +229,151 @@ def save_product_option_details(connection, row_data):
       "day3": "",
       "message": "메모",
       "initial_product_amount": 300000,
-      "final_product_amount": 250000
+      "final_product_amount": 250000,
+      "hotel_id": "coral-bay"
     }
     """
+    params = product_option_details_params(row_data)
+    with connection.cursor() as cursor:
+        cursor.execute(PRODUCT_OPTION_DETAILS_UPSERT_SQL, params)
+    connection.commit()
+    # 읽기 쪽(manifest) 캐시 무효화
+    invalidate_manifest_cache([params[2]])
 
-    sql = """
-    INSERT INTO product_option_details (
-      product_order_id,
-      kor_name,
-      use_date,
-      eng_name,
-      adult,
-      child,
-      elder,
-      hotel_name,
-      sending,
-      product_name,
-      course_option,
-      side_option1,
-      side_option2,
-      pick_up_time,
-      pay_method,
-      airplane,
-      tel,
-      tower,
-      side_option3,
-      side_option4,
-      product_id,
-      message,
-      initial_product_amount,
-      final_product_amount,
-      statement
-    )
-    VALUES (
-      %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-      %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-      %s, %s, %s, %s, %s
-    )
-    ON DUPLICATE KEY UPDATE
-      kor_name=VALUES(kor_name),
-      use_date=VALUES(use_date),
-      eng_name=VALUES(eng_name),
-      adult=VALUES(adult),
-      child=VALUES(child),
-      elder=VALUES(elder),
-      hotel_name=VALUES(hotel_name),
-      sending=VALUES(sending),
-      product_name=VALUES(product_name),
-      course_option=VALUES(course_option),
-      side_option1=VALUES(side_option1),
-      side_option2=VALUES(side_option2),
-      pick_up_time=VALUES(pick_up_time),
-      pay_method=VALUES(pay_method),
-      airplane=VALUES(airplane),
-      tel=VALUES(tel),
-      tower=VALUES(tower),
-      side_option3=VALUES(side_option3),
-      side_option4=VALUES(side_option4),
-      product_id=VALUES(product_id),
-      message=VALUES(message),
-      initial_product_amount=VALUES(initial_product_amount),
-      final_product_amount=VALUES(final_product_amount),
-      statement=VALUES(statement)
-    """
-
-    order_date_str = row_data.get("useDate", None)
-    # 1) 만약 값이 빈 문자열이면 None 으로 교체
-    if not order_date_str:
-        order_date_str = None
 
+def save_product_option_details_many(connection, rows):
+    """
+    save_product_option_details 의 다건 버전 (executemany + 1회 commit)
+    """
+    params_list = [product_option_details_params(row) for row in rows]
+    if not params_list:
+        return
     with connection.cursor() as cursor:
-        cursor.execute(sql, (
-            row_data.get("productOrderId",""),
-            row_data.get("korName",""),
-            order_date_str,  # use_date -> DATETIME or str
-            row_data.get("engName",""),
-            row_data.get("adult",0),
-            row_data.get("child",0),
-            row_data.get("old",0),
-            row_data.get("hotelName",""),
-            row_data.get("sending",""),
-            row_data.get("productName",""),
-            row_data.get("courseOption",""),
-            row_data.get("sideOption1",""),
-            row_data.get("sideOption2",""),
-            row_data.get("pickUpTime",""),
-            row_data.get("payMethod",""),
-            row_data.get("airplane",""),
-            row_data.get("tel",""),
-            row_data.get("tower",0),
-            row_data.get("sideOption3",""),
-            row_data.get("sideOption4",""),
-            row_data.get("product_id",""),
-            row_data.get("shippingMemo",""),
-            row_data.get("initialProductAmount",0),
-            row_data.get("finalProductAmount",0),
-            "PAYED"
-        ))
+        cursor.executemany(PRODUCT_OPTION_DETAILS_UPSERT_SQL, params_list)
     connection.commit()
+    invalidate_manifest_cache({params[2] for params in params_list})
+
+
+def mark_canceled(connection, product_order_ids) -> int:
+    """
+    product_option_details.statement 를 'CANCELED' 로 변경
+    - 반환: 처리한 productOrderId 개수
+    """
+    ids = [(product_order_id,) for product_order_id in product_order_ids if product_order_id]
+    if ids:
+        with connection.cursor() as cursor:
+            cursor.executemany(CANCEL_SQL, ids)
+        connection.commit()
+        invalidate_manifest_cache()
+    return len(ids)
+
+
+# 배치 전체를 다시 시도해도 되는 오류 (1213: deadlock, 1205: lock wait timeout)
+RETRYABLE_ERROR_CODES = (1213, 1205)
+
+
+def save_batch(connection, orders=(), product_orders=(), option_details=(), canceled_ids=(),
+               statements=(), max_retries: int = 3) -> dict:
+    """
+    Unit of work: orders / product_orders / product_option_details / 취소 처리 / 클레임 상태 변경을
+    한 트랜잭션으로 쓰고 1번만 commit
+    - statements: [(productOrderId, statement), ...] 순서대로 적용 (같은 주문은 마지막 상태가 남음)
+      예약 행이 아직 없는 주문은 pending_claims 에 두었다가 예약 행이 저장되는 배치에서 반영
+    - 중간에 죽어도 orders 만 있고 product_orders 가 없는 상태가 남지 않음
+    - deadlock / lock wait timeout 이면 rollback 후 이 배치만 재시도
+    - 반환: 테이블별 처리 건수
+    """
+    import pymysql  # 실제 DB 단계에서만 import
+
+    order_params_list = [order_params(o) for o in orders]
+    product_order_params_list = [product_order_params(p) for p in product_orders]
+    option_params_list = [product_option_details_params(d) for d in option_details]
+    cancel_params_list = [(i,) for i in canceled_ids if i]
+    statement_params_list = [(statement, i) for i, statement in statements if i]
+    pending_params_list = pending_claim_params(statements)
+
+    for attempt in range(1, max_retries + 1):
+        try:
+            with connection.cursor() as cursor:
+                if order_params_list:
+                    cursor.executemany(ORDER_UPSERT_SQL, order_params_list)
+                if product_order_params_list:
+                    cursor.executemany(PRODUCT_ORDER_UPSERT_SQL, product_order_params_list)
+                if option_params_list:
+                    cursor.executemany(PRODUCT_OPTION_DETAILS_UPSERT_SQL, option_params_list)
+                if cancel_params_list:
+                    cursor.executemany(CANCEL_SQL, cancel_params_list)
+                if statement_params_list:
+                    cursor.executemany(STATEMENT_SQL, statement_params_list)
+                    cursor.executemany(PENDING_CLAIM_UPSERT_SQL, pending_params_list)
+                    cursor.execute(PURGE_PENDING_CLAIMS_SQL, (pending_claim_cutoff(),))
+                if option_params_list or statement_params_list:
+                    for sql in RECONCILE_CLAIMS_SQL:
+                        cursor.execute(sql)
+            connection.commit()
+            break
+        except pymysql.err.OperationalError as e:
+            connection.rollback()
+            if e.args[0] not in RETRYABLE_ERROR_CODES or attempt == max_retries:
+                raise
+            print(f"[Attempt {attempt}] 배치 저장 재시도 ({e.args[0]}): {e}")
+            time.sleep(0.2 * attempt)
+        except Exception:
+            connection.rollback()
+            raise
+
+    if cancel_params_list or statement_params_list:
+        invalidate_manifest_cache()
+    elif option_params_list:
+        invalidate_manifest_cache({params[2] for params in option_params_list})
+
+    return {
+        "orders": len(order_params_list),
+        "product_orders": len(product_order_params_list),
+        "product_option_details": len(option_params_list),
+        "canceled": len(cancel_params_list),
+        "statements": len(statement_params_list),
+    }
+
+
+def order_data_from_detail(elem) -> dict:
+    """
+    상품 주문 상세 응답의 data[] 원소 1개 -> save_order_to_db 용 order_data
+    """
+    po = elem.get("productOrder", {})
+    # order 는 productOrder 와 같은 레벨 (예전 응답 형식 대비 productOrder 안쪽도 확인)
+    order_info = elem.get("order") or po.get("order", {})
+    return {
+        "orderId": order_info.get("orderId", ""),
+        "orderDate": order_info.get("orderDate", ""),  # "2025-01-07T20:49:12.0+09:00" -> 필요시 문자열 파싱
+        "ordererId": order_info.get("ordererId", ""),
+        "ordererName": order_info.get("ordererName", ""),
+        "ordererTel": order_info.get("ordererTel", ""),
+        "payLocationType": order_info.get("payLocationType", "")
+    }
+
+
+def product_order_data_from_detail(elem) -> dict:
+    """
+    상품 주문 상세 응답의 data[] 원소 1개 -> save_product_order_to_db 용 product_order_data
+    """
+    po = elem.get("productOrder", {})
+    order_info = elem.get("order") or po.get("order", {})
+    return {
+        "productOrderId": po.get("productOrderId", ""),
+        "orderId": order_info.get("orderId", ""),
+        "productName": po.get("productName", ""),
+        "productOption": po.get("productOption", ""),
+        "quantity": po.get("quantity", 0),
+        "freeGift": po.get("freeGift", ""),
+        "productClass": po.get("productClass", ""),
+        "optionCode": po.get("optionCode", ""),
+        "optionPrice": po.get("optionPrice", 0),
+        "unitPrice": po.get("unitPrice", 0),
+        "initialPaymentAmount": po.get("initialPaymentAmount", 0),
+        "remainPaymentAmount": po.get("remainPaymentAmount", 0),
+        "initialProductAmount": po.get("initialProductAmount", 0),
+        "remainProductAmount": po.get("remainProductAmount", 0),
+        "merchantChannelId": po.get("merchantChannelId", ""),
+        "sellerProductCode": po.get("sellerProductCode", "")
+    }
@@ -0,0 +1,238 @@
+# 스키마 버전 관리 테이블
+SCHEMA_VERSION_TABLE = "schema_migrations"
+
+# (버전, 설명, [DDL ...]) 순서대로 적용
+# - 이미 적용된 버전은 schema_migrations 에 기록되어 다시 실행하지 않음
+# - 컬럼 타입은 db_mysql.save_* 함수에 넘기는 값 기준
+MIGRATIONS = [
+    (1, "create orders / product_orders / product_option_details", [
+        """
+        CREATE TABLE IF NOT EXISTS orders (
+          order_id          VARCHAR(32)  NOT NULL,
+          order_date        DATETIME     NULL,
+          orderer_id        VARCHAR(64)  NOT NULL DEFAULT '',
+          orderer_name      VARCHAR(100) NOT NULL DEFAULT '',
+          orderer_tel       VARCHAR(32)  NOT NULL DEFAULT '',
+          pay_location_type VARCHAR(16)  NOT NULL DEFAULT '',
+          PRIMARY KEY (order_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_orders (
+          product_order_id       VARCHAR(32)  NOT NULL,
+          order_id               VARCHAR(32)  NOT NULL,
+          product_name           VARCHAR(255) NOT NULL DEFAULT '',
+          quantity               INT          NOT NULL DEFAULT 0,
+          free_gift              VARCHAR(255) NOT NULL DEFAULT '',
+          product_class          VARCHAR(64)  NOT NULL DEFAULT '',
+          option_code            VARCHAR(64)  NOT NULL DEFAULT '',
+          option_price           INT          NOT NULL DEFAULT 0,
+          unit_price             INT          NOT NULL DEFAULT 0,
+          initial_payment_amount INT          NOT NULL DEFAULT 0,
+          remain_payment_amount  INT          NOT NULL DEFAULT 0,
+          initial_product_amount INT          NOT NULL DEFAULT 0,
+          remain_product_amount  INT          NOT NULL DEFAULT 0,
+          merchant_channel_id    VARCHAR(64)  NOT NULL DEFAULT '',
+          seller_product_code    VARCHAR(64)  NOT NULL DEFAULT '',
+          PRIMARY KEY (product_order_id),
+          KEY idx_product_orders_order_id (order_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_option_details (
+          product_order_id       VARCHAR(32)       NOT NULL,
+          kor_name               VARCHAR(100)      NOT NULL DEFAULT '',
+          use_date               DATE              NULL,
+          eng_name               VARCHAR(100)      NOT NULL DEFAULT '',
+          adult                  SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+          child                  SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+          elder                  SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+          hotel_name             VARCHAR(255)      NOT NULL DEFAULT '',
+          sending                VARCHAR(100)      NOT NULL DEFAULT '',
+          product_name           VARCHAR(255)      NOT NULL DEFAULT '',
+          course_option          VARCHAR(255)      NOT NULL DEFAULT '',
+          side_option1           VARCHAR(255)      NOT NULL DEFAULT '',
+          side_option2           VARCHAR(255)      NOT NULL DEFAULT '',
+          pick_up_time           VARCHAR(16)       NOT NULL DEFAULT '',
+          pay_method             VARCHAR(16)       NOT NULL DEFAULT '',
+          airplane               VARCHAR(32)       NOT NULL DEFAULT '',
+          tel                    VARCHAR(32)       NOT NULL DEFAULT '',
+          tower                  SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+          side_option3           VARCHAR(255)      NOT NULL DEFAULT '',
+          side_option4           VARCHAR(255)      NOT NULL DEFAULT '',
+          product_id             VARCHAR(32)       NOT NULL DEFAULT '',
+          message                VARCHAR(500)      NOT NULL DEFAULT '',
+          initial_product_amount INT               NOT NULL DEFAULT 0,
+          final_product_amount   INT               NOT NULL DEFAULT 0,
+          statement              VARCHAR(32)       NOT NULL DEFAULT 'PAYED',
+          PRIMARY KEY (product_order_id),
+          KEY idx_pod_use_date (use_date),
+          KEY idx_pod_statement (statement, use_date)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (2, "create shard_leases (multi-worker shard claims)", [
+        """
+        CREATE TABLE IF NOT EXISTS shard_leases (
+          cycle      BIGINT      NOT NULL,
+          shard      INT         NOT NULL,
+          owner      VARCHAR(64) NOT NULL,
+          claimed_at DATETIME    NOT NULL,
+          done_at    DATETIME    NULL,
+          PRIMARY KEY (cycle, shard)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (3, "add product_option_details.hotel_id (canonical hotel)", [
+        """
+        ALTER TABLE product_option_details
+          ADD COLUMN hotel_id VARCHAR(64) NOT NULL DEFAULT '' AFTER hotel_name,
+          ADD KEY idx_pod_hotel (use_date, hotel_id)
+        """,
+    ]),
+    (4, "widen customer free-text columns of product_option_details", [
+        # 고객이 직접 입력한 값이라 길이를 예측할 수 없음 (한 건이 길면 배치 전체가 1406 으로 실패)
+        """
+        ALTER TABLE product_option_details
+          MODIFY kor_name     VARCHAR(255) NOT NULL DEFAULT '',
+          MODIFY eng_name     VARCHAR(255) NOT NULL DEFAULT '',
+          MODIFY sending      VARCHAR(255) NOT NULL DEFAULT '',
+          MODIFY pick_up_time VARCHAR(255) NOT NULL DEFAULT '',
+          MODIFY pay_method   VARCHAR(255) NOT NULL DEFAULT '',
+          MODIFY airplane     VARCHAR(255) NOT NULL DEFAULT '',
+          MODIFY tel          VARCHAR(255) NOT NULL DEFAULT ''
+        """,
+    ]),
+    (5, "create sheet_rows (sheet row numbers shared by sharded nodes)", [
+        """
+        CREATE TABLE IF NOT EXISTS sheet_rows (
+          sheet_key        VARCHAR(191) NOT NULL,
+          product_order_id VARCHAR(32)  NOT NULL,
+          row_number       INT          NOT NULL,
+          PRIMARY KEY (sheet_key, product_order_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+    (6, "create pending_claims (claims that arrive before their reservation row)", [
+        """
+        CREATE TABLE IF NOT EXISTS pending_claims (
+          product_order_id VARCHAR(32) NOT NULL,
+          statement        VARCHAR(32) NOT NULL,
+          updated_at       DATETIME    NOT NULL,
+          PRIMARY KEY (product_order_id),
+          KEY idx_pending_claims_updated_at (updated_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """,
+    ]),
+]
+
+
+def get_schema_version(connection) -> int:
+    """
+    현재 적용된 스키마 버전 반환 (아무것도 적용 안 됐으면 0)
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+          version     INT          NOT NULL,
+          description VARCHAR(255) NOT NULL DEFAULT '',
+          applied_at  DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (version)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}")
+        (version,) = cursor.fetchone()
+    connection.commit()
+    return int(version)
+
+
+def migrate(connection, target_version: int = None) -> int:
+    """
+    MIGRATIONS 중 아직 적용되지 않은 버전을 순서대로 적용
+    - target_version: 지정 시 해당 버전까지만 적용
+    - 반환: 적용 후 스키마 버전
+    """
+    current = get_schema_version(connection)
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        if target_version is not None and version > target_version:
+            break
+
+        # 1) DDL 실행 (MySQL DDL은 암묵적 커밋이라 버전 단위로 기록)
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+            # 2) 적용 버전 기록
+            cursor.execute(
+                f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+        connection.commit()
+        current = version
+        print(f"스키마 마이그레이션 적용: v{version} ({description})")
+
+    return current
+
+
+# 파이프라인이 실제로 사용하는 조회/갱신 경로
+# - upsert 는 PK 중복 검사, 취소 처리는 product_order_id 갱신, 조회는 use_date 범위 / statement / order_id 조인
+PIPELINE_QUERIES = {
+    "upsert_orders": (
+        "SELECT order_id FROM orders WHERE order_id=%s",
+        ("0",),
+    ),
+    "upsert_product_orders": (
+        "SELECT product_order_id FROM product_orders WHERE product_order_id=%s",
+        ("0",),
+    ),
+    "upsert_product_option_details": (
+        "SELECT product_order_id FROM product_option_details WHERE product_order_id=%s",
+        ("0",),
+    ),
+    "cancel_update": (
+        "UPDATE product_option_details SET statement='CANCELED' WHERE product_order_id=%s",
+        ("0",),
+    ),
+    "use_date_range": (
+        "SELECT product_order_id FROM product_option_details WHERE use_date >= %s AND use_date < %s",
+        ("2025-01-01", "2025-01-02"),
+    ),
+    "statement_filter": (
+        "SELECT product_order_id FROM product_option_details WHERE statement=%s AND use_date >= %s",
+        ("CANCELED", "2025-01-01"),
+    ),
+    "order_join": (
+        "SELECT o.order_id, po.product_order_id FROM orders o "
+        "JOIN product_orders po ON po.order_id = o.order_id WHERE o.order_id=%s",
+        ("0",),
+    ),
+}
+
+
+def check_query_plans(connection, min_rows: int = 1000) -> list[str]:
+    """
+    PIPELINE_QUERIES 를 EXPLAIN 해서 인덱스를 타지 않는 경로를 찾는다.
+    - 사용할 수 있는 인덱스가 아예 없으면 문제로 보고
+    - 풀스캔(type=ALL)인데 예상 rows 가 min_rows 이상이면 문제로 보고
+      (작은 테이블에서는 옵티마이저가 일부러 풀스캔을 고르기도 하므로)
+    - 반환: 문제 설명 문자열 리스트 (비어 있으면 정상)
+    """
+    import pymysql
+
+    problems = []
+    with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+        for name, (sql, params) in PIPELINE_QUERIES.items():
+            cursor.execute("EXPLAIN " + sql, params)
+            for plan in cursor.fetchall():
+                table = plan.get("table")
+                if not table or table.startswith("<"):
+                    # 파생 테이블/상수 최적화 행은 건너뜀
+                    continue
+                rows = plan.get("rows") or 0
+                if not plan.get("possible_keys") and not plan.get("key"):
+                    problems.append(f"{name}: {table} 에 사용할 인덱스 없음 (type={plan.get('type')}, rows={rows})")
+                elif plan.get("type") == "ALL" and rows >= min_rows:
+                    problems.append(f"{name}: {table} 풀스캔 (rows={rows})")
+    return problems
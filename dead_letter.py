@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+import traceback
+
+
+class DeadLetterStore:
+    """
+    파싱에 실패한 주문을 원본 그대로 보관하는 로컬 JSONL 파일 (한 줄 = 실패 1건)
+    {"stage": "parse", "key": orderId, "error": "...", "traceback": "...",
+     "payload": {"data": [원본 data[] 원소, ...]}, "failed_at": ...}
+    - DB 가 거부한 spool 레코드도 같은 파일에 stage "storage", payload {"kind", "record"} 로 보관
+    - 실패한 주문만 여기로 빼고 나머지 배치는 그대로 sink 로 흘려보냄
+    - main.py reprocess 가 나중에 다시 파싱해서 성공한 것만 지움
+    """
+
+    def __init__(self, path: str = "dead_letter.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, key: str, payload: dict, error: BaseException):
+        entry = {
+            "stage": stage,
+            "key": key,
+            "error": repr(error),
+            "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__)),
+            "payload": payload,
+            "failed_at": time.time(),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _read(self) -> list[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entries(self, stage: str = None) -> list[dict]:
+        """
+        (stage, key) 별 마지막 실패만 반환, attempts = 실패 기록 수
+        - 조회 기간이 겹쳐 같은 주문이 여러 번 실패해도 1건으로 봄
+        """
+        with self._lock:
+            lines = self._read()
+        latest = {}
+        for entry in lines:
+            if stage is not None and entry["stage"] != stage:
+                continue
+            k = (entry["stage"], entry["key"])
+            attempts = latest[k]["attempts"] + 1 if k in latest else 1
+            latest[k] = dict(entry, attempts=attempts)
+        return list(latest.values())
+
+    def remove(self, stage: str, keys) -> int:
+        """
+        다시 처리에 성공한 key 들을 파일에서 지움 (임시 파일에 쓴 뒤 교체)
+        - 반환: 지운 줄 수
+        """
+        keys = set(keys)
+        with self._lock:
+            lines = self._read()
+            kept = [e for e in lines if not (e["stage"] == stage and e["key"] in keys)]
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in kept:
+                    f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(tmp, self.path)
+        return len(lines) - len(kept)
+
+    def count(self) -> int:
+        return len(self.entries())
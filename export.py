@@ -0,0 +1,176 @@
+import csv
+import os
+import time
+from datetime import date, datetime
+
+# 분석용 스냅샷 (spool -> export_dir 아래 파티션 파일)
+# - bookings/use_month=YYYY-MM/part-<첫 seq>.parquet : 예약 1건 = 1행 (이름 / 전화번호 등 개인정보는 빼고 씀)
+# - status_changes/month=YYYY-MM/part-<첫 seq>.parquet : 취소 / 클레임 상태 변경
+# - 같은 주문이 다시 spool 에 들어오면(내용 변경) 새 행이 추가됨 -> product_order_id 별 spool_seq 최댓값이 최신
+# - 파일 이름이 배치의 첫 seq 로 정해지므로 중간에 죽고 다시 실행해도 같은 파일을 덮어씀 (중복 없음)
+
+# (컬럼, 타입, parse_orders() 결과 키)
+BOOKING_COLUMNS = (
+    ("spool_seq", "int64", None),
+    ("product_order_id", "string", "productOrderId"),
+    ("order_id", "string", "orderId"),
+    ("product_id", "string", "productId"),
+    ("use_date", "date", "useDate"),
+    ("product_name", "string", "productName"),
+    ("course_option", "string", "courseOption"),
+    ("side_option1", "string", "sideOption1"),
+    ("side_option2", "string", "sideOption2"),
+    ("side_option3", "string", "sideOption3"),
+    ("side_option4", "string", "sideOption4"),
+    ("hotel_id", "string", "hotelId"),
+    ("hotel_name", "string", "hotelName"),
+    ("pay_method", "string", "payMethod"),
+    ("adult", "int64", "adult"),
+    ("child", "int64", "child"),
+    ("elder", "int64", "old"),
+    ("tower", "int64", "tower"),
+    ("initial_product_amount", "int64", "initialProductAmount"),
+    ("final_product_amount", "int64", "finalProductAmount"),
+    ("exported_at", "float64", None),
+)
+
+STATUS_CHANGE_COLUMNS = (
+    ("spool_seq", "int64", None),
+    ("product_order_id", "string", "productOrderId"),
+    ("statement", "string", "statement"),
+    ("claim_type", "string", "claimType"),
+    ("changed_at", "string", "lastChangedDate"),
+    ("exported_at", "float64", None),
+)
+
+EXPORT_FORMATS = ("parquet", "csv")
+
+# pyarrow 없음 안내는 프로세스당 1번만
+_warned_no_pyarrow = False
+
+
+def _to_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _convert(value, type_: str):
+    if type_ == "date":
+        return _to_date(value)
+    if type_ == "int64":
+        try:
+            return int(value or 0)
+        except (TypeError, ValueError):
+            return 0
+    if type_ == "float64":
+        return float(value or 0)
+    return "" if value is None else str(value)
+
+
+def _row(columns, seq: int, record: dict, exported_at: float) -> dict:
+    row = {}
+    for name, type_, key in columns:
+        if name == "spool_seq":
+            row[name] = seq
+        elif name == "exported_at":
+            row[name] = exported_at
+        else:
+            row[name] = _convert(record.get(key), type_)
+    return row
+
+
+def _resolve_format(fmt: str) -> str:
+    """
+    parquet 은 pyarrow 가 있을 때만 (없으면 csv 로 대신 씀)
+    """
+    global _warned_no_pyarrow
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"알 수 없는 export_format: {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            if not _warned_no_pyarrow:
+                print("[export] pyarrow 가 없어 csv 로 내보냄 (pip install pyarrow)")
+                _warned_no_pyarrow = True
+            return "csv"
+    return fmt
+
+
+def _write_part(path: str, columns, rows: list[dict], fmt: str):
+    """
+    파티션 파일 1개를 임시 파일에 쓴 뒤 교체
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "date": pa.date32()}
+        schema = pa.schema([(name, types[type_]) for name, type_, _ in columns])
+        table = pa.Table.from_pylist(rows, schema=schema)
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[name for name, _, _ in columns])
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({k: v.isoformat() if isinstance(v, date) else v for k, v in row.items()})
+    os.replace(tmp, path)
+
+
+def _partitioned(rows: list[dict], key) -> dict:
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(key(row), []).append(row)
+    return partitions
+
+
+def flush_to_export(spool, export_dir: str, fmt: str = "parquet", sink: str = "export",
+                    batch_size: int = 50000) -> int:
+    """
+    spool -> 월별 파티션 파일 (이번 실행에서 새로 들어온 레코드만, sink 진행 위치는 spool 이 기록)
+    - option_detail -> bookings, cancel / claim -> status_changes, 나머지 kind 는 건너뛰고 ack
+    - MySQL 은 읽지 않음 (분석 쿼리가 운영 DB 와 경쟁하지 않도록)
+    - 반환: 쓴 행 수
+    """
+    fmt = _resolve_format(fmt)
+    total = 0
+    while True:
+        records = spool.pending(sink, limit=batch_size)
+        if not records:
+            return total
+
+        exported_at = time.time()
+        first_seq = records[0][0]
+        bookings, changes = [], []
+        for seq, kind, record in records:
+            if kind == "option_detail":
+                bookings.append(_row(BOOKING_COLUMNS, seq, record, exported_at))
+            elif kind == "cancel":
+                changes.append(_row(STATUS_CHANGE_COLUMNS, seq, dict(record, statement="CANCELED"), exported_at))
+            elif kind == "claim":
+                changes.append(_row(STATUS_CHANGE_COLUMNS, seq, record, exported_at))
+
+        # 이용날짜가 없는 예약은 use_month=unknown
+        by_month = _partitioned(bookings,
+                                lambda row: row["use_date"].strftime("%Y-%m") if row["use_date"] else "unknown")
+        for month, rows in by_month.items():
+            path = os.path.join(export_dir, "bookings", f"use_month={month}", f"part-{first_seq:012d}.{fmt}")
+            _write_part(path, BOOKING_COLUMNS, rows, fmt)
+
+        change_month = time.strftime("%Y-%m", time.localtime(exported_at))
+        # 변경 시각이 없는 취소(feeds)는 내보낸 달로
+        by_month = _partitioned(changes, lambda row: row["changed_at"][:7] or change_month)
+        for month, rows in by_month.items():
+            path = os.path.join(export_dir, "status_changes", f"month={month}", f"part-{first_seq:012d}.{fmt}")
+            _write_part(path, STATUS_CHANGE_COLUMNS, rows, fmt)
+
+        spool.ack(sink, records[-1][0])
+        total += len(bookings) + len(changes)
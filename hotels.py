@@ -0,0 +1,179 @@
+import json
+import os
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+# 정규화 키에서 지우는 문자 (공백 / 문장부호 / 밑줄)
+_NOISE = re.compile(r"[\W_]+", re.UNICODE)
+
+# 고객이 붙이기도 하고 빼기도 하는 일반 단어 (core 키에서 단어 단위로 지움 -> "spanish" 의 "spa" 는 안 지움)
+# 띄어 쓴 항목은 연속된 단어로 맞춤 ("Phu Quoc")
+GENERIC_WORDS = ("phu quoc", "phuquoc", "푸꾸옥", "viet nam", "vietnam", "베트남", "resort", "리조트",
+                 "hotel", "호텔", "spa", "스파", "and")
+
+# 한글 일반 단어는 띄어 쓰지 않고 붙여 쓰는 경우가 많아 단어 끝에 붙은 것도 지움 ("코랄베이리조트" -> "코랄베이")
+_HANGUL_SUFFIXES = tuple(word for word in GENERIC_WORDS if not word.isascii())
+
+# trigram 유사도(Dice) 가 이 값 이상이면 같은 숙소로 봄
+DEFAULT_MATCH_THRESHOLD = 0.6
+
+
+def _words(raw: str) -> list[str]:
+    # 전각/반각, 대소문자를 맞춘 뒤 공백 / 문장부호 / 밑줄 기준으로 나눈 단어
+    return [word for word in _NOISE.split(unicodedata.normalize("NFKC", raw or "").lower()) if word]
+
+
+# 긴 구절부터 맞춤
+_GENERIC_PHRASES = sorted({tuple(_words(word)) for word in GENERIC_WORDS}, key=len, reverse=True)
+
+
+def normalize_hotel(raw: str) -> str:
+    """
+    "Coral Bay Resort  (푸꾸옥)" -> "coralbayresort푸꾸옥"
+    - 전각/반각, 대소문자, 공백, 문장부호 차이를 없앰
+    """
+    return "".join(_words(raw))
+
+
+def _core_key(raw: str) -> str:
+    """
+    "Coral Bay Resort & Spa (푸꾸옥)" -> "coralbay"
+    - 공백을 없애기 전 단어 단위로 GENERIC_WORDS 를 지움
+    """
+    words = _words(raw)
+    core = []
+    i = 0
+    while i < len(words):
+        phrase = next((p for p in _GENERIC_PHRASES if tuple(words[i:i + len(p)]) == p), None)
+        if phrase is not None:
+            i += len(phrase)
+            continue
+        word = words[i]
+        i += 1
+        for suffix in _HANGUL_SUFFIXES:
+            if len(word) > len(suffix) and word.endswith(suffix):
+                word = word[:-len(suffix)]
+                break
+        core.append(word)
+    return "".join(core)
+
+
+def _trigrams(key: str) -> frozenset:
+    if len(key) < 3:
+        return frozenset((key,)) if key else frozenset()
+    return frozenset(key[i:i + 3] for i in range(len(key) - 2))
+
+
+class HotelDictionary:
+    """
+    고객이 자유롭게 입력한 숙소 이름(hotelName) -> 표준 숙소 ID
+    - 사전 파일 형식 (hotel_dictionary_path):
+      [{"id": "coral-bay", "name": "코랄베이 리조트", "aliases": ["Coral Bay Resort", "코랄베이"]}, ...]
+    - 조회 순서 (앞에서 찾으면 끝)
+      1) 정규화 키 완전 일치 (dict)
+      2) 일반 단어(리조트 / 호텔 / 푸꾸옥 ...)를 뺀 core 키 완전 일치 (dict)
+      3) core 키 trigram 역색인으로 후보만 모아 Dice 유사도 최댓값 (threshold 이상)
+    - 같은 원문은 lru_cache 로 한 번만 계산, 못 찾은 원문은 unresolved() 로 확인 (사전 보강용)
+    """
+
+    def __init__(self, entries=(), threshold: float = DEFAULT_MATCH_THRESHOLD):
+        self._lock = threading.Lock()
+        self._path = None
+        self._mtime = None
+        self._unresolved = set()
+        self._build(list(entries), threshold)
+
+    def _build(self, entries: list, threshold: float):
+        exact, core, postings, grams, names = {}, {}, {}, [], {}
+        for entry in entries:
+            hotel_id = str(entry["id"])
+            names[hotel_id] = entry.get("name", "")
+            for alias in [entry.get("name", "")] + list(entry.get("aliases", [])):
+                key = normalize_hotel(alias)
+                if not key:
+                    continue
+                exact.setdefault(key, hotel_id)
+                core_key = _core_key(alias)
+                if not core_key:
+                    continue
+                core.setdefault(core_key, hotel_id)
+                gram_set = _trigrams(core_key)
+                for gram in gram_set:
+                    postings.setdefault(gram, []).append(len(grams))
+                grams.append((hotel_id, gram_set))
+
+        self._entries = entries
+        self.threshold = threshold
+        self._exact, self._core, self._postings, self._grams, self._names = exact, core, postings, grams, names
+        # 사전이 바뀌면 메모도 새로
+        self.resolve = lru_cache(maxsize=65536)(self._resolve)
+
+    def load(self, path: str, threshold: float = None):
+        """
+        사전 파일을 읽어 색인 생성 (파일이 바뀌지 않았으면 다시 만들지 않음, 파일이 없으면 빈 사전)
+        """
+        threshold = threshold or DEFAULT_MATCH_THRESHOLD
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        with self._lock:
+            if path == self._path and mtime == self._mtime and threshold == self.threshold:
+                return
+            entries = []
+            if mtime is not None:
+                with open(path, encoding="utf-8") as f:
+                    entries = json.load(f)
+            self._build(entries, threshold)
+            self._path, self._mtime = path, mtime
+            self._unresolved = set()
+
+    def _resolve(self, raw: str) -> str:
+        key = normalize_hotel(raw)
+        if not key:
+            return ""
+        hotel_id = self._exact.get(key)
+        if hotel_id is not None:
+            return hotel_id
+        core_key = _core_key(raw)
+        hotel_id = self._core.get(core_key)
+        if hotel_id is not None:
+            return hotel_id
+
+        # trigram 이 하나라도 겹치는 별칭만 후보
+        gram_set = _trigrams(core_key)
+        shared = {}
+        for gram in gram_set:
+            for i in self._postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+        best_id, best_score = "", 0.0
+        for i, count in shared.items():
+            candidate_id, candidate_grams = self._grams[i]
+            score = 2.0 * count / (len(gram_set) + len(candidate_grams))
+            if score > best_score:
+                best_id, best_score = candidate_id, score
+        if best_score >= self.threshold:
+            return best_id
+        self._unresolved.add(raw)
+        return ""
+
+    def name(self, hotel_id: str):
+        """
+        표준 ID -> 표준 숙소 이름 (모르면 None)
+        """
+        return self._names.get(hotel_id)
+
+    def unresolved(self) -> set:
+        return set(self._unresolved)
+
+    def snapshot(self) -> dict:
+        # parse_orders_parallel 의 worker 프로세스로 넘길 상태
+        return {"entries": self._entries, "threshold": self.threshold}
+
+    def restore(self, state: dict):
+        with self._lock:
+            self._build(state["entries"], state["threshold"])
+            self._path = self._mtime = None
+
+
+# 프로세스 전체가 함께 쓰는 숙소 사전 (parse_orders / manifest 가 참조)
+hotel_dictionary = HotelDictionary()
@@ -1,154 +1,129 @@
-from naver_api import *
-from sheets_api import *
-from parsing import *
-from db_mysql import *
+# 무거운 라이브러리(googleapiclient, google.oauth2, pymysql, bcrypt, requests)는
+# 각 단계가 실제로 실행될 때만 import 됨 (bench_startup.py 로 확인)
+import argparse
+import sys
 
-if __name__ == "__main__":
-    client_id = "######################"
-    client_secret = "###############################"
-    token = get_token(client_id, client_secret)
-
-    # 디버깅용 출력
-    print("발급된 토큰:", token)
-
-    # 1) 상태 변경 API로 상품주문번호 목록 가져오기
-    changed_items = get_last_changed_list(token)
-    changed_items2 = get_last_changed_list2(token)
-    # changed_items 예시:
-    # [
-    #   {"productOrderId": "2025010464018221", "orderId": "...", ...},
-    #   {"productOrderId": "2025010634083331", ...},
-    #   ...
-    # ]
-
-    product_order_ids = [item["productOrderId"] for item in changed_items] + [item["productOrderId"] for item in changed_items2]
-    if not product_order_ids:
-        print("새로운 상태변경 주문 없음")
-        exit(1)
-
-
-    # 2) 주문 상세조회 API로 실제 상세 정보 얻기
-    detail_res = get_product_orders_detail(token, product_order_ids)
-    # detail_res 구조 예시:
-    # {
-    #   "data": {
-    #       "productOrders": [
-    #          {
-    #            "productOrderId": "2025010464018221",
-    #            "product": { "productName": "...", "option": "...", ...},
-    #            "orderer": {...},
-    #            "shippingAddress": {...},
-    #            "payment": {...},
-    #            ...
-    #          },
-    #          ...
-    #       ]
-    #   }
-    # }
-
-    # 필요한 데이터 파싱 과정
-    # parse_orders() -> [{...}, ...] (name, useDate, category, ...)
-    # 이미 'combine_by_orderid' 한 상태
-    parsed_list = parse_orders(detail_res)
-
-    # to_spreadsheet_rows(parsed_list) -> 2차원 list로 변환
-    sheet_rows = to_spreadsheet_rows(parsed_list)
-
-
-    # 스프레드시트에 업로드
-    # 1) 스프레드시트 ID & JSON 키 파일 설정
-    SHEET_ID = "####################################"
-    SERVICE_ACCOUNT_FILE = "######################################"
-
-    # 2) 테스트용 밸류
-    test_values = sheet_rows
-
-    # 3) 시트에 업데이트
-    update_sheet(
-        sheet_id=SHEET_ID,
-        range_name="input!A40",
-        values=test_values,
-        service_account_file=SERVICE_ACCOUNT_FILE
-    )
+import pipeline
+from config import load_config
 
-    # 4) 읽어오기
-    read_result = read_sheet(
-        sheet_id=SHEET_ID,
-        range_name="input!A40:Q40",
-        service_account_file=SERVICE_ACCOUNT_FILE
-    )
-    # (위에서 추출한 데이터를 2차원 리스트로 만들어 구글 시트에 업로드 가능)
-
-    print("시트에서 읽어온 값:")
-    for row in read_result:
-        print(row)
-
-    # 5) DB 저장
-    # 1) DB 연결
-    connection = pymysql.connect(
-        host="###############",
-        user="#############",
-        password="##########",
-        database="###################",
-        charset="utf8"
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="네이버 스마트스토어 주문 -> 구글 시트 / MySQL 연동",
     )
+    parser.add_argument("--config", help="설정 JSON 파일 (DEFAULT_CONFIG 키 덮어쓰기)")
+    sub = parser.add_subparsers(dest="command")
+
+    sub.add_parser("migrate", help="DB 스키마 마이그레이션 + 조회 경로 EXPLAIN 확인 (DB 를 쓰는 명령은 시작 때 자동 실행)")
+    sub.add_parser("fetch", help="상태변경 조회 + 주문 상세조회 -> 캐시")
+    sub.add_parser("parse", help="details 캐시 -> parse_orders -> 캐시")
+    push_sheet = sub.add_parser("push-sheet", help="parsed 캐시 -> 시트")
+    push_sheet.add_argument("--direct", action="store_true",
+                            help="spool 을 거치지 않고 sheet_range 에 전체 덮어쓰기 (레이아웃 확인용)")
+    sub.add_parser("push-db", help="details / parsed 캐시 -> MySQL")
+    sub.add_parser("sync-cancels", help="feeds 캐시의 취소/반품 -> MySQL")
+    sub.add_parser("sync-claims", help="체크포인트 이후 클레임(취소/반품/교환) 변경 -> MySQL / 시트")
+    sub.add_parser("export", help="spool -> 분석용 월별 파티션 파일 (Parquet, pyarrow 없으면 CSV)")
+    sub.add_parser("refresh-catalog", help="커머스 상품 API -> 상품 카탈로그 캐시 (product_catalog.json)")
+    sub.add_parser("reprocess", help="dead-letter 에 격리된 주문 다시 파싱 -> MySQL / 시트")
+    show_order = sub.add_parser("show-order", help="보관된 상세조회 원본을 productOrderId 로 조회")
+    show_order.add_argument("product_order_id", help="상품주문번호")
+    sub.add_parser("run", help="전체 파이프라인 (기본값)")
+    daemon = sub.add_parser("daemon", help="run 을 주기적으로 반복 + 상태 HTTP 엔드포인트 (/status, /healthz)")
+    daemon.add_argument("--interval", type=float, help="실행 주기(초) (기본: daemon_interval)")
+    daemon.add_argument("--status-port", type=int, help="상태 엔드포인트 포트 (기본: status_port, 0 이면 끔)")
+    run_sharded = sub.add_parser("run-sharded", help="여러 노드가 샤드를 나눠 처리 (MySQL lease / GET_LOCK)")
+    run_sharded.add_argument("--shards", type=int, default=16, help="orderId 해시 샤드 수 (모든 노드 동일)")
+    run_sharded.add_argument("--max-claim", type=int, help="한 번에 소유할 샤드 수 (기본: 전체)")
+    run_sharded.add_argument("--cycle-seconds", type=int, default=300, help="샤드를 다시 처리하는 주기 (cron 주기와 맞춤)")
+    run_stores = sub.add_parser("run-stores", help="여러 스마트스토어를 동시에 실행")
+    run_stores.add_argument("stores_file", help="스토어 설정 JSON (config.load_store_configs 참고)")
+    run_stores.add_argument("--workers", type=int, help="동시 실행 스토어 수 (기본: 전체)")
+    return parser
+
+
+# DB 에 쓰는 명령 (시작 때 스키마를 한 번 맞춤)
+DB_COMMANDS = ("push-db", "sync-cancels", "reprocess", "sync-claims", "run", "daemon", "run-sharded")
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    config = load_config(args.config)
+    command = args.command or "run"
+
+    if command in DB_COMMANDS:
+        from storage import migrate_storage
+
+        migrate_storage(config["db"])
+
+    if command == "migrate":
+        from storage import migrate_storage
+
+        print(f"스키마 버전: v{migrate_storage(config['db'])}")
+    elif command == "fetch":
+        fetched = pipeline.stage_fetch(config)
+        print(f"상태변경 주문 {len(fetched['productOrderIds'])}건, 취소/반품 {len(fetched['canceled'])}건")
+    elif command == "parse":
+        print(f"파싱 결과 {len(pipeline.stage_parse(config))}건")
+    elif command == "push-sheet":
+        print(f"시트 반영 {pipeline.stage_push_sheet(config, direct=args.direct)}행")
+    elif command == "push-db":
+        print(f"DB 반영 {pipeline.stage_push_db(config)}건")
+    elif command == "sync-cancels":
+        print(f"취소 처리 {pipeline.stage_sync_cancels(config)}건")
+    elif command == "reprocess":
+        result = pipeline.stage_reprocess(config)
+        print(f"재처리 {result['reprocessed']}건, 남은 실패 {result['remaining']}건", result["sinks"])
+        if result["remaining"]:
+            return 1
+    elif command == "export":
+        print(f"내보낸 행 {pipeline.stage_export(config)}건 -> {config['export_dir']}")
+    elif command == "refresh-catalog":
+        print(f"상품 카탈로그 갱신 {pipeline.stage_refresh_catalog(config)}건")
+    elif command == "sync-claims":
+        result = pipeline.stage_sync_claims(config)
+        print(f"클레임 반영 {result['claims']}건", result["sinks"])
+    elif command == "show-order":
+        import json
+
+        from order_archive import OrderArchive
+
+        elem = OrderArchive(config.get("archive_dir") or "archive").get(args.product_order_id)
+        if elem is None:
+            print(f"보관된 주문 없음: {args.product_order_id}")
+            return 1
+        print(json.dumps(elem, ensure_ascii=False, indent=2))
+    elif command == "run-stores":
+        from config import load_store_configs
+        from multi_store import run_stores
+        from storage import migrate_storage
+
+        store_configs = load_store_configs(args.stores_file)
+        # 스토어끼리 같은 DB 를 쓰면 한 번만
+        for db_config in {repr(sorted(c["db"].items())): c["db"] for c in store_configs}.values():
+            migrate_storage(db_config)
+        results = run_stores(store_configs, max_workers=args.workers)
+        for name, result in results.items():
+            print(name, result)
+        if not all(r["ok"] for r in results.values()):
+            return 1
+    elif command == "run-sharded":
+        from sharding import run_sharded_cycle
+
+        result = run_sharded_cycle(config, num_shards=args.shards, max_claim=args.max_claim,
+                                   cycle_seconds=args.cycle_seconds)
+        print(f"사이클 {result['cycle']}: 처리한 샤드 {result['shards']}")
+    elif command == "daemon":
+        try:
+            pipeline.stage_daemon(config, interval=args.interval, status_port=args.status_port)
+        except KeyboardInterrupt:
+            pass
+    elif command == "run":
+        result = pipeline.stage_run(config)
+        if not result["productOrderIds"]:
+            return 1
+    return 0
+
 
-    data_list = detail_res.get("data", [])
-
-    for elem in data_list:
-        po = elem.get("productOrder", {})
-        order_info = po.get("order", {})
-        shipping = po.get("shippingAddress", {})
-
-        # (A) orders 테이블 저장
-        order_data = {
-            "orderId": order_info.get("orderId", ""),
-            "orderDate": order_info.get("orderDate", ""),  # "2025-01-07T20:49:12.0+09:00" -> 필요시 문자열 파싱
-            "ordererId": order_info.get("ordererId", ""),
-            "ordererName": order_info.get("ordererName", ""),
-            "ordererTel": order_info.get("ordererTel", ""),
-            "payLocationType": order_info.get("payLocationType", "")
-        }
-        save_order_to_db(connection, order_data)
-
-        # (B) product_orders 테이블 저장
-        product_order_data = {
-            "productOrderId": po.get("productOrderId", ""),
-            "orderId": order_info.get("orderId", ""),
-            "productName": po.get("productName", ""),
-            "productOption": po.get("productOption", ""),
-            "quantity": po.get("quantity", 0),
-            "freeGift": po.get("freeGift", ""),
-            "productClass": po.get("productClass", ""),
-            "optionCode": po.get("optionCode", ""),
-            "optionPrice": po.get("optionPrice", 0),
-            "unitPrice": po.get("unitPrice", 0),
-            "initialPaymentAmount": po.get("initialPaymentAmount", 0),
-            "remainPaymentAmount": po.get("remainPaymentAmount", 0),
-            "initialProductAmount": po.get("initialProductAmount", 0),
-            "remainProductAmount": po.get("remainProductAmount", 0),
-            "merchantChannelId": po.get("merchantChannelId", ""),
-            "sellerProductCode": po.get("sellerProductCode", "")
-        }
-        save_product_order_to_db(connection, product_order_data)
-
-    # 5) for each item in dict => insert to DB
-    for data in parsed_list:
-        save_product_option_details(connection, data)
-
-    # 1) API로 취소/반품 목록 가져오기
-    canceled_list = get_canceled_orders(token)
-
-    # 2) DB 업데이트
-    with connection.cursor() as cursor:
-        sql = "UPDATE product_option_details SET statement='CANCELED' WHERE product_order_id=%s"
-        count = 0
-        for item in canceled_list:
-            product_order_id = item.get("productOrderId")
-            if product_order_id:
-                cursor.execute(sql, (product_order_id,))
-                count += 1
-        connection.commit()
-
-    connection.close()
-    print(count)
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import copy
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from hotels import hotel_dictionary
+
+# 대시보드가 몇 초마다 폴링해도 MySQL 은 TTL 당 1번만 조회
+# (캐시는 프로세스 안에만 있음 -> 다른 프로세스(파이프라인 등)가 쓴 변경은 최대 TTL 만큼 늦게 보임)
+DEFAULT_TTL_SECONDS = 10.0
+
+# use_date("YYYY-MM-DD") -> (만료 시각, 결과)
+_manifest_cache = {}
+_cache_lock = threading.Lock()
+# invalidate 할 때마다 증가 -> 조회 중에 무효화되면 그 결과는 캐시에 넣지 않음
+_cache_generation = 0
+
+MANIFEST_SQL = """
+SELECT
+  product_name,
+  course_option,
+  MAX(hotel_id)   AS hotel_id,
+  MIN(hotel_name) AS hotel_name,
+  pick_up_time,
+  SUM(adult) AS adult,
+  SUM(child) AS child,
+  SUM(elder) AS elder,
+  COUNT(*)   AS bookings
+FROM product_option_details
+WHERE use_date >= %s AND use_date < %s
+  {statement_filter}
+GROUP BY product_name, course_option, {hotel_key}, pick_up_time
+ORDER BY product_name, course_option, {hotel_key}, pick_up_time
+"""
+
+# 숙소 묶음 기준: 표준 숙소 ID 가 있으면 ID (철자가 달라도 한 줄), 없으면 고객이 입력한 이름 그대로
+HOTEL_KEY_SQL = "CASE WHEN hotel_id <> '' THEN hotel_id ELSE hotel_name END"
+
+
+def _to_date(use_date) -> date:
+    if isinstance(use_date, datetime):
+        return use_date.date()
+    if isinstance(use_date, date):
+        return use_date
+    return datetime.strptime(use_date, "%Y-%m-%d").date()
+
+
+def invalidate_manifest_cache(use_dates=None):
+    """
+    writer(db_mysql / storage) 쪽에서 저장/취소 후 호출
+    - 같은 프로세스의 캐시만 지움 (다른 프로세스의 캐시는 TTL 로 만료)
+    - use_dates: 바뀐 이용날짜 목록 (None 이면 전체 캐시 삭제)
+    """
+    global _cache_generation
+
+    with _cache_lock:
+        _cache_generation += 1
+        if use_dates is None:
+            _manifest_cache.clear()
+            return
+        for use_date in use_dates:
+            if not use_date:
+                continue
+            day = _to_date(use_date).isoformat()
+            _manifest_cache.pop(day, None)
+            _manifest_cache.pop(day + "+canceled", None)
+
+
+def get_daily_manifest(connection, use_date, ttl: float = DEFAULT_TTL_SECONDS,
+                       include_canceled: bool = False) -> dict:
+    """
+    이용날짜 하루치 예약을 상품 > 코스옵션 > 숙소(픽업장소)/픽업시간 단위로 집계
+    - use_date: "YYYY-MM-DD" 또는 date
+    - use_date 인덱스 범위 조회 ([use_date, use_date+1일))
+    - 결과는 ttl 초 동안 캐시, 같은 프로세스의 writer 는 invalidate_manifest_cache 로 무효화
+    - 캐시와 공유하지 않는 복사본을 반환 (고쳐도 캐시에 영향 없음)
+
+    반환 예:
+    {
+      "useDate": "2025-01-22",
+      "adult": 12, "child": 3, "elder": 0, "bookings": 6,
+      "products": [
+        {
+          "productName": "나트랑 스노쿨링...",
+          "courseOption": "B코스",
+          "adult": 8, "child": 2, "elder": 0, "bookings": 4,
+          "hotels": [
+            {"hotelId": "coral-bay", "hotelName": "코랄베이 리조트", "pickUpTime": "07:00",
+             "adult": 4, "child": 0, "elder": 0, "bookings": 2},
+            ...
+          ]
+        },
+        ...
+      ]
+    }
+    """
+    day = _to_date(use_date)
+    cache_key = day.isoformat() + ("+canceled" if include_canceled else "")
+
+    # 1) 캐시 확인
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _manifest_cache.get(cache_key)
+        if cached and cached[0] > now:
+            return copy.deepcopy(cached[1])
+        generation = _cache_generation
+
+    # 2) 인덱스 범위 조회
+    statement_filter = "" if include_canceled else "AND statement NOT IN ('CANCELED', 'RETURNED')"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            MANIFEST_SQL.format(statement_filter=statement_filter, hotel_key=HOTEL_KEY_SQL),
+            (day.isoformat(), (day + timedelta(days=1)).isoformat())
+        )
+        rows = cursor.fetchall()
+    # REPEATABLE READ 스냅샷이 다음 폴링에 남지 않도록 트랜잭션 종료
+    connection.commit()
+
+    # 3) 상품/코스 단위로 묶기 (rows 는 ORDER BY 로 정렬되어 있음)
+    manifest = {"useDate": day.isoformat(), "adult": 0, "child": 0, "elder": 0, "bookings": 0, "products": []}
+    current = None
+    for product_name, course_option, hotel_id, hotel_name, pick_up_time, adult, child, elder, bookings in rows:
+        adult, child, elder, bookings = int(adult or 0), int(child or 0), int(elder or 0), int(bookings)
+        if current is None or (current["productName"], current["courseOption"]) != (product_name, course_option):
+            current = {"productName": product_name, "courseOption": course_option,
+                       "adult": 0, "child": 0, "elder": 0, "bookings": 0, "hotels": []}
+            manifest["products"].append(current)
+        # 표준 숙소로 묶인 행은 사전의 표준 이름으로 표시
+        if hotel_id:
+            hotel_name = hotel_dictionary.name(hotel_id) or hotel_name
+        current["hotels"].append({"hotelId": hotel_id, "hotelName": hotel_name, "pickUpTime": pick_up_time,
+                                  "adult": adult, "child": child, "elder": elder, "bookings": bookings})
+        for target in (current, manifest):
+            target["adult"] += adult
+            target["child"] += child
+            target["elder"] += elder
+            target["bookings"] += bookings
+
+    # 4) 캐시 저장 (조회하는 사이에 무효화됐으면 이미 낡은 결과일 수 있으므로 저장하지 않음)
+    with _cache_lock:
+        if generation == _cache_generation:
+            _manifest_cache[cache_key] = (time.monotonic() + ttl, copy.deepcopy(manifest))
+    return manifest
@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pipeline
+from storage import StoragePool
+
+
+def run_stores(configs: list[dict], max_workers: int = None, db_pool_size: int = 4) -> dict:
+    """
+    여러 스마트스토어 파이프라인을 동시에 실행
+    - 스토어마다 토큰 / 요청 한도(naver_rate_per_sec) / spool / 캐시는 따로
+    - HTTP 연결 풀(naver_api.get_session)과 DB 연결 풀(StoragePool)은 공유
+    - 상품 카탈로그 / 숙소 사전은 프로세스 전역이라 첫 스토어 설정으로 시작 전에 1번만 읽음
+      (스토어마다 다르게 지정할 수 없음, config.load_store_configs 의 "common" 에 지정)
+    - 전체 소요 시간은 가장 느린 스토어 수준
+    - 한 스토어가 실패해도 나머지는 계속 진행
+    - 반환: {스토어명: {"ok": True, "seconds": ..., "result": {...}} 또는 {"ok": False, "error": "..."}}
+    """
+    if not configs:
+        return {}
+
+    # DB 설정이 같은 스토어끼리 연결 풀 공유
+    pools = {}
+    for config in configs:
+        key = repr(sorted(config["db"].items()))
+        if key not in pools:
+            pools[key] = StoragePool(config["db"], size=db_pool_size)
+
+    pipeline.load_lookups(configs[0])
+
+    def _run(config):
+        start = time.perf_counter()
+        try:
+            result = pipeline.stage_run(dict(config, lookups_preloaded=True),
+                                        storage_pool=pools[repr(sorted(config["db"].items()))])
+            return {"ok": True, "seconds": round(time.perf_counter() - start, 3), "result": result}
+        except Exception as e:
+            print(f"[{config['name']}] 실행 실패: {e!r}")
+            return {"ok": False, "seconds": round(time.perf_counter() - start, 3), "error": repr(e)}
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or len(configs)) as executor:
+            futures = {config["name"]: executor.submit(_run, config) for config in configs}
+            return {name: f.result() for name, f in futures.items()}
+    finally:
+        for pool in pools.values():
+            pool.close()
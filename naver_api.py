@@ -1,10 +1,81 @@
-import requests
-import bcrypt
 import base64  # pybase64 말고 내장 base64 모듈 사용도 가능
+import hashlib
+import os
 import time
 import urllib.parse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from rate_limit import scheduler
+
+# 커머스 API 주소 (bench_pipeline.py 처럼 로컬 가짜 서버로 돌릴 때만 환경변수로 바꿈)
+API_BASE = os.environ.get("TRIPNOVA_NAVER_API_BASE", "https://api.commerce.naver.com/external")
+
+# 모든 스토어/스레드가 함께 쓰는 HTTP 연결 풀
+_session = None
+_session_lock = threading.Lock()
+
+# 요청 속도 제한은 rate_limit.scheduler 가 담당
+# - endpoint 이름: "naver/<스토어 키>/<API>" (스토어 키 = 토큰 해시, 토큰 자체는 지표에 남기지 않음)
+
+
+def get_session():
+    """
+    공유 requests.Session (keep-alive 연결 재사용)
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests  # 실제 요청 때만 import (import 비용 절감)
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+
+def _store_prefix(token: str) -> str:
+    return "naver/" + hashlib.sha1(token.encode("utf-8")).hexdigest()[:8]
+
+
+def set_rate_limit(token: str, rate_per_sec: float, burst: float = None):
+    """
+    해당 토큰(스토어)으로 나가는 요청을 초당 rate_per_sec 건으로 제한
+    - 스토어마다 토큰이 다르므로 스토어별로 독립된 한도를 가짐
+    - 같은 스토어의 모든 API(상태변경 / 상세조회)가 한 버킷을 나눠 씀
+    """
+    scheduler.configure(_store_prefix(token), rate_per_sec, burst)
+
+
+def _send(method: str, url: str, endpoint: str, max_retries: int = 5, **kwargs):
+    """
+    스케줄러에서 순서를 받은 뒤 요청 (반환: requests.Response)
+    - 429 면 Retry-After 동안 해당 버킷을 막고 (고정 sleep 대신) 다시 순서를 받아 재시도
+    """
+    import requests
+
+    for attempt in range(1, max_retries + 1):
+        scheduler.acquire(endpoint)
+        try:
+            res = get_session().request(method, url, **kwargs)
+        except requests.RequestException:
+            scheduler.failed(endpoint)
+            raise
+        if res.status_code != 429 or attempt == max_retries:
+            if res.status_code >= 400:
+                scheduler.failed(endpoint)
+            return res
+        try:
+            retry_after = float(res.headers.get("Retry-After") or 1)
+        except ValueError:
+            retry_after = 1.0
+        res.close()
+        scheduler.throttled(endpoint, retry_after)
+
 
 def get_token(client_id: str, client_secret: str, type_: str = "SELF", max_retries: int = 3) -> str:
     """
@@ -12,6 +83,7 @@ def get_token(client_id: str, client_secret: str, type_: str = "SELF", max_retri
     - timestamp(밀리초)와 함께 client_credentials 방식으로 토큰 발급
     - max_retries: 실패 시 최대 재시도 횟수 (기본 3회)
     """
+    import bcrypt  # 토큰 발급 때만 필요 (import 비용 절감)
 
     # 1) 밀리초 timestamp
     timestamp = str(int((time.time() - 3) * 1000))  # 3초 빼는 이유는 예제 코드 상의 관행
@@ -32,7 +104,7 @@ def get_token(client_id: str, client_secret: str, type_: str = "SELF", max_retri
     query_string = urllib.parse.urlencode(data_)
 
     # 4) API 엔드포인트
-    url = f"https://api.commerce.naver.com/external/v1/oauth2/token?{query_string}"
+    url = f"{API_BASE}/v1/oauth2/token?{query_string}"
 
     # 5) 요청 헤더
     headers = {
@@ -41,7 +113,7 @@ def get_token(client_id: str, client_secret: str, type_: str = "SELF", max_retri
 
     # 재시도 로직
     for attempt in range(1, max_retries + 1):
-        res = requests.post(url, headers=headers)
+        res = _send("POST", url, "naver/token", headers=headers)
 
         if res.status_code == 200:
             res_data = res.json()
@@ -62,81 +134,153 @@ def get_token(client_id: str, client_secret: str, type_: str = "SELF", max_retri
     raise RuntimeError("토큰 요청이 반복 실패했습니다. 확인 필요.")
 
 
-def get_last_changed_list(token):
+LAST_CHANGED_URL = f"{API_BASE}/v1/pay-order/seller/product-orders/last-changed-statuses"
+
+
+def _get_last_changed_statuses(token, changed_type: str, window: timedelta) -> list[dict]:
     """
-    예시: /last-changed-statuses API를 통해
-    DISPATCHED 상태로 변경된 productOrderId 목록을 가져온다고 가정
+    /last-changed-statuses API 1회 호출
+    - changed_type: lastChangedType 값 (예: "PAYED", "CLAIM_COMPLETED")
+    - window: 현재 시각 기준 조회 시작 시점까지의 기간 (예: timedelta(hours=36))
     """
-    url = "https://api.commerce.naver.com/external/v1/pay-order/seller/product-orders/last-changed-statuses"
     headers = {"Authorization": token}
 
-    # 3) 조회 시작 시점 설정 (기본 3시간 전)
-    now = datetime.now()
-    before_date = now - timedelta(hours=36)
-    # 필요하다면 minutes=10, ,hours=3, days=1 등 호출부에서 조정
+    # 1) 조회 시작 시점 설정
+    before_date = datetime.now() - window
 
-    # 4) ISO8601 포맷(UTC/로컬) 변환
+    # 2) ISO8601 포맷(UTC/로컬) 변환
     # 주의: astimezone() 호출 시 어떤 타임존인지 문서나 실제 응답을 보고 결정
     ios_format = before_date.astimezone().isoformat()
 
     params = {
         "lastChangedFrom": ios_format,
-        "lastChangedType": "PAYED",
-        #"lastChangedType": "DISPATCHED",
-        #"lastChangedType": "PURCHASE_DECIDED",
+        "lastChangedType": changed_type,
     }
 
-    res = requests.get(url, headers=headers, params=params)
+    res = _send("GET", LAST_CHANGED_URL, _store_prefix(token) + "/last-changed", headers=headers, params=params)
     res.raise_for_status()
     data = res.json()
     # data["data"]["lastChangeStatuses"] 배열
     return data.get("data", {}).get("lastChangeStatuses", [])
 
 
-def get_last_changed_list2(token):
+def iter_last_changed_pages(token, changed_type: str, last_changed_from: datetime, max_window=timedelta(hours=24)):
     """
-    예시: /last-changed-statuses API를 통해
-    DISPATCHED 상태로 변경된 productOrderId 목록을 가져온다고 가정
+    lastChangedFrom 이후의 상태변경을 페이지 단위로 끝까지 yield (클레임 추적기용)
+    - 응답에 data.more 가 있으면 moreFrom / moreSequence 로 다음 페이지 요청
+    - 한 번에 조회 가능한 기간(max_window, 24시간)보다 오래된 시점부터면 기간을 넘겨가며 현재까지 조회
+    - yield: lastChangeStatuses 배열 (빈 페이지는 건너뜀)
     """
-    url = "https://api.commerce.naver.com/external/v1/pay-order/seller/product-orders/last-changed-statuses"
     headers = {"Authorization": token}
+    window_from = last_changed_from
+    params = {"lastChangedFrom": window_from.astimezone().isoformat(), "lastChangedType": changed_type}
+
+    while True:
+        res = _send("GET", LAST_CHANGED_URL, _store_prefix(token) + "/last-changed", headers=headers, params=params)
+        res.raise_for_status()
+        data = res.json().get("data", {})
+        items = data.get("lastChangeStatuses", [])
+        if items:
+            yield items
+
+        more = data.get("more")
+        if more and more.get("moreFrom"):
+            params = {"lastChangedFrom": more["moreFrom"], "lastChangedType": changed_type}
+            if more.get("moreSequence"):
+                params["moreSequence"] = more["moreSequence"]
+            continue
+
+        # 이번 조회 기간을 다 읽음 -> 현재까지 남은 기간이 있으면 다음 기간으로
+        window_from = window_from + max_window
+        if window_from >= datetime.now(window_from.tzinfo):
+            return
+        params = {"lastChangedFrom": window_from.astimezone().isoformat(), "lastChangedType": changed_type}
 
-    # 3) 조회 시작 시점 설정
-    now = datetime.now()
-    before_date = now - timedelta(hours=12)
-    # 필요하다면 minutes=10, ,hours=3, days=1 등 호출부에서 조정
 
-    # 4) ISO8601 포맷(UTC/로컬) 변환
-    # 주의: astimezone() 호출 시 어떤 타임존인지 문서나 실제 응답을 보고 결정
-    ios_format = before_date.astimezone().isoformat()
+def get_last_changed_list(token):
+    """
+    예시: /last-changed-statuses API를 통해
+    PAYED 상태로 변경된 productOrderId 목록을 가져온다고 가정 (최근 36시간)
+    """
+    # 필요하다면 lastChangedType 을 "DISPATCHED", "PURCHASE_DECIDED" 등으로 조정
+    return _get_last_changed_statuses(token, "PAYED", timedelta(hours=36))
 
-    params = {
-        "lastChangedFrom": ios_format,
-        "lastChangedType": "PAYED",
-        #"lastChangedType": "DISPATCHED",
-        #"lastChangedType": "PURCHASE_DECIDED",
-    }
 
-    res = requests.get(url, headers=headers, params=params)
-    res.raise_for_status()
-    data = res.json()
-    # data["data"]["lastChangeStatuses"] 배열
-    return data.get("data", {}).get("lastChangeStatuses", [])
+def get_last_changed_list2(token):
+    """
+    예시: /last-changed-statuses API를 통해
+    PAYED 상태로 변경된 productOrderId 목록을 가져온다고 가정 (최근 12시간)
+    """
+    return _get_last_changed_statuses(token, "PAYED", timedelta(hours=12))
 
 
-def get_product_orders_detail(token: str, product_order_ids: list[str]) -> dict:
+def fetch_status_feeds(token, specs, max_workers: int = None) -> dict[str, list[dict]]:
     """
-    네이버 커머스 API - '상품 주문 상세 내역 조회' (POST /external/v1/pay-order/seller/product-orders/query)
+    여러 상태변경 조회를 동시에 보내고 lastChangedType 별로 합쳐서 반환
 
     Args:
-        token: "Bearer ..." 형태로 사용될 인증 토큰 (문서/샘플에 따르면 Bearer prefix 필요)
-        product_order_ids: 조회할 상품주문번호 리스트. 예: ["2025010791027401", "2025010791996471", ...]
+        token: 인증 토큰
+        specs: (lastChangedType, timedelta) 튜플 리스트
+               예: [("PAYED", timedelta(hours=36)), ("CLAIM_COMPLETED", timedelta(days=1))]
+        max_workers: 동시 요청 수 (기본: specs 개수)
 
     Returns:
-        dict: 응답 JSON 객체
+        {"PAYED": [...], "CLAIM_COMPLETED": [...]}
+        - 같은 타입의 여러 조회 결과는 productOrderId 기준으로 중복 제거 (먼저 받은 순서 유지)
+        - 전체 소요 시간은 가장 느린 호출 1건 수준
     """
-    url = "https://api.commerce.naver.com/external/v1/pay-order/seller/product-orders/query"
-
+    specs = list(specs)
+    feeds = {changed_type: [] for changed_type, _ in specs}
+    if not specs:
+        return feeds
+
+    # 1) 모든 조회를 동시에 요청
+    with ThreadPoolExecutor(max_workers=max_workers or len(specs)) as executor:
+        futures = [
+            executor.submit(_get_last_changed_statuses, token, changed_type, window)
+            for changed_type, window in specs
+        ]
+        # 2) specs 순서대로 결과 수집 (하나라도 실패하면 예외 전파)
+        results = [f.result() for f in futures]
+
+    # 3) 타입별 중복 제거
+    seen = {changed_type: set() for changed_type in feeds}
+    for (changed_type, _), items in zip(specs, results):
+        for item in items:
+            product_order_id = item.get("productOrderId")
+            if product_order_id in seen[changed_type]:
+                continue
+            seen[changed_type].add(product_order_id)
+            feeds[changed_type].append(item)
+
+    return feeds
+
+
+PRODUCT_ORDERS_QUERY_URL = f"{API_BASE}/v1/pay-order/seller/product-orders/query"
+
+# 상세조회 1회당 최대 상품주문번호 수
+DETAIL_CHUNK_SIZE = 300
+
+# 더 빠른 JSON 디코더가 설치되어 있으면 사용 (orjson > 내장 json)
+try:
+    import orjson as _orjson
+
+    def json_loads(raw):
+        return _orjson.loads(raw)
+except ImportError:
+    import json as _json
+
+    def json_loads(raw):
+        return _json.loads(raw)
+
+# 응답을 끝까지 받기 전에 data[] 원소를 하나씩 꺼내는 incremental 파서 (선택)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def _post_product_orders_query(token: str, product_order_ids: list[str], stream: bool = False):
     # 1) 요청 바디(payload) -> JSON
     payload = {
         "productOrderIds": product_order_ids,
@@ -153,37 +297,79 @@ def get_product_orders_detail(token: str, product_order_ids: list[str]) -> dict:
     }
 
     # 3) POST 요청 (json=payload 로 하면, requests 가 자동으로 JSON 직렬화)
-    response = requests.post(url, headers=headers, json=payload)
+    response = _send("POST", PRODUCT_ORDERS_QUERY_URL, _store_prefix(token) + "/query",
+                     headers=headers, json=payload, stream=stream)
     response.raise_for_status()  # 4xx, 5xx 시 예외
+    return response
+
+
+def get_product_orders_detail(token: str, product_order_ids: list[str], chunk_size: int = None) -> dict:
+    """
+    네이버 커머스 API - '상품 주문 상세 내역 조회' (POST /external/v1/pay-order/seller/product-orders/query)
+
+    Args:
+        token: "Bearer ..." 형태로 사용될 인증 토큰 (문서/샘플에 따르면 Bearer prefix 필요)
+        product_order_ids: 조회할 상품주문번호 리스트. 예: ["2025010791027401", "2025010791996471", ...]
+        chunk_size: 지정 시 해당 개수씩 나눠 요청하고 data 를 이어붙임 (기본: 한 번에 요청)
+
+    Returns:
+        dict: 응답 JSON 객체
+    """
+    if not chunk_size or len(product_order_ids) <= chunk_size:
+        return json_loads(_post_product_orders_query(token, product_order_ids).content)
+
+    merged = None
+    for i in range(0, len(product_order_ids), chunk_size):
+        res = json_loads(_post_product_orders_query(token, product_order_ids[i:i + chunk_size]).content)
+        if merged is None:
+            merged = res
+            merged["data"] = list(res.get("data", []))
+        else:
+            merged["data"].extend(res.get("data", []))
+    return merged
+
+
+def iter_product_order_elements(token: str, product_order_ids: list[str],
+                                chunk_size: int = DETAIL_CHUNK_SIZE, incremental: bool = True):
+    """
+    상품 주문 상세 응답의 data[] 원소를 하나씩 yield
+    - incremental=True 이고 ijson 이 설치되어 있으면 응답 바이트를 읽는 대로 원소 단위로 디코딩
+      (응답 전체 객체 트리를 한꺼번에 메모리에 올리지 않음)
+    - 그 외에는 청크 응답 1개씩 빠른 디코더로 읽고 원소를 넘긴 뒤 버림
+    """
+    for i in range(0, len(product_order_ids), chunk_size):
+        chunk = product_order_ids[i:i + chunk_size]
+        if incremental and ijson is not None:
+            response = _post_product_orders_query(token, chunk, stream=True)
+            try:
+                response.raw.decode_content = True  # gzip 응답도 풀어서 읽음
+                yield from ijson.items(response.raw, "data.item", use_float=True)
+            finally:
+                response.close()
+        else:
+            res = json_loads(_post_product_orders_query(token, chunk).content)
+            yield from res.get("data", [])
 
-    return response.json()
 
 def get_canceled_orders(token):
     """
-        예시: /last-changed-statuses API를 통해
-        DISPATCHED 상태로 변경된 productOrderId 목록을 가져온다고 가정
-        """
-    url = "https://api.commerce.naver.com/external/v1/pay-order/seller/product-orders/last-changed-statuses"
-    headers = {"Authorization": token}
+    예시: /last-changed-statuses API를 통해
+    CLAIM_COMPLETED 상태로 변경된 productOrderId 목록을 가져온다고 가정 (최근 1일)
+    """
+    return _get_last_changed_statuses(token, "CLAIM_COMPLETED", timedelta(days=1))
 
-    # 3) 조회 시작 시점 설정 (기본 3시간 전)
-    now = datetime.now()
-    before_date = now - timedelta(days=1)
-    # 필요하다면 minutes=10, ,hours=3, days=1 등 호출부에서 조정
 
-    # 4) ISO8601 포맷(UTC/로컬) 변환
-    # 주의: astimezone() 호출 시 어떤 타임존인지 문서나 실제 응답을 보고 결정
-    ios_format = before_date.astimezone().isoformat()
+CHANNEL_PRODUCT_URL = f"{API_BASE}/v2/products/channel-products"
 
-    params = {
-        "lastChangedFrom": ios_format,
-        "lastChangedType": "CLAIM_COMPLETED",
-        # "lastChangedType": "DISPATCHED",
-        # "lastChangedType": "PURCHASE_DECIDED",
-    }
 
-    res = requests.get(url, headers=headers, params=params)
+def get_channel_product(token: str, channel_product_no: str) -> dict:
+    """
+    채널 상품 1개 조회 (주문의 productId = 채널 상품번호)
+    - 반환: {"originProduct": {"name", "detailAttribute": {"optionInfo", "supplementProductInfo", ...}}, ...}
+    - catalog.py 가 상품명 / 옵션 / 추가상품 목록을 캐시할 때 사용
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    res = _send("GET", f"{CHANNEL_PRODUCT_URL}/{channel_product_no}", _store_prefix(token) + "/product",
+                headers=headers)
     res.raise_for_status()
-    data = res.json()
-    # data["data"]["lastChangeStatuses"] 배열
-    return data.get("data", {}).get("lastChangeStatuses", [])
+    return res.json()
@@ -0,0 +1,176 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+# 인덱스 레코드: productOrderId(uint64), 파일 번호(uint32), offset(uint64), 길이(uint32) -> 24 bytes
+# index.bin 은 productOrderId 오름차순으로 정렬된 레코드 배열 (mmap 으로 이진 탐색)
+RECORD = struct.Struct("<QIQI")
+
+
+class OrderArchive:
+    """
+    상세조회 응답 원본(data[] 원소)을 날짜별 JSONL 파일에 보관하고
+    productOrderId -> (파일, offset, 길이) 인덱스로 한 건씩 바로 꺼내는 저장소
+
+    archive_dir/
+      details-YYYYMMDD.jsonl   원소 1개 = 1줄 (추가만 함)
+      files.json               파일 번호 -> 파일 이름
+      index.bin                정렬된 RECORD 배열
+
+    - 조회: index.bin 을 mmap 해서 이진 탐색 후 해당 줄만 읽음 (아카이브 전체를 올리지 않음)
+    - 같은 productOrderId 가 다시 들어오면(상태 변경 후 재조회) 최신 원소를 가리킴
+    """
+
+    def __init__(self, archive_dir: str = "archive"):
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+        os.makedirs(archive_dir, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.archive_dir, name)
+
+    def _files(self) -> list[str]:
+        path = self._path("files.json")
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_atomic(self, name: str, write):
+        tmp = self._path(name + ".tmp")
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, self._path(name))
+
+    def _day_file(self) -> tuple[int, str]:
+        # 오늘 날짜 파일 (파일 번호, 이름), 처음이면 files.json 에 등록
+        files = self._files()
+        name = time.strftime("details-%Y%m%d.jsonl")
+        if name not in files:
+            files.append(name)
+            self._write_atomic("files.json", lambda f: f.write(json.dumps(files).encode("utf-8")))
+        return files.index(name), name
+
+    @staticmethod
+    def _write_line(f, file_id: int, elem: dict):
+        # 원소 1줄 기록 -> 인덱스 레코드 (productOrderId 가 숫자가 아니면 인덱스에 못 넣으므로 건너뛰고 None)
+        product_order_id = str(elem.get("productOrder", {}).get("productOrderId", ""))
+        if not product_order_id.isdigit():
+            return None
+        line = json.dumps(elem, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        offset = f.tell()
+        f.write(line + b"\n")
+        return int(product_order_id), file_id, offset, len(line)
+
+    def append(self, elements) -> int:
+        """
+        원소들을 오늘 날짜 파일에 추가하고 인덱스에 반영
+        - 반환: 보관한 원소 수 (productOrderId 가 숫자가 아니면 인덱스에 못 넣으므로 건너뜀)
+        """
+        with self._lock:
+            file_id, name = self._day_file()
+            entries = []
+            with open(self._path(name), "ab") as f:
+                for elem in elements:
+                    entry = self._write_line(f, file_id, elem)
+                    if entry is not None:
+                        entries.append(entry)
+
+            if entries:
+                self._merge(entries)
+            return len(entries)
+
+    def stream(self, elements):
+        """
+        append 의 generator 버전: 원소를 그대로 넘겨주면서 받는 즉시 파일에 한 줄씩 씀
+        - 원소는 모아 두지 않고 인덱스 레코드(24 bytes 분량)만 모았다가 끝나면(중간에 멈춰도) 1번 병합
+        """
+        with self._lock:
+            file_id, name = self._day_file()
+            entries = []
+            try:
+                with open(self._path(name), "ab") as f:
+                    for elem in elements:
+                        entry = self._write_line(f, file_id, elem)
+                        if entry is not None:
+                            entries.append(entry)
+                        yield elem
+            finally:
+                if entries:
+                    self._merge(entries)
+
+    def _merge(self, entries: list[tuple]):
+        """
+        기존 정렬 인덱스 + 새 레코드를 한 번 훑으며 병합해서 index.bin 교체 (같은 id 는 새 레코드가 이김)
+        """
+        # 같은 배치 안에서도 나중 원소가 이기도록 (id, 순서) 정렬 후 마지막 것만 남김
+        latest = {}
+        for entry in entries:
+            latest[entry[0]] = entry
+        new = sorted(latest.values())
+
+        path = self._path("index.bin")
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        def _write(out):
+            j = 0
+            if old_size:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for pos in range(0, old_size, RECORD.size):
+                        record = RECORD.unpack_from(mm, pos)
+                        while j < len(new) and new[j][0] < record[0]:
+                            out.write(RECORD.pack(*new[j]))
+                            j += 1
+                        if j < len(new) and new[j][0] == record[0]:
+                            # 새 레코드로 교체
+                            continue
+                        out.write(RECORD.pack(*record))
+            for entry in new[j:]:
+                out.write(RECORD.pack(*entry))
+
+        self._write_atomic("index.bin", _write)
+
+    def lookup(self, product_order_id):
+        """
+        productOrderId -> (파일 이름, offset, 길이) / 없으면 None
+        """
+        key = str(product_order_id)
+        if not key.isdigit():
+            return None
+        key = int(key)
+        path = self._path("index.bin")
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lo, hi = 0, len(mm) // RECORD.size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                record = RECORD.unpack_from(mm, mid * RECORD.size)
+                if record[0] < key:
+                    lo = mid + 1
+                elif record[0] > key:
+                    hi = mid
+                else:
+                    _, file_id, offset, length = record
+                    return self._files()[file_id], offset, length
+        return None
+
+    def get(self, product_order_id):
+        """
+        productOrderId -> 보관된 data[] 원소 dict / 없으면 None
+        """
+        position = self.lookup(product_order_id)
+        if position is None:
+            return None
+        name, offset, length = position
+        with open(self._path(name), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def count(self) -> int:
+        path = self._path("index.bin")
+        return os.path.getsize(path) // RECORD.size if os.path.exists(path) else 0
@@ -1,6 +1,9 @@
 import re
 import datetime
 
+from catalog import ROLE_RENT_CAR, ROLE_SIDE, ROLE_TOWEL, catalog
+from hotels import hotel_dictionary
+
 def parse_orders(detail_res: dict) -> list[dict]:
     """
     detail_res 구조:
@@ -41,130 +44,43 @@ def parse_orders(detail_res: dict) -> list[dict]:
     ]
     """
 
+    return parse_order_elements(detail_res.get("data", []))
+
+
+def parse_order_elements(elements, on_error=None) -> list[dict]:
+    """
+    parse_orders 와 같지만 data[] 원소의 iterable 을 받음
+    - naver_api.iter_product_order_elements 처럼 원소를 하나씩 넘겨주는 generator 를 그대로 사용 가능
+      (원본 원소는 파싱 후 바로 버려지고, 작은 items dict 만 남음)
+    - on_error: 지정하면 원소 하나가 예외를 내도 나머지는 계속 파싱
+      실패한 원소가 속한 orderId 의 원소 전체를 결과에서 빼고 on_error(order_id, elements, error) 호출
+      (사이드옵션 날짜 채우기 / 병합이 반쪽으로 되지 않도록 주문 단위로 격리)
+      같은 주문의 원소가 떨어져서 와도(A1, B1, A2) 실패하면 그 주문의 원소 전체가 넘어가도록
+      원본 원소는 호출이 끝날 때까지 orderId 별로 들고 있다가 끝나면 버림 (on_error 가 없으면 들고 있지 않음)
+    """
     items = []  # '아이템' 수준 저장 (중간 데이터)
+    raw_by_order = {}  # orderId -> 원본 원소 (on_error 로 넘길 때 사용)
+    failed = {}  # orderId -> 처음 난 예외
+
+    for elem in elements:
+        if on_error is None:
+            items.append(_parse_item(elem))
+            continue
+
+        order_id = elem.get("order", {}).get("orderId", "")
+        raw_by_order.setdefault(order_id, []).append(elem)
+        if order_id in failed:
+            continue
+        try:
+            items.append(_parse_item(elem))
+        except Exception as e:
+            failed[order_id] = e
 
-    data_list = detail_res.get("data", [])
-    for elem in data_list:
-        po = elem.get("productOrder", {})
-        order = elem.get("order", {})
-        shipping = po.get("shippingAddress", {})
-
-        # 1) orderId
-        order_id = order.get("orderId", "")
-
-        # 2) 한글성명, 전화번호
-        kor_name = shipping.get("name", "")
-        tel = shipping.get("tel1", "")
-
-        # 3) 이용날짜 (예: "이용날짜(예시 : 2024-xx-xx ): 2025-02-15" 에서 뒤쪽만)
-        use_date_str = po.get("productOption", "")
-        use_date = extract_use_date(use_date_str)  # <-- 아래 예시 함수
-        use_date = parse_user_date(use_date)
-
-        # 영문명 파싱
-        eng_name = extract_eng_name(use_date_str)
-
-        # 4) 숙소 이름 (예: "베스트 웨스턴 푸꾸옥): 뉴월드 리조트" -> "뉴월드 리조트")
-        hotel_name = extract_hotel_name(use_date_str)  # <-- 아래 예시 함수
-
-        # 5) 상품명
-        product_name = po.get("productName", "")
-
-        # 6) 결제방식 (예: "결제방식 (잔금/완납): 완납") -> 정규식 or parse_option
-        pay_method = extract_pay_method(use_date_str)
-        if product_name == "푸꾸옥 프라이빗 렌트카 기사포함 km무제한 SUV 미니벤":
-            pay_method = "완납"
-
-        # 7) 성인/아동/노인 파싱:
-        #    예: "성인 (키 140cm 이상)(2명)" -> adult=2, child=0, old=0
-        category_str = extract_category_str(use_date_str)  # parse_option 내부 or 별도
-        # 7-1) 실제 인원수
-        quantity = po.get("quantity", 0)
-        adult, child, old = parse_category_and_quantity(category_str, quantity)  # <-- 아래 예시
-
-        # 8) 메인 옵션 파싱
-        course_option_str = extract_course_option(use_date_str)
-        """
-        # 8-1) 메인 옵션이 2가지인 상품의 경우 side_option에 파싱 - 순서 문제로 ㅈ버그 발생, 나중에 다른 방법으로 수정해야함.
-        if product_name == "[푸꾸옥 에센셜] 프라이빗 모닝투어 체크인 비엣젯, 제주항공, 진에어, 대한항공":
-            side_option = extract_course_option_2(use_date_str)
-        """
-
-        # 9) 비행기 편명 파싱
-        airplane = extract_plane(use_date_str)
-
-        # packageNumber - 채널 상품 번호? (병합용 식별자)
-        productId = po.get("productId", None)  # 예: "2025010825643147"
-
-        # db 저장용
-        product_order_id = po.get("productOrderId", "")
-
-        # 배송 메모 파싱
-        shipping_memo = po.get("shippingMemo", "")
-
-        # 초기 상품 금액(할인 전)
-        initial_amount = po.get("initialProductAmount", 0)
-        # 최초 결제 금액(할인 적용 후 금액)
-        final_amount = po.get("initialPaymentAmount", 0)
-
-        # ---------------------
-        # (A) Side options
-        #  - 조건: productName(또는 productOption)에 추가 옵션이 들어있나?
-        #  - 예: "스피드보트 업그레이드(잔금 30USD)", "북부지역 6인 이하(잔금 20USD)", etc.
-        side_option = None
-        is_side = False
-        # 예시판별: 만약 productName에 "스피드보트 업그레이드" or "북부지역" 텍스트 포함되어 있으면 side_option = productName
-        if any(x in product_name for x in ["스피드보트 업그레이드", "북부지역", "잔금 30USD", "잔금 20USD",
-                                           "북부(완납)", "남부(완납)", "중부(완납)", "소나시(무료)", "북부(잔금)", "남부(잔금)", "중부(잔금)",
-                                           "선예약 후 개별결제", "1인 추가"]):
-            is_side = True
-            side_option = product_name  # sideOption 필드에 저장
-        # 혹은 productOption 안에서도 판별 가능
-
-        # (B) Tower
-        #  - if productName == "원하시는 개수 만큼 선택해주세요." => Tower = quantity
-        tower = 0
-        is_tower = False
-        if "원하시는 개수 만큼 선택해주세요" in product_name:
-            is_tower = True
-            tower = quantity
-
-        # 성인 / 아동 / 노인 계산
-        if is_side or is_tower:
-            # 추가옵션/타월 주문은 adult/child/old=0
-            adult = 0
-            child = 0
-            old = 0
-        else:
-            # 일반 메인 상품은 quantity로 adult/child/old
-            adult, child, old = parse_category_and_quantity(category_str, quantity)
-            # 렌트카 사용인원 파싱
-            if product_name == "푸꾸옥 프라이빗 렌트카 기사포함 km무제한 SUV 미니벤":
-                adult = int(extract_rent_car_quantity(use_date_str))
-
-        # 10) items에 누적
-        items.append({
-            "orderId": order_id,
-            "productOrderId": product_order_id,
-            "productId": productId,
-            "korName": kor_name,
-            "engName": eng_name,
-            "tel": tel,
-            "useDate": use_date,
-            "hotelName": hotel_name,
-            "productName": product_name,
-            "courseOption": course_option_str,
-            "payMethod": pay_method,
-            "adult": adult,
-            "child": child,
-            "old": old,
-            "sideOption": side_option,
-            "tower": tower,
-            "airplane": airplane,
-            "shippingMemo": shipping_memo,
-            "initialProductAmount": initial_amount,
-            "finalProductAmount": final_amount
-        })
+    if failed:
+        items = [it for it in items if it["orderId"] not in failed]
+        for order_id, error in failed.items():
+            on_error(order_id, raw_by_order[order_id], error)
+    raw_by_order.clear()
 
     # 사이드 아이템 useDate="" -> 메인 날짜 복사
     items = _fix_side_items_date(items)
@@ -174,6 +90,200 @@ def parse_orders(detail_res: dict) -> list[dict]:
     return combined
 
 
+# parse_orders_parallel: 이보다 원소가 적으면 프로세스 기동 비용이 더 커서 그냥 직렬로 처리
+PARALLEL_MIN_ELEMENTS = 5000
+
+
+def _init_worker(catalog_state: dict, hotel_state: dict):
+    # worker 프로세스 시작 시 부모의 catalog / 숙소 사전 복원 (fork 가 아닌 방식으로 띄워도 결과가 같도록)
+    catalog.restore(catalog_state)
+    hotel_dictionary.restore(hotel_state)
+
+
+def _parse_partition(elements: list, isolate: bool):
+    """
+    worker 프로세스에서 실행: 원소 묶음 -> (병합된 행, 실패 목록 [(order_id, elements, error)])
+    """
+    failures = []
+    on_error = (lambda order_id, elems, error: failures.append((order_id, elems, error))) if isolate else None
+    return parse_order_elements(elements, on_error=on_error), failures
+
+
+def parse_orders_parallel(detail_res: dict, workers: int = None, min_elements: int = PARALLEL_MIN_ELEMENTS,
+                          on_error=None) -> list[dict]:
+    """
+    parse_orders 와 같은 결과를 여러 프로세스로 계산 (정규식/문자열 처리라 GIL 때문에 스레드로는 안 빨라짐)
+    - data[] 를 orderId 단위로 나눠서 partition 마다 parse_order_elements 실행
+      (사이드옵션 날짜 채우기 / 병합 키가 모두 orderId 를 포함하므로 partition 안에서 끝남)
+    - 병합된 행은 첫 원소(productOrderId)의 원래 위치 순으로 정렬 -> 직렬 결과와 같은 순서
+    - workers: 프로세스 수 (기본: CPU 수), 원소가 min_elements 보다 적으면 직렬로 처리
+    - on_error: parse_order_elements 와 같음 (실패 주문은 부모 프로세스에서 원래 순서대로 호출)
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    data_list = detail_res.get("data", [])
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(data_list) < min_elements:
+        return parse_order_elements(data_list, on_error=on_error)
+
+    # 1) orderId 별 원소 묶음 (처음 나온 순서 유지)
+    position = {}
+    groups = {}
+    for i, elem in enumerate(data_list):
+        position[elem.get("productOrder", {}).get("productOrderId", "")] = i
+        groups.setdefault(elem.get("order", {}).get("orderId", ""), []).append(elem)
+
+    # 2) 원소 수가 비슷하도록 orderId 묶음을 partition 에 채움 (worker 당 4개 -> 늦게 끝나는 worker 완화)
+    target = max(1, len(data_list) // (workers * 4))
+    partitions, current = [], []
+    for elems in groups.values():
+        current.extend(elems)
+        if len(current) >= target:
+            partitions.append(current)
+            current = []
+    if current:
+        partitions.append(current)
+
+    # 3) 병렬 파싱
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(catalog.snapshot(), hotel_dictionary.snapshot())) as executor:
+        results = list(executor.map(_parse_partition, partitions, [on_error is not None] * len(partitions)))
+
+    # 4) 원래 순서로 병합
+    combined = [row for rows, _ in results for row in rows]
+    combined.sort(key=lambda row: position.get(row["productOrderId"], -1))
+    if on_error is not None:
+        failures = [failure for _, partition_failures in results for failure in partition_failures]
+        failures.sort(key=lambda f: min(position.get(e.get("productOrder", {}).get("productOrderId", ""), -1)
+                                        for e in f[1]))
+        for order_id, elems, error in failures:
+            on_error(order_id, elems, error)
+    return combined
+
+
+def _parse_item(elem) -> dict:
+    """
+    data[] 원소 1개 -> 아이템 1개 (parse_order_elements 의 원소 단위 파싱)
+    """
+    po = elem.get("productOrder", {})
+    order = elem.get("order", {})
+    shipping = po.get("shippingAddress", {})
+
+    # 1) orderId
+    order_id = order.get("orderId", "")
+
+    # 2) 한글성명, 전화번호
+    kor_name = shipping.get("name", "")
+    tel = shipping.get("tel1", "")
+
+    # 3) 이용날짜 (예: "이용날짜(예시 : 2024-xx-xx ): 2025-02-15" 에서 뒤쪽만)
+    use_date_str = po.get("productOption", "")
+    use_date = extract_use_date(use_date_str)  # <-- 아래 예시 함수
+    use_date = parse_user_date(use_date)
+
+    # 영문명 파싱
+    eng_name = extract_eng_name(use_date_str)
+
+    # 4) 숙소 이름 (예: "베스트 웨스턴 푸꾸옥): 뉴월드 리조트" -> "뉴월드 리조트")
+    hotel_name = extract_hotel_name(use_date_str)  # <-- 아래 예시 함수
+    # 4-1) 표준 숙소 ID (hotels.py 사전, 못 찾으면 "")
+    hotel_id = hotel_dictionary.resolve(hotel_name)
+
+    # 5) 상품 역할 / 상품명 (catalog.py: productId / optionCode 로 조회, 없으면 상품명 규칙)
+    role, product_name = catalog.classify(po)
+
+    # 6) 결제방식 (예: "결제방식 (잔금/완납): 완납") -> 정규식 or parse_option
+    pay_method = extract_pay_method(use_date_str)
+    if role == ROLE_RENT_CAR:
+        pay_method = "완납"
+
+    # 7) 성인/아동/노인 파싱:
+    #    예: "성인 (키 140cm 이상)(2명)" -> adult=2, child=0, old=0
+    category_str = extract_category_str(use_date_str)  # parse_option 내부 or 별도
+    # 7-1) 실제 인원수
+    quantity = po.get("quantity", 0)
+    adult, child, old = parse_category_and_quantity(category_str, quantity)  # <-- 아래 예시
+
+    # 8) 메인 옵션 파싱
+    course_option_str = extract_course_option(use_date_str)
+    """
+    # 8-1) 메인 옵션이 2가지인 상품의 경우 side_option에 파싱 - 순서 문제로 ㅈ버그 발생, 나중에 다른 방법으로 수정해야함.
+    if product_name == "[푸꾸옥 에센셜] 프라이빗 모닝투어 체크인 비엣젯, 제주항공, 진에어, 대한항공":
+        side_option = extract_course_option_2(use_date_str)
+    """
+
+    # 9) 비행기 편명 파싱
+    airplane = extract_plane(use_date_str)
+
+    # packageNumber - 채널 상품 번호? (병합용 식별자)
+    productId = po.get("productId", None)  # 예: "2025010825643147"
+
+    # db 저장용
+    product_order_id = po.get("productOrderId", "")
+
+    # 배송 메모 파싱
+    shipping_memo = po.get("shippingMemo", "")
+
+    # 초기 상품 금액(할인 전)
+    initial_amount = po.get("initialProductAmount", 0)
+    # 최초 결제 금액(할인 적용 후 금액)
+    final_amount = po.get("initialPaymentAmount", 0)
+
+    # ---------------------
+    # (A) Side options
+    #  - 예: "스피드보트 업그레이드(잔금 30USD)", "북부지역 6인 이하(잔금 20USD)", etc.
+    side_option = None
+    is_side = role == ROLE_SIDE
+    if is_side:
+        side_option = product_name  # sideOption 필드에 저장
+
+    # (B) Tower
+    #  - 타월 상품 ("원하시는 개수 만큼 선택해주세요.") => Tower = quantity
+    tower = 0
+    is_tower = role == ROLE_TOWEL
+    if is_tower:
+        tower = quantity
+
+    # 성인 / 아동 / 노인 계산
+    if is_side or is_tower:
+        # 추가옵션/타월 주문은 adult/child/old=0
+        adult = 0
+        child = 0
+        old = 0
+    else:
+        # 일반 메인 상품은 quantity로 adult/child/old
+        adult, child, old = parse_category_and_quantity(category_str, quantity)
+        # 렌트카 사용인원 파싱
+        if role == ROLE_RENT_CAR:
+            adult = int(extract_rent_car_quantity(use_date_str))
+
+    # 10) 아이템
+    return {
+        "orderId": order_id,
+        "productOrderId": product_order_id,
+        "productId": productId,
+        "korName": kor_name,
+        "engName": eng_name,
+        "tel": tel,
+        "useDate": use_date,
+        "hotelName": hotel_name,
+        "hotelId": hotel_id,
+        "productName": product_name,
+        "courseOption": course_option_str,
+        "payMethod": pay_method,
+        "adult": adult,
+        "child": child,
+        "old": old,
+        "sideOption": side_option,
+        "tower": tower,
+        "airplane": airplane,
+        "shippingMemo": shipping_memo,
+        "initialProductAmount": initial_amount,
+        "finalProductAmount": final_amount
+    }
+
+
 def _fix_side_items_date(items: list[dict]) -> list[dict]:
     """
     같은 (orderId, productId) 그룹 내:
@@ -242,6 +352,7 @@ def _combine_by_pkg(items: list[dict]) -> list[dict]:
                 "tel": it["tel"],
                 "useDate": dt,
                 "hotelName": it["hotelName"],
+                "hotelId": it["hotelId"],
                 "productName": it["productName"],
                 "courseOption": it["courseOption"],
                 "payMethod": it["payMethod"],
@@ -285,6 +396,7 @@ def _combine_by_pkg(items: list[dict]) -> list[dict]:
                     data_by_key[key]["useDate"] = it["useDate"]
                 if not data_by_key[key]["hotelName"] and it["hotelName"]:
                     data_by_key[key]["hotelName"] = it["hotelName"]
+                    data_by_key[key]["hotelId"] = it["hotelId"]
                 if not data_by_key[key]["payMethod"] and it["payMethod"]:
                     data_by_key[key]["payMethod"] = it["payMethod"]
 
@@ -0,0 +1,732 @@
+import gzip
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+
+# 단계별 중간 결과 파일 (config["cache_dir"] 아래, gzip JSON)
+# - feeds: 상태변경 조회 결과 {"productOrderIds": [...], "canceled": [...]}
+# - details: 주문 상세조회 응답 (detail_res)
+# - parsed: parse_orders() 결과
+CACHE_STAGES = ("feeds", "details", "parsed")
+
+# 상태 변경 조회: 결제완료(36시간/12시간) + 클레임완료(1일)
+STATUS_FEED_SPECS = [
+    ("PAYED", timedelta(hours=36)),
+    ("PAYED", timedelta(hours=12)),
+    ("CLAIM_COMPLETED", timedelta(days=1)),
+]
+
+
+def _cache_path(config: dict, name: str) -> str:
+    return os.path.join(config.get("cache_dir", ".cache"), f"{name}.json.gz")
+
+
+def save_cache(config: dict, name: str, obj):
+    """
+    중간 결과를 gzip JSON 으로 저장 (임시 파일에 쓴 뒤 교체 -> 중간에 죽어도 깨진 파일이 남지 않음)
+    """
+    path = _cache_path(config, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _cache_elements(config: dict, name: str, elements):
+    """
+    data[] 원소를 그대로 넘겨주면서 {"data": [...]} 형식 캐시 파일에 하나씩 기록
+    (끝까지 소비되면 save_cache 와 같은 파일이 됨)
+    """
+    path = _cache_path(config, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+        f.write('{"data":[')
+        for i, elem in enumerate(elements):
+            if i:
+                f.write(",")
+            json.dump(elem, f, ensure_ascii=False, separators=(",", ":"))
+            yield elem
+        f.write("]}")
+    os.replace(tmp, path)
+
+
+def _open_archive(config: dict):
+    """
+    상세조회 원본 보관소 (archive_dir 가 없으면 None -> 보관 안 함)
+    """
+    if not config.get("archive_dir"):
+        return None
+
+    from order_archive import OrderArchive
+
+    return OrderArchive(config["archive_dir"])
+
+
+def _archive_elements(archive, elements):
+    """
+    data[] 원소를 그대로 넘겨주면서 받는 대로 아카이브 파일에 기록 (원소를 메모리에 모아 두지 않음)
+    (인덱스 병합은 실행당 1번)
+    """
+    yield from archive.stream(elements)
+
+
+def load_cache(config: dict, name: str):
+    path = _cache_path(config, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"캐시 없음: {path} (먼저 이전 단계를 실행하세요)")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_store_token(config: dict) -> str:
+    """
+    토큰 발급 (+ 스토어별 요청 한도 설정)
+    """
+    from naver_api import get_token, set_rate_limit
+
+    token = get_token(config["client_id"], config["client_secret"])
+    if config.get("naver_rate_per_sec"):
+        # 스토어(토큰)별 독립된 요청 한도
+        set_rate_limit(token, config["naver_rate_per_sec"])
+    return token
+
+
+def _configure_sheets_quota(config: dict):
+    from sheets_api import set_quota
+
+    set_quota(config.get("sheets_write_per_min"), config.get("sheets_read_per_min"))
+
+
+def fetch_feeds(token: str, config: dict = None) -> dict:
+    """
+    상태 변경 API로 상품주문번호 목록 가져오기 (모든 조회를 한 번에 동시 요청)
+    - track_claims 가 켜져 있으면 클레임은 claims.py 추적기가 처리하므로 CLAIM_COMPLETED 조회는 생략
+    """
+    from naver_api import fetch_status_feeds
+
+    specs = STATUS_FEED_SPECS
+    if config is not None and config.get("track_claims"):
+        specs = [spec for spec in specs if spec[0] != "CLAIM_COMPLETED"]
+    return fetch_status_feeds(token, specs)
+
+
+def stage_fetch(config: dict, token: str = None, feeds: dict = None, item_filter=None,
+                stream: bool = False) -> dict:
+    """
+    1) 토큰 발급 -> 2) 상태변경 조회 -> 3) 주문 상세조회
+    - token / feeds 를 넘기면 해당 단계는 건너뜀 (여러 샤드를 처리할 때 재사용)
+    - item_filter: 상태변경 항목 중 처리할 것만 고르는 함수 (예: 샤드 소유 여부)
+    - stream=True: 상세조회를 청크 단위로 받아 data[] 원소를 하나씩 넘김 ("details" 대신 "elements")
+    - 결과는 feeds / details 캐시에 저장, 상세조회 원본은 archive_dir 에 보관
+    - 반환: {"productOrderIds": [...], "canceled": [...], "details": detail_res, "oldestChangedDate": ...}
+    """
+    from claims import to_datetime
+    from naver_api import get_product_orders_detail, iter_product_order_elements, DETAIL_CHUNK_SIZE
+
+    if token is None:
+        token = get_store_token(config)
+
+    # 1) 상태 변경 API로 상품주문번호 목록 가져오기
+    if feeds is None:
+        feeds = fetch_feeds(token, config)
+    # feeds["PAYED"] 예시:
+    # [
+    #   {"productOrderId": "2025010464018221", "orderId": "...", ...},
+    #   {"productOrderId": "2025010634083331", ...},
+    #   ...
+    # ]
+    payed = feeds["PAYED"]
+    claims = feeds.get("CLAIM_COMPLETED", [])
+    if item_filter is not None:
+        payed = [item for item in payed if item_filter(item)]
+        claims = [item for item in claims if item_filter(item)]
+
+    product_order_ids = [item["productOrderId"] for item in payed]
+    # 이번에 처리할 가장 오래된 상태변경 시각 (status 의 주문 -> 시트 지연 계산용)
+    changed_dates = [item["lastChangedDate"] for item in payed if item.get("lastChangedDate")]
+    oldest_changed = min(changed_dates, key=lambda d: to_datetime(d)) if changed_dates else None
+    canceled = [{"productOrderId": item.get("productOrderId")} for item in claims]
+    save_cache(config, "feeds", {"productOrderIds": product_order_ids, "canceled": canceled})
+
+    # 2) 주문 상세조회 API로 실제 상세 정보 얻기
+    if stream:
+        # data[] 원소를 하나씩 넘겨주는 generator (소비하면서 details 캐시에 기록)
+        elements = iter_product_order_elements(token, product_order_ids,
+                                               chunk_size=config.get("detail_chunk_size") or DETAIL_CHUNK_SIZE)
+        archive = _open_archive(config)
+        if archive is not None:
+            elements = _archive_elements(archive, elements)
+        return {"productOrderIds": product_order_ids, "canceled": canceled, "details": None,
+                "oldestChangedDate": oldest_changed, "elements": _cache_elements(config, "details", elements)}
+
+    detail_res = {"data": []}
+    if product_order_ids:
+        detail_res = get_product_orders_detail(token, product_order_ids, chunk_size=config.get("detail_chunk_size"))
+    # detail_res 구조 예시:
+    # {
+    #   "timestamp": "...",
+    #   "data": [
+    #      {
+    #        "order": {"orderId": "...", "ordererName": "...", ...},
+    #        "productOrder": {"productOrderId": "...", "productName": "...", "productOption": "...", ...}
+    #      },
+    #      ...
+    #   ]
+    # }
+    save_cache(config, "details", detail_res)
+
+    # 원본 응답 보관 (show-order 로 productOrderId 별 조회)
+    archive = _open_archive(config)
+    if archive is not None and detail_res.get("data"):
+        archive.append(detail_res["data"])
+
+    return {"productOrderIds": product_order_ids, "canceled": canceled, "details": detail_res,
+            "oldestChangedDate": oldest_changed}
+
+
+def _dead_letter_handler(config: dict):
+    """
+    parse_order_elements(on_error=...) 용: 파싱 실패 주문을 dead-letter 파일로 격리
+    - dead_letter_path 가 없으면 None (예전처럼 예외로 중단)
+    """
+    if not config.get("dead_letter_path"):
+        return None
+
+    from dead_letter import DeadLetterStore
+
+    store = DeadLetterStore(config["dead_letter_path"])
+
+    def on_error(order_id, elements, error):
+        print(f"[dead-letter] 주문 {order_id} 파싱 실패 -> 격리 ({len(elements)}건): {error!r}")
+        store.add("parse", order_id, {"data": elements}, error)
+
+    return on_error
+
+
+def _storage_reject_handler(config: dict):
+    """
+    flush_to_storage(on_reject=...) 용: DB 가 거부한 레코드(데이터 오류)를 dead-letter 파일로 격리
+    (stage "storage", payload {"kind", "record"}) -> 나머지 배치는 계속 저장되고 sink 가 막히지 않음
+    - dead_letter_path 가 없으면 None (예전처럼 배치 전체가 실패)
+    """
+    if not config.get("dead_letter_path"):
+        return None
+
+    from dead_letter import DeadLetterStore
+
+    store = DeadLetterStore(config["dead_letter_path"])
+
+    def on_reject(kind, record, error):
+        key = str(record.get("productOrderId") or record.get("orderId") or "")
+        print(f"[dead-letter] {kind} {key} 저장 거부 -> 격리: {error!r}")
+        store.add("storage", key, {"kind": kind, "record": record}, error)
+
+    return on_reject
+
+
+def load_lookups(config: dict):
+    """
+    파싱 전에 상품 카탈로그 캐시 / 숙소 사전을 읽어 둠
+    - catalog_path 가 없으면 상품명 규칙만 사용, hotel_dictionary_path 가 없으면 hotelId 는 ""
+    - 둘 다 프로세스 전역이라 여러 스토어를 동시에 돌릴 때는 multi_store.run_stores 가 시작 전에 1번 읽고
+      lookups_preloaded 를 넘김 (스토어 스레드끼리 서로 덮어쓰지 않게)
+    - 반환: catalog
+    """
+    from catalog import catalog
+    from hotels import hotel_dictionary
+
+    if config.get("lookups_preloaded"):
+        return catalog
+    if config.get("catalog_path"):
+        catalog.load(config["catalog_path"], overrides=config.get("product_catalog_overrides"))
+    if config.get("hotel_dictionary_path"):
+        hotel_dictionary.load(config["hotel_dictionary_path"], threshold=config.get("hotel_match_threshold"))
+    return catalog
+
+
+def stage_parse(config: dict, detail_res: dict = None) -> list[dict]:
+    """
+    details 캐시(또는 인자로 받은 detail_res) -> parse_orders() -> parsed 캐시
+    - 파싱에 실패한 주문은 dead-letter 로 빼고 나머지만 결과에 포함
+    - parse_workers 가 설정되어 있으면 여러 프로세스로 파싱 (결과는 직렬과 동일)
+    """
+    from parsing import parse_order_elements, parse_orders_parallel, PARALLEL_MIN_ELEMENTS
+
+    load_lookups(config)
+    if detail_res is None:
+        detail_res = load_cache(config, "details")
+
+    # parse_orders() -> [{...}, ...] (name, useDate, category, ...)
+    # 이미 'combine_by_orderid' 한 상태
+    on_error = _dead_letter_handler(config)
+    if config.get("parse_workers"):
+        parsed_list = parse_orders_parallel(
+            detail_res,
+            workers=config["parse_workers"],
+            min_elements=config.get("parse_parallel_min") or PARALLEL_MIN_ELEMENTS,
+            on_error=on_error,
+        )
+    else:
+        parsed_list = parse_order_elements(detail_res.get("data", []), on_error=on_error)
+    save_cache(config, "parsed", parsed_list)
+    return parsed_list
+
+
+def _open_spool(config: dict):
+    from spool import Spool
+
+    return Spool(config.get("spool_path", "spool.db"))
+
+
+def enqueue(spool, detail_res: dict = None, parsed_list: list = None, canceled: list = None,
+            orders: list = None, product_orders: list = None) -> dict:
+    """
+    단계 결과를 spool 에 커밋 (이미 들어간 동일 레코드는 무시)
+    - orders / product_orders: detail_res 대신 이미 만들어 둔 행을 넘길 때 (stream 모드)
+    """
+    from db_mysql import order_data_from_detail, product_order_data_from_detail
+
+    if detail_res is not None:
+        data_list = detail_res.get("data", [])
+        orders = [order_data_from_detail(e) for e in data_list]
+        product_orders = [product_order_data_from_detail(e) for e in data_list]
+
+    counts = {}
+    if orders is not None:
+        counts["order"] = spool.append("order", orders, "orderId")
+    if product_orders is not None:
+        counts["product_order"] = spool.append("product_order", product_orders, "productOrderId")
+    if parsed_list is not None:
+        counts["option_detail"] = spool.append("option_detail", parsed_list, "productOrderId")
+    if canceled is not None:
+        counts["cancel"] = spool.append("cancel", canceled, "productOrderId")
+    return counts
+
+
+def enqueue_claims(config: dict, spool, token: str) -> int:
+    """
+    체크포인트 이후의 클레임 상태변경 -> spool ("claim")
+    - spool 에 커밋한 뒤에 체크포인트를 저장 (중간에 죽으면 다시 조회, 같은 레코드는 spool 이 무시)
+    - 반환: 새로 들어간 클레임 레코드 수
+    """
+    from claims import fetch_claim_changes, load_checkpoint, save_checkpoint
+
+    path = config.get("claims_checkpoint_path", "claims_checkpoint.json")
+    records, checkpoint = fetch_claim_changes(token, load_checkpoint(path))
+    count = spool.append("claim", records, "productOrderId")
+    save_checkpoint(path, checkpoint)
+    return count
+
+
+def flush_mysql(config: dict, spool, storage_pool=None) -> int:
+    """
+    spool -> DB
+    - storage_pool: 여러 스토어가 함께 쓰는 storage.StoragePool (없으면 연결을 새로 열고 닫음)
+    """
+    from spool import flush_to_storage
+    from status import status
+
+    on_reject = _storage_reject_handler(config)
+    with status.stage("flush_mysql"):
+        if storage_pool is not None:
+            with storage_pool.acquire() as storage:
+                count = flush_to_storage(spool, storage, on_reject=on_reject)
+        else:
+            from storage import open_storage
+
+            storage = open_storage(config["db"])
+            try:
+                count = flush_to_storage(spool, storage, on_reject=on_reject)
+            finally:
+                storage.close()
+    status.count("db_rows", count)
+    return count
+
+
+def _sheet_row_index(config: dict):
+    """
+    시트 행 번호 기록 위치 (sheet_rows 설정)
+    - "spool": 노드 로컬 spool (기본값, 노드 하나)
+    - "mysql": MySQL sheet_rows 를 여러 노드가 공유 (run-sharded)
+    """
+    if config.get("sheet_rows", "spool") == "mysql":
+        from storage import MySQLSheetRows
+
+        return MySQLSheetRows(config["db"], f'{config["sheet_id"]}!{config["sheet_range"]}')
+    return nullcontext()
+
+
+def flush_sheet(config: dict, spool, written_ranges: list = None) -> int:
+    """
+    spool -> 시트
+    - written_ranges: 주면 이번에 추가한 주문 행 범위를 모아 줌 (read_back 확인용)
+    """
+    from spool import flush_to_sheet
+    from status import status
+
+    _configure_sheets_quota(config)
+    with status.stage("flush_sheet"), _sheet_row_index(config) as row_index:
+        count = flush_to_sheet(spool, config["sheet_id"], config["sheet_range"], config["service_account_file"],
+                               claim_range=config.get("sheet_claim_range"), written_ranges=written_ranges,
+                               row_index=row_index)
+    status.count("sheet_rows", count)
+    return count
+
+
+def flush_export(config: dict, spool) -> int:
+    """
+    spool -> 분석용 파티션 파일 (export.py, export_dir 아래)
+    """
+    from export import flush_to_export
+    from status import status
+
+    with status.stage("flush_export"):
+        count = flush_to_export(spool, config["export_dir"], fmt=config.get("export_format") or "parquet")
+    status.count("export_rows", count)
+    return count
+
+
+def flush_sinks(config: dict, spool, storage_pool=None, written_ranges: list = None) -> dict:
+    """
+    spool -> (MySQL, 시트, export_dir 가 있으면 분석용 파일) 를 sink 별 스레드에서 동시에,
+    각자 sink_retries 번까지 재시도하며 반영
+    - 끝난 뒤 모든 sink 가 반영했고 spool_keep_seconds 가 지난 레코드는 spool 에서 삭제
+    - 반환: run_flushers() 결과 (sink 별 ok / count / attempts / seconds)
+    """
+    from spool import run_flushers
+
+    flushers = {
+        "mysql": lambda: flush_mysql(config, spool, storage_pool),
+        "sheet": lambda: flush_sheet(config, spool, written_ranges),
+    }
+    if config.get("export_dir"):
+        flushers["export"] = lambda: flush_export(config, spool)
+    results = run_flushers(flushers, retries=config.get("sink_retries") or 0,
+                           backoff=config.get("sink_retry_backoff") or 2.0)
+
+    keep_seconds = config.get("spool_keep_seconds")
+    if keep_seconds is not None:
+        removed = spool.compact(list(flushers), keep_seconds=keep_seconds)
+        if removed:
+            print(f"[spool] 모든 sink 가 반영한 레코드 {removed}건 정리")
+    return results
+
+
+def stage_push_sheet(config: dict, direct: bool = False) -> int:
+    """
+    parsed 캐시 -> 시트
+    - 기본: spool 에 넣고 시트 flusher 실행 (이미 반영한 행은 다시 쓰지 않음)
+    - direct=True: spool 을 거치지 않고 parsed 전체를 sheet_range 에 덮어씀 (시트 레이아웃 수정 확인용)
+    """
+    parsed_list = load_cache(config, "parsed")
+    if direct:
+        from sheets_api import to_spreadsheet_rows, update_sheet
+
+        _configure_sheets_quota(config)
+        rows = to_spreadsheet_rows(parsed_list)
+        result = update_sheet(
+            sheet_id=config["sheet_id"],
+            range_name=config["sheet_range"],
+            values=rows,
+            service_account_file=config["service_account_file"],
+            chunk_rows=config.get("sheet_chunk_rows") or 1000,
+            max_workers=config.get("sheet_write_workers") or 4,
+        )
+        if result["failed"] or result["mismatched"]:
+            raise RuntimeError(f"시트 일부 범위 반영 실패: failed={result['failed']}, mismatched={result['mismatched']}")
+        return len(rows)
+
+    spool = _open_spool(config)
+    enqueue(spool, parsed_list=parsed_list)
+    return flush_sheet(config, spool)
+
+
+def stage_refresh_catalog(config: dict, token: str = None) -> int:
+    """
+    상품 카탈로그 갱신: 캐시의 오래된 상품 + details 캐시에 있는 상품을 커머스 상품 API 로 조회
+    - 반환: 조회한 상품 수
+    """
+    catalog = load_lookups(config)
+    if token is None:
+        token = get_store_token(config)
+    try:
+        detail_res = load_cache(config, "details")
+    except FileNotFoundError:
+        detail_res = {"data": []}
+    for elem in detail_res.get("data", []):
+        catalog.classify(elem.get("productOrder", {}))
+    return catalog.refresh(token, config["catalog_path"])
+
+
+def stage_export(config: dict) -> int:
+    """
+    spool 에서 아직 내보내지 않은 예약 / 상태 변경 -> export_dir (run 마다 자동으로도 실행됨)
+    """
+    return flush_export(config, _open_spool(config))
+
+
+def stage_push_db(config: dict) -> int:
+    """
+    details / parsed 캐시 -> spool -> MySQL
+    """
+    spool = _open_spool(config)
+    enqueue(spool, detail_res=load_cache(config, "details"), parsed_list=load_cache(config, "parsed"))
+    return flush_mysql(config, spool)
+
+
+def stage_sync_cancels(config: dict) -> int:
+    """
+    feeds 캐시의 취소/반품 목록 -> spool -> MySQL
+    """
+    spool = _open_spool(config)
+    enqueue(spool, canceled=load_cache(config, "feeds")["canceled"])
+    return flush_mysql(config, spool)
+
+
+def stage_reprocess(config: dict, storage_pool=None) -> dict:
+    """
+    dead-letter 에 격리된 주문을 다시 처리 (파서 / 스키마를 고친 뒤 실행)
+    - 파싱 실패 주문: 다시 파싱해서 성공하면 spool -> (MySQL, 시트) 반영 후 dead-letter 에서 삭제
+    - DB 가 거부한 레코드 (stage "storage"): 한 건씩 DB 에 다시 저장, 성공하면 삭제
+    - 여전히 실패하는 것은 그대로 남김
+    - 반환: {"reprocessed": 성공 수, "remaining": 남은 수, "sinks": flusher 결과}
+    """
+    from dead_letter import DeadLetterStore
+    from parsing import parse_order_elements
+
+    load_lookups(config)
+    store = DeadLetterStore(config.get("dead_letter_path") or "dead_letter.jsonl")
+    stored, stored_remaining = _reprocess_storage_rejects(config, store, storage_pool)
+    entries = store.entries("parse")
+
+    succeeded, data_list, parsed_list = [], [], []
+    for entry in entries:
+        errors = []
+        elements = entry["payload"]["data"]
+        parsed = parse_order_elements(elements, on_error=lambda order_id, elems, error: errors.append(error))
+        if errors:
+            print(f"[dead-letter] 주문 {entry['key']} 여전히 실패: {errors[0]!r}")
+            continue
+        succeeded.append(entry["key"])
+        data_list.extend(elements)
+        parsed_list.extend(parsed)
+
+    if not succeeded:
+        return {"reprocessed": stored, "remaining": len(entries) + stored_remaining, "sinks": {}}
+
+    spool = _open_spool(config)
+    enqueue(spool, detail_res={"data": data_list}, parsed_list=parsed_list)
+    # spool 에 커밋했으므로 sink 가 실패해도 다음 flush 때 반영됨
+    store.remove("parse", succeeded)
+    results = flush_sinks(config, spool, storage_pool)
+    return {"reprocessed": len(succeeded) + stored,
+            "remaining": len(entries) - len(succeeded) + stored_remaining, "sinks": results}
+
+
+def _reprocess_storage_rejects(config: dict, store, storage_pool=None) -> tuple[int, int]:
+    """
+    stage_reprocess 의 DB 거부 레코드 부분 -> (저장한 수, 남은 수)
+    """
+    from spool import save_records
+
+    entries = store.entries("storage")
+    if not entries:
+        return 0, 0
+
+    def _save_all(storage):
+        saved = []
+        for entry in entries:
+            try:
+                save_records(storage, [(0, entry["payload"]["kind"], entry["payload"]["record"])])
+            except Exception as e:
+                if not storage.rejects(e):
+                    raise
+                print(f"[dead-letter] {entry['payload']['kind']} {entry['key']} 여전히 저장 거부: {e!r}")
+                continue
+            saved.append(entry["key"])
+        return saved
+
+    if storage_pool is not None:
+        with storage_pool.acquire() as storage:
+            saved = _save_all(storage)
+    else:
+        from storage import open_storage
+
+        storage = open_storage(config["db"])
+        try:
+            saved = _save_all(storage)
+        finally:
+            storage.close()
+    store.remove("storage", saved)
+    return len(saved), len(entries) - len(saved)
+
+
+def stage_sync_claims(config: dict, token: str = None, storage_pool=None) -> dict:
+    """
+    클레임(취소/반품/교환) 상태변경만 반영: 추적기 -> spool -> (MySQL, 시트)
+    - 반환: {"claims": 새 클레임 수, "sinks": flusher 결과}
+    """
+    if token is None:
+        token = get_store_token(config)
+    spool = _open_spool(config)
+    count = enqueue_claims(config, spool, token)
+    results = flush_sinks(config, spool, storage_pool)
+    return {"claims": count, "sinks": results}
+
+
+def stage_run(config: dict, storage_pool=None, token: str = None, feeds: dict = None,
+              item_filter=None, read_back: bool = True, track_claims: bool = None) -> dict:
+    """
+    전체 파이프라인: fetch -> parse -> spool -> (MySQL, 시트) 동시 반영 -> 시트 읽기 확인
+    - 새 주문이 없으면 {"productOrderIds": 0} 만 반환
+    - storage_pool: 여러 스토어 동시 실행 시 공유하는 DB 연결 풀
+    - token / feeds / item_filter: stage_fetch 참고
+    - track_claims: None 이면 설정값, False 면 클레임 동기화를 건너뜀 (샤드 실행은 사이클당 1번 따로 함)
+    """
+    from status import status
+
+    if token is None:
+        token = get_store_token(config)
+    if track_claims is None:
+        track_claims = bool(config.get("track_claims"))
+    stream = bool(config.get("stream_details"))
+    with status.stage("fetch"):
+        fetched = stage_fetch(config, token=token, feeds=feeds, item_filter=item_filter, stream=stream)
+    status.count("orders_fetched", len(fetched["productOrderIds"]))
+    if not fetched["productOrderIds"]:
+        print("새로운 상태변경 주문 없음")
+        if track_claims:
+            # 새 주문이 없어도 클레임은 반영
+            return {"productOrderIds": 0, **stage_sync_claims(config, token=token, storage_pool=storage_pool)}
+        return {"productOrderIds": 0}
+
+    spool = _open_spool(config)
+    if stream:
+        # 원소를 하나씩 받아 DB 행을 만들고 바로 파서로 넘김 (응답 전체를 메모리에 올리지 않음)
+        from db_mysql import order_data_from_detail, product_order_data_from_detail
+        from parsing import parse_order_elements
+
+        orders, product_orders = [], []
+
+        def _tap(elements):
+            for elem in elements:
+                orders.append(order_data_from_detail(elem))
+                product_orders.append(product_order_data_from_detail(elem))
+                yield elem
+
+        with status.stage("parse"):
+            load_lookups(config)
+            parsed_list = parse_order_elements(_tap(fetched["elements"]), on_error=_dead_letter_handler(config))
+        save_cache(config, "parsed", parsed_list)
+
+        # 파싱 결과를 로컬 spool 에 먼저 커밋
+        enqueue(spool, orders=orders, product_orders=product_orders,
+                parsed_list=parsed_list, canceled=fetched["canceled"])
+    else:
+        with status.stage("parse"):
+            parsed_list = stage_parse(config, fetched["details"])
+
+        # 파싱 결과를 로컬 spool 에 먼저 커밋
+        # (MySQL / 시트가 느리거나 죽어도 파싱 결과는 보존, 다음 실행 때 이어서 반영)
+        enqueue(spool, detail_res=fetched["details"], parsed_list=parsed_list, canceled=fetched["canceled"])
+
+    # 클레임 상태변경도 같은 spool 에 넣어 한 번의 flush 로 반영
+    claim_count = enqueue_claims(config, spool, token) if track_claims else 0
+
+    # sink 별 flusher 를 동시에 실행 (각자 재시도)
+    written_ranges = []
+    results = flush_sinks(config, spool, storage_pool, written_ranges)
+    print("sink 반영 결과:", results)
+    status.count("parsed", len(parsed_list))
+    if results["sheet"]["ok"] and fetched.get("oldestChangedDate"):
+        from claims import to_datetime
+
+        # 이번 실행에서 가장 오래 기다린 주문이 시트에 올라가기까지 걸린 시간
+        lag = time.time() - to_datetime(fetched["oldestChangedDate"]).timestamp()
+        status.gauge("order_to_sheet_lag_seconds", round(lag, 3))
+
+    from rate_limit import PRIORITY_BACKFILL, scheduler
+
+    print("API 요청 지표:", scheduler.metrics())
+
+    # 이번에 추가한 범위를 batchGet 1회로 읽어 확인 (확인용이므로 새 주문 요청보다 뒤로)
+    if read_back and results["sheet"]["ok"] and written_ranges:
+        from sheets_api import read_ranges
+
+        with scheduler.priority(PRIORITY_BACKFILL):
+            read_result = read_ranges(config["sheet_id"], written_ranges, config["service_account_file"])
+        read_rows = sum(len(rows) for rows in read_result)
+        print(f"시트에서 읽어온 행: {read_rows}건 ({len(written_ranges)}개 범위)")
+
+    return {"productOrderIds": len(fetched["productOrderIds"]), "parsed": len(parsed_list),
+            "claims": claim_count, "sinks": results}
+
+
+def stage_daemon(config: dict, interval: float = None, status_port: int = None, max_runs: int = None):
+    """
+    stage_run 을 interval 초마다 반복하는 상주 실행 + 상태 HTTP 엔드포인트 (status.py)
+    - status_port 가 있으면 status_host:status_port 에서 /status, /healthz 제공
+    - 한 번 실패해도 다음 주기에 다시 실행 (spool 에 남은 것은 이어서 반영)
+    - sink 가 하나라도 실패한 주기는 "run" 단계 실패로 기록 (/healthz 의 마지막 성공 시각이 갱신되지 않음)
+    - max_runs: 지정하면 그 횟수만큼만 실행 (확인용)
+    """
+    from status import serve, status
+
+    interval = interval or config.get("daemon_interval") or 300
+    if status_port is None:
+        status_port = config.get("status_port")
+
+    # 단계 사이 대기열: sink 별 spool 미반영 건수 / 가장 오래된 미반영 레코드 나이, dead-letter 건수
+    spool = _open_spool(config)
+
+    def _oldest_age(sink):
+        created_at = spool.oldest_pending(sink)
+        return None if created_at is None else round(time.time() - created_at, 3)
+
+    sinks = ("mysql", "sheet", "export") if config.get("export_dir") else ("mysql", "sheet")
+    for sink in sinks:
+        status.probe(f"spool_{sink}", lambda sink=sink: spool.depth(sink))
+        status.probe(f"spool_{sink}_oldest_seconds", lambda sink=sink: _oldest_age(sink))
+    if config.get("dead_letter_path"):
+        from dead_letter import DeadLetterStore
+
+        store = DeadLetterStore(config["dead_letter_path"])
+        status.probe("dead_letter", store.count)
+
+    # 상품 카탈로그는 백그라운드에서 주기적으로 갱신 (파싱은 캐시만 읽음)
+    if config.get("catalog_path"):
+        load_lookups(config).start_refresh(lambda: get_store_token(config), config["catalog_path"],
+                                            interval=config.get("catalog_refresh_seconds") or 3600)
+
+    server = None
+    if status_port:
+        host = config.get("status_host") or "127.0.0.1"
+        # 3 주기 넘게 성공한 실행이 없으면 /healthz 가 503
+        server = serve(status, host, status_port, max_age=interval * 3)
+        print(f"상태 엔드포인트: http://{host}:{server.server_address[1]}/status")
+
+    runs = 0
+    try:
+        while max_runs is None or runs < max_runs:
+            started = time.monotonic()
+            try:
+                with status.stage("run"):
+                    result = stage_run(config)
+                    # sink 실패는 spool 에 남아 다음 주기에 이어지지만, 계속 실패하면 /healthz 가 알 수 있게 실패로 기록
+                    failed = {name: r.get("error") for name, r in result["sinks"].items() if not r["ok"]}
+                    if failed:
+                        raise RuntimeError(f"sink 반영 실패: {failed}")
+            except Exception as e:
+                print(f"[daemon] 실행 실패 (다음 주기에 재시도): {e!r}")
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                break
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        if server is not None:
+            server.shutdown()
+    return runs
@@ -0,0 +1,187 @@
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """
+    토큰 버킷 rate limiter (스레드 안전)
+    - rate: 초당 채워지는 토큰 수 (= 허용 요청 수/초)
+    - capacity: 한 번에 몰아서 쓸 수 있는 최대 토큰 수 (기본: rate, 최소 1)
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        토큰이 있으면 차감하고 0 반환, 없으면 차감하지 않고 기다려야 할 초 반환
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        토큰을 얻을 때까지 대기 (락 밖에서 sleep)
+        - 반환: 대기한 총 시간(초)
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def drain(self, seconds: float):
+        """
+        서버가 429 로 거절했을 때: 앞으로 seconds 초 동안 토큰이 없도록 비움
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+# 우선순위 (작을수록 먼저)
+PRIORITY_REALTIME = 0   # 새 주문 조회 / 반영
+PRIORITY_BACKFILL = 10  # 밀린 기간 재조회, 확인용 읽기 등
+
+
+class Scheduler:
+    """
+    모든 외부 API 호출(네이버 커머스, 구글 시트)이 함께 쓰는 endpoint 별 요청 스케줄러
+    - endpoint: "naver/<store>/query", "sheets/write" 처럼 "/" 로 나눈 이름
+    - configure(prefix, rate) 로 TokenBucket 을 걸면 그 prefix 로 시작하는 endpoint 가 한 버킷을 나눠 씀
+      (가장 긴 prefix 가 우선, 버킷이 없으면 제한 없음)
+    - 한 버킷을 기다리는 요청은 우선순위 -> 도착 순서로 토큰을 받음 (새 주문이 backfill 보다 먼저)
+    - endpoint 별 요청 수 / 대기 시간 / 대기열 길이 / 429 횟수 / 오류 응답 수를 metrics() 로 제공
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._waiting = {}  # prefix -> [(priority, seq)] (heap)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._metrics = {}
+
+    def configure(self, prefix: str, rate_per_sec: float, burst: float = None):
+        with self._cond:
+            bucket = TokenBucket(rate_per_sec, burst)
+            current = self._buckets.get(prefix)
+            if current is not None and (current.rate, current.capacity) == (bucket.rate, bucket.capacity):
+                # 같은 한도로 다시 설정하면 쌓인 토큰을 유지
+                return
+            self._buckets[prefix] = bucket
+            self._waiting.setdefault(prefix, [])
+            self._cond.notify_all()
+
+    def _bucket_prefix(self, endpoint: str):
+        parts = endpoint.split("/")
+        for i in range(len(parts), 0, -1):
+            prefix = "/".join(parts[:i])
+            if prefix in self._buckets:
+                return prefix
+        return None
+
+    def _stats(self, endpoint: str) -> dict:
+        stats = self._metrics.get(endpoint)
+        if stats is None:
+            stats = self._metrics[endpoint] = {"requests": 0, "wait_total": 0.0, "wait_max": 0.0,
+                                               "queued": 0, "queued_max": 0, "throttled": 0, "errors": 0}
+        return stats
+
+    @contextmanager
+    def priority(self, priority: int):
+        """
+        with scheduler.priority(PRIORITY_BACKFILL): 블록 안(현재 스레드)의 요청 우선순위 지정
+        """
+        previous = getattr(self._local, "priority", PRIORITY_REALTIME)
+        self._local.priority = priority
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def acquire(self, endpoint: str, priority: int = None) -> float:
+        """
+        endpoint 로 요청 1건을 보내도 될 때까지 대기
+        - 반환: 대기한 시간(초)
+        """
+        if priority is None:
+            priority = getattr(self._local, "priority", PRIORITY_REALTIME)
+
+        start = time.monotonic()
+        with self._cond:
+            stats = self._stats(endpoint)
+            prefix = self._bucket_prefix(endpoint)
+            if prefix is not None:
+                waiting = self._waiting[prefix]
+                self._seq += 1
+                me = (priority, self._seq)
+                heapq.heappush(waiting, me)
+                stats["queued"] += 1
+                stats["queued_max"] = max(stats["queued_max"], stats["queued"])
+                try:
+                    while True:
+                        if waiting[0] == me:
+                            wait = self._buckets[prefix].try_acquire()
+                            if wait <= 0:
+                                break
+                        else:
+                            # 앞 순서가 토큰을 받으면 깨워 줌
+                            wait = None
+                        self._cond.wait(wait)
+                finally:
+                    waiting.remove(me)
+                    heapq.heapify(waiting)
+                    stats["queued"] -= 1
+                    self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            stats["requests"] += 1
+            stats["wait_total"] += waited
+            stats["wait_max"] = max(stats["wait_max"], waited)
+        return waited
+
+    def throttled(self, endpoint: str, retry_after: float = 1.0):
+        """
+        서버가 429 를 돌려줬을 때 호출: 해당 버킷을 retry_after 초 동안 막음
+        """
+        with self._cond:
+            self._stats(endpoint)["throttled"] += 1
+            prefix = self._bucket_prefix(endpoint)
+            if prefix is not None:
+                self._buckets[prefix].drain(retry_after)
+        if prefix is None:
+            # 버킷이 없는 endpoint 는 이 요청만 쉬었다가 재시도
+            time.sleep(retry_after)
+
+    def failed(self, endpoint: str):
+        """
+        429 가 아닌 오류 응답 / 연결 실패 1건 기록 (status 엔드포인트의 API 오류율)
+        """
+        with self._cond:
+            self._stats(endpoint)["errors"] += 1
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {endpoint: dict(stats) for endpoint, stats in self._metrics.items()}
+
+
+# 프로세스 전체가 함께 쓰는 스케줄러
+scheduler = Scheduler()
@@ -0,0 +1,190 @@
+import os
+import socket
+import time
+import zlib
+
+import pipeline
+
+
+def shard_of(order_id: str, num_shards: int) -> int:
+    """
+    orderId -> 샤드 번호 (모든 노드에서 같은 값이 나오도록 crc32 사용)
+    - 같은 orderId 의 상품주문은 항상 같은 샤드 -> 사이드옵션 병합이 한 노드 안에서 끝남
+    """
+    return zlib.crc32(str(order_id).encode("utf-8")) % num_shards
+
+
+# 클레임 동기화 전용 lease 번호 (주문 샤드 0 ~ num_shards-1 과 겹치지 않음)
+CLAIMS_SHARD = -1
+
+
+class ShardCoordinator:
+    """
+    MySQL 로 여러 워커 간 샤드 소유권 조정
+    - shard_leases (cycle, shard) 행: 사이클마다 먼저 INSERT 한 워커가 소유 -> 사이클당 정확히 한 번 처리
+    - GET_LOCK: 처리하는 동안 잡고 있음, 워커가 죽으면 연결이 끊기며 자동 해제
+    - 처리 중 죽은 워커의 lease 는 lease_seconds 가 지나고 GET_LOCK 이 비어 있으면 다른 워커가 가져감
+    """
+
+    def __init__(self, db_config: dict, num_shards: int, owner: str = None, lease_seconds: int = 600):
+        if db_config.get("backend", "mysql") != "mysql":
+            raise ValueError("샤드 조정은 MySQL backend 에서만 사용할 수 있음")
+
+        import pymysql
+
+        self.num_shards = num_shards
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.connection = pymysql.connect(
+            host=db_config["host"],
+            user=db_config["user"],
+            password=db_config["password"],
+            database=db_config["database"],
+            charset=db_config.get("charset", "utf8"),
+            autocommit=True
+        )
+
+    def _lock_name(self, shard: int) -> str:
+        if shard == CLAIMS_SHARD:
+            return "tripnova_claims"
+        return f"tripnova_shard_{self.num_shards}_{shard}"
+
+    def _get_lock(self, shard: int) -> bool:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (self._lock_name(shard),))
+            (got,) = cursor.fetchone()
+        return got == 1
+
+    def _release_lock(self, shard: int):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (self._lock_name(shard),))
+
+    def try_claim(self, cycle: int, shard: int) -> bool:
+        """
+        (cycle, shard) 소유 시도
+        - 성공하면 GET_LOCK 을 잡은 상태로 True 반환 (release 로 해제)
+        """
+        if not self._get_lock(shard):
+            # 다른 워커가 지금 처리 중
+            return False
+
+        with self.connection.cursor() as cursor:
+            # 1) 이번 사이클 첫 소유
+            cursor.execute(
+                "INSERT IGNORE INTO shard_leases (cycle, shard, owner, claimed_at) VALUES (%s, %s, %s, NOW())",
+                (cycle, shard, self.owner)
+            )
+            if cursor.rowcount == 1:
+                return True
+
+            # 2) 끝나지 않은 채 오래된 lease (처리하던 워커가 죽음) -> 가져오기
+            #    GET_LOCK 을 잡았으므로 원래 소유자는 이미 연결이 끊긴 상태
+            cursor.execute(
+                "UPDATE shard_leases SET owner=%s, claimed_at=NOW() "
+                "WHERE cycle=%s AND shard=%s AND done_at IS NULL "
+                "AND claimed_at < NOW() - INTERVAL %s SECOND",
+                (self.owner, cycle, shard, self.lease_seconds)
+            )
+            if cursor.rowcount == 1:
+                return True
+
+        self._release_lock(shard)
+        return False
+
+    def claim_shards(self, cycle: int, max_claim: int, skip=()) -> list[int]:
+        """
+        이번 사이클에서 아직 아무도 처리하지 않은 샤드를 최대 max_claim 개 소유
+        - 워커마다 시작 위치를 달리해서 서로 같은 샤드부터 다투지 않게 함
+        """
+        start = zlib.crc32(self.owner.encode("utf-8")) % self.num_shards
+        claimed = []
+        for i in range(self.num_shards):
+            shard = (start + i) % self.num_shards
+            if shard in skip:
+                continue
+            if self.try_claim(cycle, shard):
+                claimed.append(shard)
+                if len(claimed) >= max_claim:
+                    break
+        return claimed
+
+    def mark_done(self, cycle: int, shards):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                "UPDATE shard_leases SET done_at=NOW() WHERE cycle=%s AND shard=%s AND owner=%s",
+                [(cycle, shard, self.owner) for shard in shards]
+            )
+
+    def release(self, shards):
+        for shard in shards:
+            self._release_lock(shard)
+
+    def cleanup(self, before_cycle: int) -> int:
+        with self.connection.cursor() as cursor:
+            cursor.execute("DELETE FROM shard_leases WHERE cycle < %s", (before_cycle,))
+            return cursor.rowcount
+
+    def close(self):
+        self.connection.close()
+
+
+def run_sharded_cycle(config: dict, num_shards: int = 16, max_claim: int = None,
+                      cycle_seconds: int = 300) -> dict:
+    """
+    여러 노드가 같은 설정으로 동시에 실행해도 orderId 그룹이 사이클당 한 번씩만 처리되도록 실행
+    1) 상태변경 목록은 노드마다 1회 조회 (가벼운 목록 API)
+    2) 샤드를 max_claim 개씩 소유 -> 소유한 샤드의 주문만 상세조회 / 파싱 / 저장
+    3) 남은 샤드가 없을 때까지 반복 (다른 노드가 없거나 죽었으면 혼자 전부 처리)
+    4) track_claims 면 클레임 전용 lease(CLAIMS_SHARD)를 잡은 노드 하나만 클레임 동기화
+       (샤드마다 / 노드마다 클레임 목록을 다시 조회하지 않음)
+    - 시트 행 번호는 MySQL sheet_rows 에 공유 (sheet_rows="mysql") -> 다음 사이클에 같은 주문을
+      다른 노드가 처리해도 기존 행을 덮어씀, 시트 쓰기는 노드끼리 GET_LOCK 으로 차례대로
+    - shard_leases / sheet_rows 테이블은 main.py 가 시작할 때 migrate_storage 로 맞춰 둠
+    - 반환: {"cycle": ..., "shards": [처리한 샤드], "results": [...], "claims": 클레임 동기화 결과 또는 None}
+    """
+    max_claim = max_claim or num_shards
+    config = dict(config, sheet_rows="mysql")
+    cycle = int(time.time() // cycle_seconds)
+
+    coordinator = ShardCoordinator(config["db"], num_shards)
+    token = pipeline.get_store_token(config)
+    feeds = pipeline.fetch_feeds(token, config)
+
+    processed = []
+    results = []
+    try:
+        while True:
+            claimed = coordinator.claim_shards(cycle, max_claim, skip=set(processed))
+            if not claimed:
+                break
+            owned = set(claimed)
+            try:
+                result = pipeline.stage_run(
+                    config,
+                    token=token,
+                    feeds=feeds,
+                    item_filter=lambda item: shard_of(item.get("orderId", ""), num_shards) in owned,
+                    read_back=False,
+                    track_claims=False,
+                )
+                sinks = result.get("sinks", {})
+                # sink 가 실패해도 spool 에 남아 다음 실행 때 이어서 반영되므로 샤드는 처리 완료로 표시
+                coordinator.mark_done(cycle, claimed)
+                results.append({"shards": claimed, "productOrderIds": result["productOrderIds"], "sinks": sinks})
+            finally:
+                coordinator.release(claimed)
+            processed.extend(claimed)
+
+        claims = None
+        if config.get("track_claims") and coordinator.try_claim(cycle, CLAIMS_SHARD):
+            try:
+                claims = pipeline.stage_sync_claims(config, token=token)
+                coordinator.mark_done(cycle, [CLAIMS_SHARD])
+            finally:
+                coordinator.release([CLAIMS_SHARD])
+
+        coordinator.cleanup(cycle - 12)
+    finally:
+        coordinator.close()
+
+    return {"cycle": cycle, "shards": sorted(processed), "results": results, "claims": claims}
@@ -1,35 +1,296 @@
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def update_sheet(sheet_id, range_name, values, service_account_file):
+from columns import option_detail_sheet_row
+from rate_limit import scheduler
+
+
+def set_quota(write_per_min: float = None, read_per_min: float = None):
+    """
+    Sheets API 분당 요청 한도를 스케줄러 버킷으로 설정 ("sheets/write", "sheets/read")
+    - 같은 서비스 계정을 쓰는 모든 스토어/스레드가 한 버킷을 나눠 씀
+    """
+    if write_per_min:
+        scheduler.configure("sheets/write", write_per_min / 60.0)
+    if read_per_min:
+        scheduler.configure("sheets/read", read_per_min / 60.0)
+
+
+def _execute(request, endpoint: str, max_retries: int = 5):
+    """
+    스케줄러에서 순서를 받은 뒤 request.execute()
+    - 429 면 Retry-After 동안 버킷을 막고 다시 순서를 받아 재시도
+    """
+    from googleapiclient.errors import HttpError
+
+    for attempt in range(1, max_retries + 1):
+        scheduler.acquire(endpoint)
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status != 429 or attempt == max_retries:
+                scheduler.failed(endpoint)
+                raise
+            try:
+                retry_after = float(e.resp.get("retry-after") or 1)
+            except ValueError:
+                retry_after = 1.0
+            scheduler.throttled(endpoint, retry_after)
+
+
+def _build_service(service_account_file, scopes):
+    """
+    서비스 계정 자격증명 + Sheets API 클라이언트 생성
+    - google 라이브러리는 import 가 무거우므로 시트 단계가 실제로 실행될 때만 import
+    - TRIPNOVA_SHEETS_ENDPOINT 가 있으면 인증 없이 해당 주소로 보냄 (bench_pipeline.py 의 가짜 Sheets 서버)
+    """
+    from googleapiclient.discovery import build
+
+    endpoint = os.environ.get("TRIPNOVA_SHEETS_ENDPOINT")
+    if endpoint:
+        from google.auth.credentials import AnonymousCredentials
+
+        return build("sheets", "v4", credentials=AnonymousCredentials(),
+                     client_options={"api_endpoint": endpoint}, static_discovery=True)
+
+    from google.oauth2 import service_account
+
+    creds = service_account.Credentials.from_service_account_file(
+        service_account_file,
+        scopes=scopes
+    )
+    return build("sheets", "v4", credentials=creds)
+
+
+# update_sheet 한 요청에 넣을 최대 행 수 / 대략적인 JSON 크기 (요청 크기 제한, 타임아웃 방지)
+CHUNK_ROWS = 1000
+CHUNK_BYTES = 1_000_000
+
+# 청크 단위로 다시 보내도 되는 오류 (429 는 _execute 가 스케줄러로 처리)
+RETRYABLE_STATUS = (500, 502, 503, 504)
+
+_thread_local = threading.local()
+
+
+def _thread_service(service_account_file, scopes):
+    """
+    스레드마다 Sheets 클라이언트 1개 (googleapiclient 의 http 객체는 스레드 간 공유 불가)
+    """
+    services = getattr(_thread_local, "services", None)
+    if services is None:
+        services = _thread_local.services = {}
+    key = (service_account_file, tuple(scopes))
+    if key not in services:
+        services[key] = _build_service(service_account_file, scopes)
+    return services[key]
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index
+
+
+def _column_letters(index: int) -> str:
+    letters = ""
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+
+def chunk_values(range_name: str, values: list, chunk_rows: int = CHUNK_ROWS,
+                 chunk_bytes: int = CHUNK_BYTES) -> list[tuple[str, list]]:
+    """
+    "시트!A40" 부터 쓸 values 를 겹치지 않는 범위별 청크로 나눔
+    - 청크당 chunk_rows 행 이하, 대략 chunk_bytes 이하
+    - 반환: [("시트!A40:Y1039", rows), ("시트!A1040:Y2039", rows), ...]
+    """
+    sheet, _, cell = range_name.rpartition("!")
+    match = re.match(r"([A-Z]+)(\d+)", cell)
+    if not match:
+        raise ValueError(f"시작 셀을 알 수 없는 범위: {range_name}")
+    prefix = f"{sheet}!" if sheet else ""
+    first_col = _column_index(match.group(1))
+    row = int(match.group(2))
+    width = max((len(r) for r in values), default=1)
+    last_col = _column_letters(first_col + max(width, 1) - 1)
+
+    chunks = []
+    current, size = [], 0
+    for values_row in values:
+        row_size = len(json.dumps(values_row, ensure_ascii=False))
+        if current and (len(current) >= chunk_rows or size + row_size > chunk_bytes):
+            chunks.append(current)
+            current, size = [], 0
+        current.append(values_row)
+        size += row_size
+    if current:
+        chunks.append(current)
+
+    result = []
+    for rows in chunks:
+        result.append((f"{prefix}{match.group(1)}{row}:{last_col}{row + len(rows) - 1}", rows))
+        row += len(rows)
+    return result
+
+
+def range_first_row(range_name: str):
+    """
+    "input!A41:Y60" -> 41 (행 번호가 없으면 None)
+    """
+    match = re.match(r"[A-Z]+(\d+)", range_name.rpartition("!")[2])
+    return int(match.group(1)) if match else None
+
+
+def _write_chunk(sheet_id, range_name, rows, service_account_file, max_retries: int = 3):
+    """
+    청크 1개 values.update, 서버 오류 / 타임아웃이면 이 청크만 재시도
+    """
+    from googleapiclient.errors import HttpError
+
+    service = _thread_service(service_account_file, ["https://www.googleapis.com/auth/spreadsheets"])
+    for attempt in range(1, max_retries + 1):
+        try:
+            return _execute(service.spreadsheets().values().update(
+                spreadsheetId=sheet_id,
+                range=range_name,
+                valueInputOption="RAW",
+                body={"values": rows}
+            ), "sheets/write")
+        except (HttpError, TimeoutError, ConnectionError) as e:
+            if isinstance(e, HttpError) and e.resp.status not in RETRYABLE_STATUS:
+                raise
+            if attempt == max_retries:
+                raise
+            print(f"[Attempt {attempt}] 시트 청크 재시도 {range_name}: {e!r}")
+            time.sleep(0.5 * attempt)
+
+
+def _normalize(rows: list) -> list:
+    # 시트는 끝쪽 빈 칸 / 빈 행을 돌려주지 않으므로 비교 전에 잘라냄
+    trimmed = []
+    for row in rows:
+        row = [str(v) if v is not None else "" for v in row]
+        while row and row[-1] == "":
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+def read_ranges(sheet_id, ranges: list[str], service_account_file) -> list[list]:
+    """
+    여러 범위를 values.batchGet 한 번으로 읽음 (ranges 순서대로 행 목록 반환)
+    """
+    if not ranges:
+        return []
+    service = _thread_service(service_account_file, ["https://www.googleapis.com/auth/spreadsheets.readonly"])
+    result = _execute(service.spreadsheets().values().batchGet(
+        spreadsheetId=sheet_id,
+        ranges=list(ranges)
+    ), "sheets/read")
+    return [vr.get("values", []) for vr in result.get("valueRanges", [])]
+
+
+def update_sheet(sheet_id, range_name, values, service_account_file, chunk_rows: int = CHUNK_ROWS,
+                 max_workers: int = 4, verify: bool = True) -> dict:
     """
     sheet_id: 스프레드시트 ID (URL 중간의 긴 문자열)
     range_name: 예) "시트이름!A1" (Sheet1!A1 등)
     values: 2차원 리스트로 표현할 데이터 [[컬럼,컬럼,...],[...],...]
     service_account_file: 서비스 계정 JSON 키 파일 경로
+
+    - values 를 겹치지 않는 범위의 청크로 나눠 max_workers 개씩 동시에 보냄
+      (요청 속도는 스케줄러의 "sheets/write" 한도를 따름)
+    - 실패한 청크만 재시도, 끝난 뒤 values.batchGet 1회로 쓴 범위 전체를 읽어 비교
+      (내용이 다른 청크는 한 번 더 씀)
+    - 반환: {"ranges": [쓴 범위], "failed": {범위: 오류}, "mismatched": [비교 후에도 다른 범위]}
     """
+    chunks = chunk_values(range_name, values, chunk_rows=chunk_rows)
 
-    # 1) 자격증명 생성
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file,
-        scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
+    def _write_all(targets):
+        failed = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_write_chunk, sheet_id, r, rows, service_account_file): r
+                       for r, rows in targets}
+            for future, r in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[r] = repr(e)
+        return failed
+
+    failed = _write_all(chunks)
+    written = [(r, rows) for r, rows in chunks if r not in failed]
+
+    mismatched = []
+    if verify and written:
+        actual = read_ranges(sheet_id, [r for r, _ in written], service_account_file)
+        retry = [(r, rows) for (r, rows), got in zip(written, actual) if _normalize(got) != _normalize(rows)]
+        if retry:
+            failed.update(_write_all(retry))
+            mismatched = [r for r, _ in retry if r not in failed]
+            if mismatched:
+                # 다시 쓴 청크만 한 번 더 확인
+                again = read_ranges(sheet_id, mismatched, service_account_file)
+                rows_by_range = dict(retry)
+                mismatched = [r for r, got in zip(mismatched, again) if _normalize(got) != _normalize(rows_by_range[r])]
+
+    cells = sum(len(row) for _, rows in written for row in rows)
+    print(f"업데이트된 셀 수: {cells} ({len(chunks)}개 청크, 실패 {len(failed)}, 불일치 {len(mismatched)})")
+    return {"ranges": [r for r, _ in chunks if r not in failed], "failed": failed, "mismatched": mismatched}
+
+
+def update_rows(sheet_id, range_name, rows_at: dict, service_account_file, chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    이미 있는 행들을 행 번호로 찾아 덮어씀 (values.batchUpdate, chunk_rows 행씩)
+    - range_name: 표의 시작 셀 (예: "input!A40", 열 위치만 사용)
+    - rows_at: {시트 행 번호: 행 값}
+    - 반환: 덮어쓴 행 수
+    """
+    sheet, _, cell = range_name.rpartition("!")
+    match = re.match(r"([A-Z]+)\d*", cell)
+    if not match:
+        raise ValueError(f"시작 셀을 알 수 없는 범위: {range_name}")
+    prefix = f"{sheet}!" if sheet else ""
+
+    data = [{"range": chunk_values(f"{prefix}{match.group(1)}{row}", [values])[0][0], "values": [values]}
+            for row, values in sorted(rows_at.items())]
+    service = _thread_service(service_account_file, ["https://www.googleapis.com/auth/spreadsheets"])
+    for i in range(0, len(data), chunk_rows):
+        _execute(service.spreadsheets().values().batchUpdate(
+            spreadsheetId=sheet_id,
+            body={"valueInputOption": "RAW", "data": data[i:i + chunk_rows]}
+        ), "sheets/write")
+    return len(data)
 
-    # 2) Sheets API 클라이언트 생성
-    service = build("sheets", "v4", credentials=creds)
 
-    # 3) 값 업데이트
-    body = {
-        "values": values
-    }
-    result = service.spreadsheets().values().update(
+def append_sheet(sheet_id, range_name, values, service_account_file):
+    """
+    update_sheet 과 같지만 기존 값을 덮어쓰지 않고 range_name 표의 마지막 행 아래에 추가
+    (values.append, INSERT_ROWS, 순서가 중요하므로 한 요청으로 보냄)
+    """
+    service = _build_service(service_account_file, ["https://www.googleapis.com/auth/spreadsheets"])
+    result = _execute(service.spreadsheets().values().append(
         spreadsheetId=sheet_id,
         range=range_name,
-        valueInputOption="RAW",  # RAW로 하면 그대로 입력
-        body=body
-    ).execute()
+        valueInputOption="RAW",
+        insertDataOption="INSERT_ROWS",
+        body={"values": values}
+    ), "sheets/write")
+
+    updates = result.get("updates", {})
+    print(f"추가된 셀 수: {updates.get('updatedCells')}")
+    # 실제로 추가된 범위 (예: "input!A41:Y60") -> 나중에 read_ranges 로 확인
+    return updates.get("updatedRange")
 
-    print(f"업데이트된 셀 수: {result.get('updatedCells')}")
 
 def read_sheet(sheet_id, range_name, service_account_file):
     """
@@ -37,15 +298,11 @@ def read_sheet(sheet_id, range_name, service_account_file):
     range_name: 읽을 범위 (예: "Sheet1!A1:E10")
     service_account_file: 서비스 계정 JSON 경로
     """
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file,
-        scopes=["https://www.googleapis.com/auth/spreadsheets.readonly"]
-    )
-    service = build("sheets", "v4", credentials=creds)
-    result = service.spreadsheets().values().get(
+    service = _build_service(service_account_file, ["https://www.googleapis.com/auth/spreadsheets.readonly"])
+    result = _execute(service.spreadsheets().values().get(
         spreadsheetId=sheet_id,
         range=range_name
-    ).execute()
+    ), "sheets/read")
 
     rows = result.get("values", [])
     return rows
@@ -53,98 +310,10 @@ def read_sheet(sheet_id, range_name, service_account_file):
 
 def to_spreadsheet_rows(parsed_list):
     """
-    parsed_list: 파싱된 주문 목록, 각 항목은 dict로 가정
-    [
-      {
-        "name": "이경원",
-        "useDate": "이용날짜(예시 : 2024-xx-xx ): 2025-02-15",
-        "category": "성인 (키 140cm 이상)(2명)",
-        "hotelName": "비다 로카 푸꾸옥 리조트",
-        "productName": "[QR+차량]...",
-        "courseOption": "B코스 (키스오브더씨 티켓 포함)",
-        "payMethod": "완납",
-        "tel": "010-..."
-      }, ...
-    ]
-    """
-    rows = []
-    """
-    # 1) 헤더
-    header = [
-        "한글성명",  # A
-        "영문성명",  # B (비워둠)
-        "이용날짜",  # C
-        "성인",      # D
-        "아동",      # E
-        "노인",      # F
-        "상품명",    # G
-        "숙소이름(픽업장소)",  # H
-        "코스옵션",  # I
-        "결제방식",  # J
-        "전화번호"   # K
-    ]
-    rows.append(header)
-    """
-    for item in parsed_list:
-        kor_name = item.get("korName", "")
-        eng_name = item.get("engName", "")
-        use_date = item.get("useDate", "")
-        adult = str(item.get("adult", 0))
-        child = str(item.get("child", 0))
-        old = str(item.get("old", 0))
-        product_name = item.get("productName", "")
-        hotel_name = item.get("hotelName", "")
-        course_option = item.get("courseOption", "")
-        pay_method = item.get("payMethod", "")
-        tel = item.get("tel", "")
-        course_option_side_1 = item.get("sideOption1", "")
-        course_option_side_2 = item.get("sideOption2", "")
-        course_option_side_3 = item.get("sideOption3", "")
-        course_option_side_4 = item.get("sideOption4", "")
-        tower = str(item.get("tower", 0))
-        airplane = item.get("airplane", "")
-        shipping_memo = item.get("shippingMemo", "")
-        initial_amount = str(item.get("initialProductAmount", 0))
-        final_amount = str(item.get("finalProductAmount", 0))
-
-        if product_name == "푸꾸옥 프라이빗 렌트카 기사포함 km무제한 SUV 미니벤":
-            pay_method = "완납"
-
-        # 2) 영문명등 쓰지않는 칸들 비워두기 / 추후에 구현 예정
-        drop = ""
-        pick_up_time = ""
-        use_date1 = ""
-        use_date2 = ""
-        use_date3 = ""
-
-        # 3) 한 행 구성
-        row = [
-            kor_name,         # A: 한글성명
-            use_date,     # B: 이용날짜(불완전 형식은 코드 내부에서 자동 변환)
-            eng_name,     # C: 영문성명(비워둠)
-            adult,        # D: 성인 수
-            child,        # E: 아동 수
-            old,          # F: 노인 수
-            hotel_name,   # G: 숙소(픽업 장소)
-            drop,         # H: drop 장소
-            product_name, # I: 상품명
-            course_option,# J: 코스 메인 옵션
-            course_option_side_1, # K: 코스 사이드 옵션 1
-            course_option_side_2, # L: 코스 사이드 옵션 2
-            pick_up_time, # M: 픽업 시간
-            pay_method,   # N: 결제방식
-            airplane,     # O: 비행기
-            tel,          # P: 전화번호
-            tower,        # Q: 타월 갯수
-            use_date1,    # R
-            use_date2,    # S
-            use_date3,    # T
-            shipping_memo,# U: 배송 메모
-            initial_amount, # V: 초기 상품금액
-            final_amount,    # W: 최종 상품금액
-            course_option_side_3, # X: 코스 사이드 옵션 3
-            course_option_side_4, # Y: 코스 사이드 옵션 4
-        ]
-        rows.append(row)
-
-    return rows
+    parsed_list: parse_orders() 결과 목록 -> 시트 25열(A~Y) 행 목록
+    - 열 배치는 columns.OPTION_DETAIL_SCHEMA 에 DB 컬럼과 함께 정의 (두 sink 가 같은 정의를 씀)
+      A 한글성명, B 이용날짜, C 영문성명, D~F 성인/아동/노인, G 숙소(픽업 장소), H drop 장소,
+      I 상품명, J 코스 메인 옵션, K~L 사이드 옵션 1~2, M 픽업 시간, N 결제방식, O 비행기,
+      P 전화번호, Q 타월 갯수, R~T (비움), U 배송 메모, V~W 초기/최종 상품금액, X~Y 사이드 옵션 3~4
+    """
+    return [option_detail_sheet_row(item) for item in parsed_list]
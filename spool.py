@@ -0,0 +1,353 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# 레코드 종류
+# - order: orders 테이블용 dict
+# - product_order: product_orders 테이블용 dict
+# - option_detail: parse_orders() 결과 1건 (시트 + product_option_details)
+# - cancel: {"productOrderId": ...} 취소 처리 대상
+# - claim: claims.fetch_claim_changes() 레코드 1건 (statement 변경 + 시트 클레임 로그)
+SPOOL_KINDS = ("order", "product_order", "option_detail", "cancel", "claim")
+
+
+class Spool:
+    """
+    로컬 write-ahead spool (SQLite 파일 큐)
+    - 파싱 결과를 먼저 여기에 커밋하고, sink(MySQL / 시트)는 각자 flusher 로 따로 비움
+    - sink 별 진행 위치(last_seq)를 기록하므로 재시작해도 이어서 처리
+    - 같은 (kind, key, 내용) 레코드는 다시 들어오지 않음 -> 조회 기간이 겹쳐도 중복 없음
+    """
+
+    def __init__(self, path: str = "spool.db"):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+              seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+              kind       TEXT NOT NULL,
+              key        TEXT NOT NULL,
+              digest     TEXT NOT NULL,
+              payload    TEXT NOT NULL,
+              created_at REAL NOT NULL,
+              UNIQUE (kind, key, digest)
+            )
+            """)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS sink_offsets (
+              sink       TEXT PRIMARY KEY,
+              last_seq   INTEGER NOT NULL,
+              updated_at REAL NOT NULL
+            )
+            """)
+            # 시트 sink 가 주문 행을 어느 시트 행에 썼는지 (같은 주문이 다시 오면 그 행을 덮어씀)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS sink_rows (
+              sink       TEXT NOT NULL,
+              key        TEXT NOT NULL,
+              row_number INTEGER NOT NULL,
+              PRIMARY KEY (sink, key)
+            )
+            """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드마다 따로 (flusher 가 각자 스레드에서 돎)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, kind: str, records, key_field: str) -> int:
+        """
+        records 를 한 트랜잭션으로 spool 에 기록
+        - key_field: 레코드 식별 키 (예: "productOrderId")
+        - 반환: 새로 들어간 레코드 수 (이미 있던 동일 레코드는 무시)
+        """
+        if kind not in SPOOL_KINDS:
+            raise ValueError(f"알 수 없는 spool kind: {kind}")
+
+        now = time.time()
+        params = []
+        for record in records:
+            payload = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+            digest = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+            params.append((kind, str(record.get(key_field, "")), digest, payload, now))
+
+        conn = self._conn()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO spool (kind, key, digest, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                params
+            )
+            return conn.total_changes - before
+
+    def offset(self, sink: str) -> int:
+        row = self._conn().execute("SELECT last_seq FROM sink_offsets WHERE sink=?", (sink,)).fetchone()
+        return row[0] if row else 0
+
+    def pending(self, sink: str, limit: int = 1000) -> list[tuple[int, str, dict]]:
+        """
+        sink 가 아직 처리하지 않은 레코드 [(seq, kind, record), ...] (seq 순)
+        """
+        rows = self._conn().execute(
+            "SELECT seq, kind, payload FROM spool WHERE seq > ? ORDER BY seq LIMIT ?",
+            (self.offset(sink), limit)
+        ).fetchall()
+        return [(seq, kind, json.loads(payload)) for seq, kind, payload in rows]
+
+    def depth(self, sink: str) -> int:
+        (count,) = self._conn().execute(
+            "SELECT COUNT(*) FROM spool WHERE seq > ?", (self.offset(sink),)
+        ).fetchone()
+        return count
+
+    def oldest_pending(self, sink: str):
+        """
+        sink 가 아직 처리하지 않은 가장 오래된 레코드의 spool 기록 시각 (없으면 None)
+        """
+        (created_at,) = self._conn().execute(
+            "SELECT MIN(created_at) FROM spool WHERE seq > ?", (self.offset(sink),)
+        ).fetchone()
+        return created_at
+
+    def ack(self, sink: str, seq: int):
+        """
+        sink 가 seq 까지 처리 완료했음을 기록
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO sink_offsets (sink, last_seq, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(sink) DO UPDATE SET last_seq=MAX(last_seq, excluded.last_seq), updated_at=excluded.updated_at",
+                (sink, seq, time.time())
+            )
+
+    def row_numbers(self, sink: str, keys) -> dict:
+        """
+        sink 가 기록해 둔 {key: 시트 행 번호} (없는 key 는 빠짐)
+        """
+        keys = list(keys)
+        result = {}
+        conn = self._conn()
+        # SQLite 변수 개수 제한 (999) 안쪽으로 나눠 조회
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, row_number FROM sink_rows WHERE sink=? AND key IN ({','.join('?' * len(chunk))})",
+                [sink] + chunk
+            ).fetchall()
+            result.update(rows)
+        return result
+
+    def save_row_numbers(self, sink: str, rows: dict):
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO sink_rows (sink, key, row_number) VALUES (?, ?, ?)",
+                [(sink, key, row) for key, row in rows.items()]
+            )
+
+    def compact(self, sinks, keep_seconds: float = 7 * 24 * 3600) -> int:
+        """
+        모든 sink 가 처리했고 keep_seconds 보다 오래된 레코드 삭제
+        - 삭제해도 (kind, key, digest) 중복 방지는 keep_seconds 기간 동안만 유지됨
+        """
+        low = min(self.offset(sink) for sink in sinks)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM spool WHERE seq <= ? AND created_at < ?",
+                (low, time.time() - keep_seconds)
+            )
+            return cur.rowcount
+
+
+def save_records(storage, records: list, on_reject=None):
+    """
+    [(seq, kind, record), ...] 를 storage.save_batch 한 번(한 트랜잭션)으로 저장
+    - on_reject(kind, record, error): 주면 데이터 오류(storage.rejects)로 배치가 거부될 때
+      배치를 반씩 나눠 다시 저장해서 문제 레코드만 찾아 넘김 (나머지는 정상 저장)
+      연결 끊김 등 데이터와 상관없는 오류는 그대로 올림 (전부 격리되지 않도록)
+    """
+    by_kind = {kind: [] for kind in SPOOL_KINDS}
+    for _, kind, record in records:
+        by_kind[kind].append(record)
+
+    try:
+        storage.save_batch(
+            orders=by_kind["order"],
+            product_orders=by_kind["product_order"],
+            option_details=by_kind["option_detail"],
+            canceled_ids=[item.get("productOrderId") for item in by_kind["cancel"]],
+            statements=[(item.get("productOrderId"), item["statement"]) for item in by_kind["claim"]],
+        )
+    except Exception as e:
+        if on_reject is None or not storage.rejects(e):
+            raise
+        if len(records) == 1:
+            _, kind, record = records[0]
+            on_reject(kind, record, e)
+            return
+        # seq 순서를 유지하도록 앞 절반부터
+        mid = len(records) // 2
+        save_records(storage, records[:mid], on_reject)
+        save_records(storage, records[mid:], on_reject)
+
+
+def flush_to_storage(spool: Spool, storage, sink: str = "mysql", batch_size: int = 1000,
+                     on_reject=None) -> int:
+    """
+    spool -> 저장소(storage.Storage) 로 bulk 반영
+    - 배치 하나를 storage.save_batch 로 한 트랜잭션에 쓰고 ack
+      (중간에 실패하면 마지막 ack 지점부터 재시도, upsert 라 재실행해도 안전)
+    - on_reject: save_records 참고 (없으면 거부된 레코드 1건이 배치 전체를 계속 막음)
+    - 반환: 처리한 레코드 수
+    """
+    total = 0
+    while True:
+        records = spool.pending(sink, limit=batch_size)
+        if not records:
+            return total
+
+        save_records(storage, records, on_reject)
+        spool.ack(sink, records[-1][0])
+        total += len(records)
+
+
+def _sheet_segments(records: list) -> list[tuple[str, list, int]]:
+    """
+    seq 순 레코드를 같은 시트 표에 쓰는 연속 구간으로 나눔 -> [(kind, [record], 구간 마지막 seq), ...]
+    - option_detail / claim 이 아닌 kind 는 시트에 쓰지 않으므로 앞 구간에 붙여 함께 ack
+    """
+    segments = []
+    for seq, kind, record in records:
+        if kind not in ("option_detail", "claim"):
+            kind = segments[-1][0] if segments else None
+            record = None
+        if not segments or segments[-1][0] != kind:
+            segments.append((kind, [], seq))
+        kind, items, _ = segments[-1]
+        if record is not None:
+            items.append(record)
+        segments[-1] = (kind, items, seq)
+    return segments
+
+
+def _write_option_rows(row_index, sink: str, sheet_id: str, range_name: str, service_account_file: str,
+                       parsed: list, written_ranges: list = None):
+    """
+    주문 행 반영: 이미 시트에 있는 productOrderId 는 그 행을 덮어쓰고, 처음 보는 주문만 append
+    (고객 정보 수정 / 상품명 변경 / 숙소 사전 변경으로 내용이 바뀌어 다시 spool 에 들어온 주문이 중복되지 않게)
+    - row_index: 행 번호 기록 (row_numbers / save_row_numbers, 보통 Spool)
+    """
+    from sheets_api import append_sheet, range_first_row, to_spreadsheet_rows, update_rows
+
+    # 같은 배치 안에서는 마지막 내용만
+    latest = {}
+    for record in parsed:
+        latest[str(record.get("productOrderId", ""))] = record
+    known = row_index.row_numbers(sink, [key for key in latest if key])
+
+    if known:
+        rows_at = {known[key]: row for key, row in
+                   zip(known, to_spreadsheet_rows([latest[key] for key in known]))}
+        update_rows(sheet_id, range_name, rows_at, service_account_file)
+
+    new = [(key, record) for key, record in latest.items() if key not in known]
+    if new:
+        updated_range = append_sheet(
+            sheet_id=sheet_id,
+            range_name=range_name,
+            values=to_spreadsheet_rows([record for _, record in new]),
+            service_account_file=service_account_file
+        )
+        first_row = range_first_row(updated_range or "")
+        if first_row is not None:
+            row_index.save_row_numbers(sink, {key: first_row + i for i, (key, _) in enumerate(new) if key})
+        if written_ranges is not None and updated_range:
+            written_ranges.append(updated_range)
+    return len(latest)
+
+
+def flush_to_sheet(spool: Spool, sheet_id: str, range_name: str, service_account_file: str,
+                   sink: str = "sheet", batch_size: int = 5000, claim_range: str = None,
+                   written_ranges: list = None, row_index=None) -> int:
+    """
+    spool -> 구글 시트 반영 (option_detail / claim 만 사용, 나머지 kind 는 건너뛰고 ack)
+    - 주문 행: 처음 보는 productOrderId 는 range_name 표 아래에 append 하고 그 행 번호를 기록,
+      내용이 바뀌어 다시 온 주문은 기록된 행을 덮어씀 (시트에서 행을 직접 정렬 / 삭제하면 기록이 어긋남)
+    - claim_range: 클레임 상태 변경을 시간순으로 쌓는 로그 표 (None 이면 클레임은 시트에 쓰지 않음)
+    - 표마다 쓰자마자 그 구간까지 ack -> 뒤 표 쓰기가 실패해도 앞 표를 다시 쓰지 않음
+    - written_ranges: 주면 append 된 주문 행 범위를 추가해 줌
+    - row_index: 행 번호 기록 위치 (None 이면 spool, 여러 노드가 같은 시트를 쓰면 storage.MySQLSheetRows)
+    - 반환: 시트에 쓴 행 수
+    """
+    row_index = row_index or spool
+    total = 0
+    while True:
+        records = spool.pending(sink, limit=batch_size)
+        if not records:
+            return total
+
+        for kind, items, last_seq in _sheet_segments(records):
+            if kind == "option_detail":
+                total += _write_option_rows(row_index, sink, sheet_id, range_name, service_account_file, items,
+                                            written_ranges)
+            elif kind == "claim" and claim_range:
+                from claims import to_claim_log_rows
+                from sheets_api import append_sheet
+
+                append_sheet(
+                    sheet_id=sheet_id,
+                    range_name=claim_range,
+                    values=to_claim_log_rows(items),
+                    service_account_file=service_account_file
+                )
+                total += len(items)
+            spool.ack(sink, last_seq)
+
+
+def run_flushers(flushers: dict, retries: int = 0, backoff: float = 2.0) -> dict:
+    """
+    flusher 들을 각자 스레드에서 동시에 실행 (전체 소요 시간 = 가장 느린 sink)
+    - flushers: {"mysql": callable, "sheet": callable}
+    - retries: sink 마다 따로 실패 시 재시도할 횟수 (backoff * 시도 횟수 초 대기)
+      ack 한 위치부터 다시 시작하므로 이미 반영한 레코드는 다시 쓰지 않음
+    - 한 sink 가 느리거나 죽어도 다른 sink 는 계속 진행, 끝내 실패한 sink 는 다음 실행 때 이어서 처리
+    - 반환: {"mysql": {"ok": True, "count": 120, "attempts": 1, "seconds": 0.8},
+             "sheet": {"ok": False, "error": "...", "attempts": 3, "seconds": 12.1}}
+    """
+    results = {}
+
+    def _run(name, flusher):
+        start = time.monotonic()
+        for attempt in range(1, retries + 2):
+            try:
+                count = flusher()
+            except Exception as e:
+                if attempt <= retries:
+                    print(f"[spool] {name} flush 실패, 재시도 {attempt}/{retries}: {e!r}")
+                    time.sleep(backoff * attempt)
+                    continue
+                results[name] = {"ok": False, "error": repr(e), "attempts": attempt,
+                                 "seconds": round(time.monotonic() - start, 3)}
+                print(f"[spool] {name} flush 실패 (다음 실행 때 이어서 처리): {e!r}")
+            else:
+                results[name] = {"ok": True, "count": count, "attempts": attempt,
+                                 "seconds": round(time.monotonic() - start, 3)}
+            return
+
+    threads = [threading.Thread(target=_run, args=(name, flusher), name=f"flush-{name}")
+               for name, flusher in flushers.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 처리량(rate) 계산 구간
+RATE_WINDOW = 300.0
+
+
+class StatusRegistry:
+    """
+    상주 실행(daemon) 상태를 프로세스 안에서만 모아 두는 카운터 (MySQL 등 외부 조회 없음)
+    - stage(name): 단계별 마지막 성공 시각 / 소요 시간 / 실패 횟수
+    - count(name, n): 최근 RATE_WINDOW 초 처리량 (DB 쓰기 행 수, 시트 쓰기 행 수 등)
+    - gauge(name, value): 마지막 값 (주문 -> 시트 지연 등)
+    - probe(name, fn): snapshot() 때마다 fn() 을 불러 값을 채움 (spool 대기열 길이 등)
+    """
+
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._events = {}
+        self._totals = {}
+        self._gauges = {}
+        self._probes = {}
+
+    def _stage(self, name: str) -> dict:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {"runs": 0, "errors": 0, "last_success": None, "last_duration": None,
+                                          "last_error": None, "last_error_at": None}
+        return stage
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        with status.stage("fetch"): 블록이 예외 없이 끝나면 성공으로 기록 (예외는 그대로 올림)
+        """
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            with self._lock:
+                stage = self._stage(name)
+                stage["errors"] += 1
+                stage["last_error"] = repr(e)
+                stage["last_error_at"] = time.time()
+            raise
+        with self._lock:
+            stage = self._stage(name)
+            stage["runs"] += 1
+            stage["last_success"] = time.time()
+            stage["last_duration"] = round(time.monotonic() - start, 3)
+
+    def count(self, name: str, n: int = 1):
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.setdefault(name, deque())
+            events.append((now, n))
+            self._totals[name] = self._totals.get(name, 0) + n
+            while events and events[0][0] < now - self.window:
+                events.popleft()
+
+    def gauge(self, name: str, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def probe(self, name: str, fn):
+        with self._lock:
+            self._probes[name] = fn
+
+    def last_success(self, name: str):
+        with self._lock:
+            stage = self._stages.get(name)
+            return stage["last_success"] if stage else None
+
+    def snapshot(self) -> dict:
+        from rate_limit import scheduler
+
+        now = time.time()
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            stages = {}
+            for name, stage in self._stages.items():
+                stages[name] = dict(stage, age=None if stage["last_success"] is None
+                                    else round(now - stage["last_success"], 3))
+            rates = {}
+            for name, events in self._events.items():
+                recent = sum(n for t, n in events if t >= cutoff)
+                rates[name] = {"per_sec": round(recent / self.window, 3), "total": self._totals[name]}
+            gauges = dict(self._gauges)
+            probes = dict(self._probes)
+
+        queues = {}
+        for name, fn in probes.items():
+            try:
+                queues[name] = fn()
+            except Exception as e:
+                queues[name] = {"error": repr(e)}
+
+        api = scheduler.metrics()
+        for stats in api.values():
+            stats["error_rate"] = round(stats["errors"] / stats["requests"], 4) if stats["requests"] else 0.0
+
+        return {"now": now, "uptime": round(now - self.started_at, 3), "stages": stages, "rates": rates,
+                "gauges": gauges, "queues": queues, "api": api}
+
+
+def serve(registry: "StatusRegistry", host: str = "127.0.0.1", port: int = 8787, max_age: float = None):
+    """
+    상태 HTTP 서버를 백그라운드 스레드로 실행 (로컬 모니터링 에이전트용)
+    - GET /status : snapshot() JSON
+    - GET /healthz: "run" 단계 마지막 성공이 max_age 초 이내면 200, 아니면 503
+    - 반환: ThreadingHTTPServer (shutdown() 으로 중지)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/status":
+                self._reply(200, registry.snapshot())
+            elif path == "/healthz":
+                last = registry.last_success("run")
+                age = None if last is None else time.time() - last
+                ok = age is not None and (max_age is None or age <= max_age)
+                self._reply(200 if ok else 503, {"ok": ok, "age": age})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            # 모니터링 에이전트가 자주 부르므로 접근 로그는 남기지 않음
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="status-http", daemon=True).start()
+    return server
+
+
+# 프로세스 전체가 함께 쓰는 상태 카운터
+status = StatusRegistry()
@@ -0,0 +1,416 @@
+import queue
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import db_mysql
+from manifest import invalidate_manifest_cache
+
+
+class Storage(ABC):
+    """
+    파이프라인 저장소 인터페이스
+    - MySQLStorage: 운영용 (db_mysql 함수 사용)
+    - SQLiteStorage: MySQL 서버 없이 테스트/벤치마크용 (같은 upsert / 취소 의미)
+    """
+
+    @abstractmethod
+    def save_order(self, order_data):
+        ...
+
+    @abstractmethod
+    def save_product_order(self, product_order_data):
+        ...
+
+    @abstractmethod
+    def save_product_option_details(self, row_data):
+        ...
+
+    def save_product_option_details_many(self, rows):
+        for row in rows:
+            self.save_product_option_details(row)
+
+    @abstractmethod
+    def mark_canceled(self, product_order_ids) -> int:
+        ...
+
+    @abstractmethod
+    def save_batch(self, orders=(), product_orders=(), option_details=(), canceled_ids=(),
+                   statements=()) -> dict:
+        """
+        다섯 종류를 한 트랜잭션으로 저장 (db_mysql.save_batch 참고)
+        """
+
+    def rejects(self, error: BaseException) -> bool:
+        """
+        error 가 레코드 내용 때문에 난 오류인지 (같은 레코드를 다시 보내도 계속 실패)
+        - True 면 spool.save_records 가 배치를 나눠 문제 레코드만 격리
+        """
+        return isinstance(error, (TypeError, ValueError))
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+class MySQLStorage(Storage):
+    def __init__(self, connection):
+        self.connection = connection
+
+    def save_order(self, order_data):
+        db_mysql.save_order_to_db(self.connection, order_data)
+
+    def save_product_order(self, product_order_data):
+        db_mysql.save_product_order_to_db(self.connection, product_order_data)
+
+    def save_product_option_details(self, row_data):
+        db_mysql.save_product_option_details(self.connection, row_data)
+
+    def save_product_option_details_many(self, rows):
+        db_mysql.save_product_option_details_many(self.connection, rows)
+
+    def mark_canceled(self, product_order_ids) -> int:
+        return db_mysql.mark_canceled(self.connection, product_order_ids)
+
+    def save_batch(self, orders=(), product_orders=(), option_details=(), canceled_ids=(),
+                   statements=()) -> dict:
+        return db_mysql.save_batch(self.connection, orders, product_orders, option_details, canceled_ids,
+                                   statements)
+
+    def rejects(self, error: BaseException) -> bool:
+        import pymysql
+
+        # 1048 (NOT NULL 에 NULL), 1406 (값이 너무 김), 1366 (잘못된 값) 등
+        return isinstance(error, (pymysql.err.DataError, pymysql.err.IntegrityError)) or super().rejects(error)
+
+    def close(self):
+        self.connection.close()
+
+
+# SQLite 테이블 정의 (db_schema.MIGRATIONS 와 같은 컬럼 / 키)
+SQLITE_TABLES = {
+    "orders": (db_mysql.ORDER_COLUMNS, ("order_id",)),
+    "product_orders": (db_mysql.PRODUCT_ORDER_COLUMNS, ("product_order_id",)),
+    "product_option_details": (db_mysql.PRODUCT_OPTION_DETAILS_COLUMNS, ("product_order_id",)),
+    "pending_claims": (db_mysql.PENDING_CLAIMS_COLUMNS, ("product_order_id",)),
+}
+
+# db_mysql.RECONCILE_CLAIMS_SQL 과 같음 (SQLite 는 UPDATE ... JOIN 이 없어 서브쿼리로)
+SQLITE_RECONCILE_CLAIMS_SQL = [
+    "UPDATE product_option_details SET statement=("
+    "SELECT statement FROM pending_claims pc WHERE pc.product_order_id=product_option_details.product_order_id) "
+    "WHERE product_order_id IN (SELECT product_order_id FROM pending_claims)",
+    "DELETE FROM pending_claims WHERE product_order_id IN (SELECT product_order_id FROM product_option_details)",
+]
+
+# upsert 때 덮어쓰지 않는 컬럼 (MySQL 쪽 ON DUPLICATE KEY UPDATE 와 같게)
+SQLITE_KEEP_ON_UPDATE = {
+    "product_option_details": db_mysql.PRODUCT_OPTION_DETAILS_KEEP_ON_UPDATE,
+}
+
+SQLITE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_product_orders_order_id ON product_orders (order_id)",
+    "CREATE INDEX IF NOT EXISTS idx_pod_use_date ON product_option_details (use_date)",
+    "CREATE INDEX IF NOT EXISTS idx_pod_statement ON product_option_details (statement, use_date)",
+    "CREATE INDEX IF NOT EXISTS idx_pod_hotel ON product_option_details (use_date, hotel_id)",
+    "CREATE INDEX IF NOT EXISTS idx_pending_claims_updated_at ON pending_claims (updated_at)",
+]
+
+
+def _sqlite_upsert_sql(table: str) -> str:
+    """
+    INSERT ... ON CONFLICT(pk) DO UPDATE SET col=excluded.col
+    (MySQL 의 ON DUPLICATE KEY UPDATE col=VALUES(col) 과 같은 의미)
+    """
+    columns, keys = SQLITE_TABLES[table]
+    keep = SQLITE_KEEP_ON_UPDATE.get(table, ())
+    updates = ", ".join(f"{c}=excluded.{c}" for c in columns if c not in keys and c not in keep)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates}"
+    )
+
+
+class SQLiteStorage(Storage):
+    """
+    내장 SQLite 저장소
+    - WAL 모드 (읽기와 쓰기가 서로 막지 않음)
+    - 파라미터 튜플은 db_mysql 과 같은 함수로 만들어 컬럼 매핑이 어긋나지 않음
+    """
+
+    def __init__(self, path: str = "tripnova.db"):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._upsert_sql = {table: _sqlite_upsert_sql(table) for table in SQLITE_TABLES}
+
+    def _create_tables(self):
+        with self.connection:
+            for table, (columns, keys) in SQLITE_TABLES.items():
+                self.connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"({', '.join(columns)}, PRIMARY KEY ({', '.join(keys)}))"
+                )
+                # 예전 버전으로 만든 파일에는 나중에 추가된 컬럼(hotel_id 등)을 붙임 (db_schema 마이그레이션과 같은 역할)
+                existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+                for column in columns:
+                    if column not in existing:
+                        self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} DEFAULT ''")
+            for sql in SQLITE_INDEXES:
+                self.connection.execute(sql)
+
+    def save_order(self, order_data):
+        with self.connection:
+            self.connection.execute(self._upsert_sql["orders"], db_mysql.order_params(order_data))
+
+    def save_product_order(self, product_order_data):
+        with self.connection:
+            self.connection.execute(self._upsert_sql["product_orders"],
+                                    db_mysql.product_order_params(product_order_data))
+
+    def save_product_option_details(self, row_data):
+        self.save_product_option_details_many([row_data])
+
+    def save_product_option_details_many(self, rows):
+        params_list = [db_mysql.product_option_details_params(row) for row in rows]
+        if not params_list:
+            return
+        with self.connection:
+            self.connection.executemany(self._upsert_sql["product_option_details"], params_list)
+        invalidate_manifest_cache({params[2] for params in params_list})
+
+    def mark_canceled(self, product_order_ids) -> int:
+        ids = [(product_order_id,) for product_order_id in product_order_ids if product_order_id]
+        if ids:
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE product_option_details SET statement='CANCELED' WHERE product_order_id=?", ids
+                )
+            invalidate_manifest_cache()
+        return len(ids)
+
+    def save_batch(self, orders=(), product_orders=(), option_details=(), canceled_ids=(),
+                   statements=()) -> dict:
+        order_params_list = [db_mysql.order_params(o) for o in orders]
+        product_order_params_list = [db_mysql.product_order_params(p) for p in product_orders]
+        option_params_list = [db_mysql.product_option_details_params(d) for d in option_details]
+        cancel_params_list = [(i,) for i in canceled_ids if i]
+        statement_params_list = [(statement, i) for i, statement in statements if i]
+        pending_params_list = db_mysql.pending_claim_params(statements)
+
+        # 한 트랜잭션 (with 블록을 벗어날 때 1번 commit, 예외 시 rollback)
+        with self.connection:
+            self.connection.executemany(self._upsert_sql["orders"], order_params_list)
+            self.connection.executemany(self._upsert_sql["product_orders"], product_order_params_list)
+            self.connection.executemany(self._upsert_sql["product_option_details"], option_params_list)
+            self.connection.executemany(
+                "UPDATE product_option_details SET statement='CANCELED' WHERE product_order_id=?",
+                cancel_params_list
+            )
+            self.connection.executemany(
+                "UPDATE product_option_details SET statement=? WHERE product_order_id=?", statement_params_list
+            )
+            if statement_params_list:
+                self.connection.executemany(self._upsert_sql["pending_claims"], pending_params_list)
+                self.connection.execute("DELETE FROM pending_claims WHERE updated_at < ?",
+                                        (db_mysql.pending_claim_cutoff(),))
+            if option_params_list or statement_params_list:
+                for sql in SQLITE_RECONCILE_CLAIMS_SQL:
+                    self.connection.execute(sql)
+
+        if cancel_params_list or statement_params_list:
+            invalidate_manifest_cache()
+        elif option_params_list:
+            invalidate_manifest_cache({params[2] for params in option_params_list})
+
+        return {
+            "orders": len(order_params_list),
+            "product_orders": len(product_order_params_list),
+            "product_option_details": len(option_params_list),
+            "canceled": len(cancel_params_list),
+            "statements": len(statement_params_list),
+        }
+
+    def rejects(self, error: BaseException) -> bool:
+        # 바인딩할 수 없는 값 (dict / list 등) 은 버전에 따라 InterfaceError 또는 ProgrammingError
+        if isinstance(error, (sqlite3.InterfaceError, sqlite3.ProgrammingError)):
+            return "binding" in str(error)
+        return isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError)) or super().rejects(error)
+
+    def close(self):
+        self.connection.close()
+
+
+def _connect_mysql(config: dict):
+    import pymysql
+
+    return pymysql.connect(
+        host=config["host"],
+        user=config["user"],
+        password=config["password"],
+        database=config["database"],
+        charset=config.get("charset", "utf8")
+    )
+
+
+def open_storage(config: dict) -> Storage:
+    """
+    설정에 따라 저장소 생성 (연결만 만듦, 스키마는 migrate_storage 가 미리 맞춰 둠)
+    - {"backend": "mysql", "host": ..., "user": ..., "password": ..., "database": ...}
+    - {"backend": "sqlite", "path": "tripnova.db"}
+    """
+    backend = config.get("backend", "mysql")
+    if backend == "sqlite":
+        return SQLiteStorage(config.get("path", "tripnova.db"))
+    if backend == "mysql":
+        return MySQLStorage(_connect_mysql(config))
+    raise ValueError(f"지원하지 않는 storage backend: {backend}")
+
+
+def migrate_storage(config: dict) -> int:
+    """
+    테이블/인덱스 생성 및 버전 관리 + 조회 경로가 인덱스를 타는지 확인
+    - 프로세스 시작 때 / main.py migrate 에서 1번만 호출
+      (open_storage 는 연결 풀이 새 연결을 열 때마다 불리므로 여기서 하지 않음)
+    - sqlite 는 SQLiteStorage 가 열 때 테이블을 맞추므로 할 일 없음
+    - 반환: 적용 후 스키마 버전 (sqlite 는 0)
+    """
+    backend = config.get("backend", "mysql")
+    if backend == "sqlite":
+        return 0
+    if backend != "mysql":
+        raise ValueError(f"지원하지 않는 storage backend: {backend}")
+
+    from db_schema import migrate, check_query_plans
+
+    connection = _connect_mysql(config)
+    try:
+        version = migrate(connection)
+        for problem in check_query_plans(connection):
+            print("[EXPLAIN 경고]", problem)
+    finally:
+        connection.close()
+    return version
+
+
+class MySQLSheetRows:
+    """
+    시트 행 번호 기록을 spool(노드 로컬) 대신 MySQL sheet_rows 에 두는 버전 (run-sharded 용)
+    - 같은 주문이 다음 사이클에 다른 노드로 가도 기존 행을 덮어씀 (노드마다 다시 append 하지 않음)
+    - with 블록 동안 시트별 GET_LOCK 을 잡음 -> 조회 ~ append ~ 기록 사이에 다른 노드가 끼어들지 않음
+    - spool.flush_to_sheet 의 row_index 로 넘김 (row_numbers / save_row_numbers 는 Spool 과 같은 모양)
+    """
+
+    def __init__(self, db_config: dict, sheet_key: str, lock_timeout: int = 600):
+        self.sheet_key = sheet_key
+        self.lock_timeout = lock_timeout
+        self.lock_name = f"tripnova_sheet_{zlib.crc32(sheet_key.encode('utf-8'))}"
+        self.connection = _connect_mysql(db_config)
+        self.connection.autocommit(True)
+
+    def __enter__(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (self.lock_name, self.lock_timeout))
+            (got,) = cursor.fetchone()
+        if got != 1:
+            self.connection.close()
+            raise RuntimeError(f"시트 잠금을 {self.lock_timeout}초 안에 얻지 못함: {self.sheet_key}")
+        return self
+
+    def __exit__(self, *exc):
+        # 연결을 닫으면 GET_LOCK 도 풀림
+        self.connection.close()
+
+    def row_numbers(self, sink: str, keys) -> dict:
+        """
+        {productOrderId: 시트 행 번호} (sink 는 Spool 과 모양을 맞추려고 받음, sheet_key 로 구분)
+        """
+        keys = list(keys)
+        result = {}
+        with self.connection.cursor() as cursor:
+            for i in range(0, len(keys), 1000):
+                chunk = keys[i:i + 1000]
+                cursor.execute(
+                    f"SELECT product_order_id, row_number FROM sheet_rows "
+                    f"WHERE sheet_key=%s AND product_order_id IN ({','.join(['%s'] * len(chunk))})",
+                    [self.sheet_key] + chunk
+                )
+                result.update(cursor.fetchall())
+        return result
+
+    def save_row_numbers(self, sink: str, rows: dict):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO sheet_rows (sheet_key, product_order_id, row_number) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE row_number=VALUES(row_number)",
+                [(self.sheet_key, key, row) for key, row in rows.items()]
+            )
+
+
+class StoragePool:
+    """
+    여러 스레드(스토어)가 함께 쓰는 저장소 연결 풀
+    - pymysql / sqlite3 연결은 스레드 간 공유가 안전하지 않으므로 빌려 쓰고 반납
+    - 연결은 필요할 때 size 개까지 만들어 재사용
+    """
+
+    def __init__(self, config: dict, size: int = 4):
+        self.config = config
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self) -> Storage:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    return open_storage(self.config)
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            # 모두 사용 중이면 반납(또는 버려진 연결 자리)을 기다림
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    @contextmanager
+    def acquire(self):
+        storage = self._checkout()
+        broken = False
+        try:
+            yield storage
+        except Exception:
+            # 오류 난 연결은 상태를 알 수 없으므로 버리고 새로 만들게 함
+            broken = True
+            raise
+        finally:
+            if broken:
+                storage.close()
+                with self._lock:
+                    self._created -= 1
+            else:
+                self._idle.put(storage)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return